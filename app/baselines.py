@@ -0,0 +1,303 @@
+# app/baselines.py
+"""
+Materialized per-segment baselines of yield_pct, rework_rate and metric_variance.
+
+For every (site, tool_group, process_step) segment, and for its roll-ups (site, tool_group),
+(site) and all, the table keeps the last BASELINE_WINDOW values of each metric. A submission
+or case counts only toward the levels whose fields it selected: with no tool group, for
+example, it feeds (site) and all but no (site, tool_group) segment. The values
+come from the case corpus (in time order) and then from the persisted request log. For each
+window the table stores its median, quartiles and IQR. A submission's baseline is the most
+specific level with at least BASELINE_MIN_SAMPLES values, found with at most four dict
+lookups.
+
+Refreshes are incremental. At most once per BASELINE_REFRESH_S, a lookup tails the log bytes
+written since the last refresh, and only the windows those records touched are recomputed.
+When a compaction rewrites the log, its inode changes. Compaction keeps records one per line
+and in order, so the table rescans the log and skips as many records as it has already folded
+in. The table is rebuilt from scratch when the corpus grows.
+
+Submissions use it to:
+  - derive change_magnitude, when left empty, as yield_pct - segment median yield (pct points).
+    The value is scored with but logged under the record's "derived" key, not in its request.
+  - flag metrics outside the Tukey fences [Q1 - k*IQR, Q3 + k*IQR], k = BASELINE_IQR_K
+
+  python -m app.baselines [requests_responses.jsonl] [--site Plant-A] ...   # print the table
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import (
+    PERSIST_PATH,
+    BASELINE_METRICS,
+    BASELINE_WINDOW,
+    BASELINE_MIN_SAMPLES,
+    BASELINE_IQR_K,
+    BASELINE_REFRESH_S,
+)
+from app.records import CONTEXT_FIELDS, CONTEXT_VOCABULARIES, encode_context
+from app.schema import METRIC_ORDER
+
+# Segment key: context codes in CONTEXT_FIELDS order; 0 = any (roll-up). The placeholder also
+# encodes as 0, so rollup_keys() drops every level that would need an unselected field.
+SegmentKey = Tuple[int, int, int]
+# Materialized stats per metric: (median, q1, q3, n)
+Stats = Tuple[float, float, float, int]
+
+
+def rollup_keys(key: SegmentKey) -> List[SegmentKey]:
+    """
+    Most specific first: (s, t, p), (s, t, *), (s, *, *), (*, *, *), keeping only the levels
+    whose fields are all selected (no site -> just (*, *, *)). Duplicates dropped.
+    """
+    s, t, p = key
+    out: List[SegmentKey] = []
+    for depth, k in ((3, key), (2, (s, t, 0)), (1, (s, 0, 0)), (0, (0, 0, 0))):
+        if all(key[:depth]) and k not in out:
+            out.append(k)
+    return out
+
+
+def segment_key(payload: Dict[str, Any]) -> SegmentKey:
+    return tuple(encode_context(f, payload.get(f)) for f in CONTEXT_FIELDS)  # type: ignore[return-value]
+
+
+def segment_label(key: SegmentKey) -> str:
+    """(1, 2, 0) -> "Plant-A / LITHO-LINE-1 / *"."""
+    return " / ".join(CONTEXT_VOCABULARIES[f][c] if c else "*" for f, c in zip(CONTEXT_FIELDS, key))
+
+
+def _stats(values: Iterable[float]) -> Stats:
+    arr = np.fromiter(values, dtype=np.float64)
+    q1, median, q3 = np.percentile(arr, (25, 50, 75))
+    return float(median), float(q1), float(q3), int(arr.size)
+
+
+class BaselineTable:
+    """Rolling windows per (segment, metric) + their materialized median/IQR. Thread-safe."""
+
+    def __init__(self, log_path: str = PERSIST_PATH, window: int = BASELINE_WINDOW) -> None:
+        self.log_path = log_path
+        self.window = window
+        self._windows: Dict[Tuple[SegmentKey, str], Deque[float]] = {}
+        self.table: Dict[SegmentKey, Dict[str, Stats]] = {}
+        self.corpus_rows = -1
+        self.log_offset = 0
+        self.log_inode: Optional[int] = None
+        self.log_records = 0  # non-blank log lines folded in
+        self.refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _window(self, key: SegmentKey, metric: str) -> Deque[float]:
+        w = self._windows.get((key, metric))
+        if w is None:
+            w = self._windows[(key, metric)] = deque(maxlen=self.window)
+        return w
+
+    def _materialize(self, dirty: Set[Tuple[SegmentKey, str]], table: Dict[SegmentKey, Dict[str, Stats]]) -> None:
+        for key, metric in dirty:
+            # Copy-on-write per segment: lookups never see a half-updated entry.
+            table[key] = {**table.get(key, {}), metric: _stats(self._windows[(key, metric)])}
+
+    # ---------- building ----------
+    def _seed_from_corpus(self, corpus: Any) -> Set[Tuple[SegmentKey, str]]:
+        """Last `window` corpus values per (segment, metric), vectorized per roll-up level."""
+        dirty: Set[Tuple[SegmentKey, str]] = set()
+        if len(corpus) == 0:
+            return dirty
+        codes = np.stack([np.asarray(corpus.context[f], dtype=np.int64) for f in CONTEXT_FIELDS], axis=1)
+        metrics = corpus.metrics  # rows are in time order
+        for mask in ((1, 1, 1), (1, 1, 0), (1, 0, 0), (0, 0, 0)):
+            # Rows with an unknown value in a field this level names don't belong to it.
+            selected = np.flatnonzero((codes[:, np.array(mask, dtype=bool)] != 0).all(axis=1))
+            if not selected.size:
+                continue
+            level = codes * np.array(mask)
+            flat = (level[:, 0] * 256 + level[:, 1]) * 256 + level[:, 2]
+            order = selected[np.argsort(flat[selected], kind="stable")]  # groups stay in time order
+            _, starts = np.unique(flat[order], return_index=True)
+            bounds = list(starts[1:]) + [len(order)]
+            for lo, hi in zip(starts, bounds):
+                rows = order[lo:hi]
+                key = tuple(int(c) for c in level[rows[0]])
+                for metric in BASELINE_METRICS:
+                    col = metrics[rows, METRIC_ORDER.index(metric)]
+                    col = col[np.isfinite(col)][-self.window:]
+                    if col.size:
+                        self._window(key, metric).extend(col.tolist())  # type: ignore[arg-type]
+                        dirty.add((key, metric))  # type: ignore[arg-type]
+        return dirty
+
+    def _fold_request(self, request: Dict[str, Any], dirty: Set[Tuple[SegmentKey, str]]) -> None:
+        metrics = request.get("metrics") or {}
+        keys = rollup_keys(segment_key(request))
+        for metric in BASELINE_METRICS:
+            x = metrics.get(metric)
+            if x is None:
+                continue
+            for key in keys:
+                self._window(key, metric).append(float(x))
+                dirty.add((key, metric))
+
+    def _tail_log(self, dirty: Set[Tuple[SegmentKey, str]]) -> int:
+        if not os.path.exists(self.log_path):
+            return 0
+        st = os.stat(self.log_path)
+        skip = 0
+        if st.st_ino != self.log_inode or st.st_size < self.log_offset:
+            # Rewritten (compaction) or truncated: rescan, skipping the records already folded in.
+            skip, self.log_records = self.log_records, 0
+            self.log_inode, self.log_offset = st.st_ino, 0
+        n = 0
+        with open(self.log_path, "rb") as f:
+            f.seek(self.log_offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                self.log_offset += len(raw)
+                if not raw.strip():
+                    continue  # compaction drops blank lines
+                self.log_records += 1
+                if self.log_records <= skip:
+                    continue
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                self._fold_request(record.get("request") or {}, dirty)
+                n += 1
+        return n
+
+    def refresh(self, corpus: Any = None) -> int:
+        """Fold in what changed since the last refresh. Returns the number of log records read."""
+        from app.corpus import load_corpus
+
+        corpus = corpus if corpus is not None else load_corpus()
+        with self._lock:
+            dirty: Set[Tuple[SegmentKey, str]] = set()
+            table = self.table
+            if len(corpus) != self.corpus_rows:
+                # New cases belong before the logged submissions: rebuild, then swap in.
+                self._windows, table = {}, {}
+                self.log_offset, self.log_inode, self.log_records = 0, None, 0
+                dirty |= self._seed_from_corpus(corpus)
+                self.corpus_rows = len(corpus)
+            n = self._tail_log(dirty)
+            self._materialize(dirty, table)
+            self.table = table
+            self.refreshed_at = time.monotonic()
+        return n
+
+    def maybe_refresh(self) -> None:
+        """Refresh if older than BASELINE_REFRESH_S; skipped while another thread refreshes."""
+        if time.monotonic() - self.refreshed_at < BASELINE_REFRESH_S or self._lock.locked():
+            return
+        self.refresh()
+
+    # ---------- lookups ----------
+    def lookup(self, payload: Dict[str, Any]) -> Optional[Tuple[SegmentKey, Dict[str, Stats]]]:
+        """(segment key, {metric: stats}) of the most specific level with enough samples, or None."""
+        self.maybe_refresh()
+        for key in rollup_keys(segment_key(payload)):
+            stats = self.table.get(key)
+            if stats and max(s[3] for s in stats.values()) >= BASELINE_MIN_SAMPLES:
+                return key, stats
+        return None
+
+    def assess(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        (payload to score, with change_magnitude filled in if it was empty; baseline report or
+        None). The report lists the segment level used, the per-metric baselines, what was
+        filled in ("autofilled") and the metrics outside the baseline fences. Callers log the
+        submitted payload and keep the filled-in values apart (see persistence.scored_request).
+        """
+        found = self.lookup(payload)
+        if found is None:
+            return payload, None
+        key, stats = found
+        metrics = dict(payload.get("metrics") or {})
+        autofilled: Dict[str, float] = {}
+        yield_base = stats.get("yield_pct")
+        if metrics.get("change_magnitude") is None and metrics.get("yield_pct") is not None and yield_base and yield_base[3] >= BASELINE_MIN_SAMPLES:
+            autofilled["change_magnitude"] = round(float(metrics["yield_pct"]) - yield_base[0], 2)
+            metrics.update(autofilled)
+
+        baselines: Dict[str, Dict[str, Any]] = {}
+        out_of_baseline: List[str] = []
+        for metric, (median, q1, q3, n) in stats.items():
+            iqr = q3 - q1
+            # All baseline metrics are non-negative.
+            low, high = max(q1 - BASELINE_IQR_K * iqr, 0.0), q3 + BASELINE_IQR_K * iqr
+            baselines[metric] = {
+                "median": round(median, 4), "q1": round(q1, 4), "q3": round(q3, 4),
+                "low": round(low, 4), "high": round(high, 4), "n": n,
+            }
+            x = metrics.get(metric)
+            if x is not None and n >= BASELINE_MIN_SAMPLES and not low <= float(x) <= high:
+                out_of_baseline.append(metric)
+
+        parts = [f"Baseline {segment_label(key)}"]
+        if autofilled:
+            parts.append(
+                f"change_magnitude filled in as {autofilled['change_magnitude']:+g} pts vs. median yield "
+                f"{yield_base[0]:g}%"
+            )
+        if out_of_baseline:
+            parts.append(
+                "out of baseline: "
+                + ", ".join(
+                    f"{m} {metrics[m]:g} (normal {baselines[m]['low']:.3g}–{baselines[m]['high']:.3g})"
+                    for m in out_of_baseline
+                )
+            )
+        report = {
+            "segment": segment_label(key),
+            "baselines": baselines,
+            "autofilled": autofilled,
+            "out_of_baseline": out_of_baseline,
+            "detail": "; ".join(parts) + ".",
+        }
+        return ({**payload, "metrics": metrics} if autofilled else payload), report
+
+
+@lru_cache(maxsize=None)
+def get_baseline_table(log_path: str = PERSIST_PATH) -> BaselineTable:
+    """Process-wide table, built on first use (corpus + full log), refreshed incrementally after."""
+    table = BaselineTable(log_path)
+    table.refresh()
+    return table
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=PERSIST_PATH)
+    parser.add_argument("--site")
+    parser.add_argument("--tool-group")
+    parser.add_argument("--process-step")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    table = get_baseline_table(args.log)
+    print(f"{len(table.table)} segments from {table.corpus_rows} cases + log in {time.perf_counter() - t0:.2f}s")
+    want = {"site": args.site, "tool_group": args.tool_group, "process_step": args.process_step}
+    for key in sorted(table.table):
+        if any(v and encode_context(f, v) != c for (f, v), c in zip(want.items(), key)):
+            continue
+        cells = "  ".join(
+            f"{m}={s[0]:.3g} [{s[1]:.3g}, {s[2]:.3g}] n={s[3]}" for m, s in sorted(table.table[key].items())
+        )
+        print(f"{segment_label(key):45} {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# app/blobstore.py
+"""
+Content-addressed storage for response sub-objects in the request/response log.
+
+In "dedup" mode (PERSIST_MODE) each logged response keeps its shape, but repeated parts
+(next_checks, similar_cases and their entries, narrative, notes, ...) are replaced by
+{"$blob": "<hash>"} references into a side store <log>.blobs.jsonl that holds each
+distinct value once. iter_log() rehydrates transparently, for both plain and dedup lines.
+
+  python -m app.blobstore compact requests_responses.jsonl   # rewrite an existing log
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.persistence import LOG_LOCK
+
+REF_KEY = "$blob"
+HASH_CHARS = 20  # 80-bit prefix of sha256
+# Values whose JSON is shorter than this stay inline (a reference would not save anything).
+MIN_INTERN_BYTES = 2 * len(json.dumps({REF_KEY: "x" * HASH_CHARS}))
+
+
+def blob_path_for(log_path: str) -> str:
+    """requests_responses.jsonl -> requests_responses.blobs.jsonl"""
+    return os.path.splitext(log_path)[0] + ".blobs.jsonl"
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class BlobStore:
+    """
+    Append-only JSONL of {"h": hash, "v": value}; in-memory index hash -> byte offset.
+    Other processes may append to the same file: a lookup miss first indexes what they added.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096) -> None:
+        self.path = path
+        self._index: Dict[str, int] = {}
+        self._indexed_to = 0  # bytes of the file scanned into _index
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self) -> None:
+        """Index complete lines appended since the last scan (by any process)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_to)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                self._index[json.loads(raw)["h"]] = self._indexed_to
+                self._indexed_to += len(raw)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def put(self, value: Any) -> str:
+        canonical = _canonical(value)
+        h = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:HASH_CHARS]
+        with self._lock:
+            if h not in self._index:
+                line = ('{"h":"%s","v":%s}\n' % (h, canonical)).encode("utf-8")
+                with open(self.path, "ab") as f:
+                    self._index[h] = f.tell()
+                    f.write(line)
+        return h
+
+    def get(self, h: str) -> Any:
+        with self._lock:
+            if h in self._cache:
+                self._cache.move_to_end(h)
+                return self._cache[h]
+            offset = self._index.get(h)
+            if offset is None:
+                self._scan()
+                offset = self._index.get(h)
+            if offset is None:
+                raise KeyError(f"Blob {h} not found in {self.path}.")
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                value = json.loads(f.readline())["v"]
+            self._cache[h] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return value
+
+
+@lru_cache(maxsize=None)
+def get_blob_store(path: str) -> BlobStore:
+    return BlobStore(path)
+
+
+# ---------- intern / rehydrate ----------
+def _ref(value: Any, store: BlobStore) -> Any:
+    if value is None or len(_canonical(value)) < MIN_INTERN_BYTES:
+        return value
+    return {REF_KEY: store.put(value)}
+
+
+def intern_response(response: Dict[str, Any], store: BlobStore) -> Dict[str, Any]:
+    """
+    Replace repeated response parts by blob references. Lists are interned per entry and then
+    as a list of references, so a repeated list costs one reference and a partly repeated
+    list still shares its entries.
+    """
+    out: Dict[str, Any] = {}
+    for key, value in response.items():
+        if key == "meta":
+            out[key] = value  # unique per response
+        elif isinstance(value, list):
+            out[key] = _ref([_ref(v, store) for v in value], store)
+        else:
+            out[key] = _ref(value, store)
+    return out
+
+
+def rehydrate(obj: Any, store: BlobStore) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and REF_KEY in obj:
+            return rehydrate(store.get(obj[REF_KEY]), store)
+        return {k: rehydrate(v, store) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [rehydrate(v, store) for v in obj]
+    return obj
+
+
+def is_interned(response: Any) -> bool:
+    return REF_KEY in _canonical(response) if isinstance(response, dict) else False
+
+
+def iter_log(path: str, blob_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream log records with responses rehydrated (plain and dedup lines alike)."""
+    store = get_blob_store(blob_path or blob_path_for(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "response" in record:
+                record["response"] = rehydrate(record["response"], store)
+            yield record
+
+
+# ---------- compaction ----------
+def compact_log(
+    path: str, blob_path: Optional[str] = None, translate_offsets: Sequence[int] = ()
+) -> Tuple[Dict[str, int], List[int]]:
+    """
+    Rewrite a log so every response is interned. Holds LOG_LOCK, so in-process appends wait.
+
+    translate_offsets: byte offsets at line boundaries of the old file (e.g. the drift
+    monitor's checkpoint) -> returned as the matching offsets in the rewritten file.
+    """
+    store = get_blob_store(blob_path or blob_path_for(path))
+    tmp = path + ".compact.tmp"
+    stats = {"records": 0, "bytes_before": 0, "bytes_after": 0}
+    pending = sorted(set(translate_offsets))
+    mapping: Dict[int, int] = {}
+
+    with LOG_LOCK:
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            for raw in src:
+                while pending and pending[0] <= stats["bytes_before"]:
+                    mapping[pending.pop(0)] = stats["bytes_after"]
+                stats["bytes_before"] += len(raw)
+                if not raw.strip():
+                    continue
+                record = json.loads(raw)
+                if isinstance(record.get("response"), dict):
+                    record["response"] = intern_response(rehydrate(record["response"], store), store)
+                out = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                dst.write(out)
+                stats["bytes_after"] += len(out)
+                stats["records"] += 1
+            for off in pending:
+                mapping[off] = stats["bytes_after"]
+        os.replace(tmp, path)
+
+    stats["blob_bytes"] = os.path.getsize(store.path) if os.path.exists(store.path) else 0
+    return stats, [mapping[o] for o in translate_offsets]
+
+
+def _tail_lines(path: str, n: int, block: int = 64 * 1024) -> List[bytes]:
+    """Last n complete lines of a file, read backwards in blocks."""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos, buf = end, b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.split(b"\n")
+    if pos > 0:
+        lines = lines[1:]  # first piece may be a partial line
+    return [line for line in lines[:-1] if line.strip()][-n:]  # last piece: "" or partial line
+
+
+def needs_compaction(path: str, sample_lines: int = 50) -> bool:
+    """
+    True if the first or last lines still carry a plain (non-interned) response. The tail is
+    checked too: a log compacted earlier and appended to in plain mode since is plain at the end.
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        head = [line for _, line in zip(range(sample_lines), f)]
+    for line in head + _tail_lines(path, sample_lines):
+        if line.strip() and not is_interned(json.loads(line).get("response")):
+            return True
+    return False
+
+
+class CompactionJob(threading.Thread):
+    """Background one-shot compaction of a plain log; keeps the drift checkpoint aligned."""
+
+    def __init__(self, path: str, monitor: Any = None, checkpoint_path: Optional[str] = None) -> None:
+        super().__init__(daemon=True, name="log-compaction")
+        self.path = path
+        self.monitor = monitor
+        self.checkpoint_path = checkpoint_path
+        self.stats: Optional[Dict[str, int]] = None
+
+    def run(self) -> None:
+        if not needs_compaction(self.path):
+            return
+        with LOG_LOCK:
+            if self.monitor is None:
+                self.stats, _ = compact_log(self.path)
+                return
+
+            def rewrite(offset: int) -> int:
+                self.stats, (new_offset,) = compact_log(self.path, translate_offsets=[offset])
+                return new_offset
+
+            self.monitor.rebase_log(rewrite)
+            if self.checkpoint_path:
+                self.monitor.save(self.checkpoint_path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compact", help="rewrite a log into deduplicated form")
+    c.add_argument("path")
+    args = parser.parse_args(argv)
+
+    stats, _ = compact_log(args.path)
+    total_after = stats["bytes_after"] + stats["blob_bytes"]
+    ratio = stats["bytes_before"] / total_after if total_after else 0.0
+    print(
+        f"records={stats['records']} log {stats['bytes_before']} -> {stats['bytes_after']} bytes "
+        f"(+{stats['blob_bytes']} blob bytes), {ratio:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
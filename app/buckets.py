@@ -0,0 +1,117 @@
+# app/buckets.py
+"""
+Metric -> bucket classification compiled from BUCKET_RANGES.
+
+Each bucket's ranges are sorted by start and turned into an edge array; whole metric
+columns are classified with one np.searchsorted call. Codes follow
+records.SIGNAL_VOCABULARIES (0 = missing), so results drop straight into CaseTable.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import BUCKET_RANGES, BUCKET_METRICS
+from app.records import SIGNAL_VOCABULARIES
+from app.schema import METRIC_ORDER
+
+# Short names used in "Matched: ..." strings, e.g. variance=high.
+SIGNAL_NAMES = {bucket: bucket.rsplit("_", 1)[0] for bucket in BUCKET_RANGES}
+
+
+@lru_cache(maxsize=None)
+def compile_bucket(bucket: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BUCKET_RANGES[bucket] -> (edges, codes); value v gets codes[searchsorted(edges, v, "right")].
+
+    The boundary between two neighbouring ranges is the midpoint of the gap (or overlap)
+    between them, so every value maps to exactly one label and gaps/overlaps are split
+    deterministically (a value exactly on a boundary goes to the upper range). Values
+    outside all ranges clamp to the first/last label.
+    """
+    ranges = sorted(BUCKET_RANGES[bucket].items(), key=lambda kv: (kv[1][0], kv[1][1]))
+    edges = np.array(
+        [(ranges[i][1][1] + ranges[i + 1][1][0]) / 2 for i in range(len(ranges) - 1)],
+        dtype=np.float64,
+    )
+    codes = np.array([SIGNAL_VOCABULARIES[bucket].index(label) for label, _ in ranges], dtype=np.uint8)
+    return edges, codes
+
+
+def classify_column(bucket: str, values: Any) -> np.ndarray:
+    """Vectorized: metric values -> uint8 signal codes (NaN -> 0). change_bucket uses |value|."""
+    values = np.asarray(values, dtype=np.float64)
+    if bucket == "change_bucket":
+        values = np.abs(values)
+    edges, codes = compile_bucket(bucket)
+    out = codes[np.searchsorted(edges, values, side="right")]
+    out[np.isnan(values)] = 0
+    return out
+
+
+def change_dir_column(values: Any) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    labels = SIGNAL_VOCABULARIES["change_dir"]
+    out = np.select(
+        [values < 0, values > 0, values == 0],
+        [labels.index("neg"), labels.index("pos"), labels.index("zero")],
+        default=0,
+    )
+    return out.astype(np.uint8)
+
+
+def classify_metrics(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """(n, len(METRIC_ORDER)) metric matrix -> {signal key: (n,) uint8 codes}, all buckets in one pass each."""
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(METRIC_ORDER))
+    out = {
+        bucket: classify_column(bucket, matrix[:, METRIC_ORDER.index(key)])
+        for bucket, key in BUCKET_METRICS.items()
+    }
+    out["change_dir"] = change_dir_column(matrix[:, METRIC_ORDER.index(BUCKET_METRICS["change_bucket"])])
+    return out
+
+
+def metrics_matrix(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """Metric dicts -> (n, len(METRIC_ORDER)) float matrix, NaN for missing values."""
+    return np.array(
+        [[np.nan if m.get(k) is None else float(m[k]) for k in METRIC_ORDER] for m in rows],
+        dtype=np.float64,
+    ).reshape(len(rows), len(METRIC_ORDER))
+
+
+def decode_signals(codes: Dict[str, np.ndarray]) -> List[Dict[str, Optional[str]]]:
+    """Signal codes -> per-row "signals" dicts as stored on corpus cases."""
+    keys = list(codes)
+    n = len(codes[keys[0]]) if keys else 0
+    columns = {k: [SIGNAL_VOCABULARIES[k][c] for c in codes[k].tolist()] for k in keys}
+    return [{k: columns[k][i] for k in keys} for i in range(n)]
+
+
+def derive_signals(metrics: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Single metrics dict -> "signals" dict (same kernel as the batch path)."""
+    return decode_signals(classify_metrics(metrics_matrix([metrics])))[0]
+
+
+def classify_value(bucket: str, value: float) -> Optional[str]:
+    return SIGNAL_VOCABULARIES[bucket][int(classify_column(bucket, [value])[0])]
+
+
+def describe_match(query: Dict[str, Optional[str]], case: Dict[str, Optional[str]]) -> str:
+    """
+    "Matched: ..." string listing the buckets a case shares with the query,
+    e.g. "Matched: yield=medium, change=neg medium, window=long". Empty if nothing matches.
+    """
+    parts = []
+    for bucket in BUCKET_RANGES:
+        q = query.get(bucket)
+        if q is None or q != case.get(bucket):
+            continue
+        if bucket == "change_bucket":
+            if query.get("change_dir") != case.get("change_dir"):
+                continue
+            parts.append(f"change={query.get('change_dir')} {q}")
+        else:
+            parts.append(f"{SIGNAL_NAMES[bucket]}={q}")
+    return "Matched: " + ", ".join(parts) if parts else ""
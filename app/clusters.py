@@ -0,0 +1,431 @@
+# app/clusters.py
+"""
+Cross-site clustering of recent submissions.
+
+Investigations are handled one at a time, so the same signature reported by several plants on
+the same day goes unnoticed. This module keeps an incremental mini-batch k-means (NumPy only)
+over every logged submission:
+
+  - features: metrics z-scored against the case corpus (median / spread; missing -> 0), plus
+    a one-hot of each signal bucket scaled by CLUSTER_SIGNAL_WEIGHT
+  - updates: each batch of new log records moves its centers by the batch mean at rate
+    1 / count. Counts are capped at CLUSTER_MAX_COUNT, so the centers follow recent
+    submissions instead of freezing
+  - reseeding: a submission farther than CLUSTER_RESEED_DISTANCE from every center takes
+    over the lowest-count center, so a new signature is not absorbed by a broad cluster
+  - window: the members of the last CLUSTER_WINDOW_HOURS (by log ts) are kept with their
+    site / tool group, counting only those within CLUSTER_MAX_DISTANCE (RMS z) of the center
+
+A cluster is flagged when its window members number at least CLUSTER_MIN_MEMBERS and span
+CLUSTER_MIN_SPAN or more sites or tool groups. A background ClusterJob tails the log from a
+byte offset, as the drift monitor does. A compaction rewrite changes the file's inode; since
+compaction keeps records one per line and in order, the job then rescans the file and skips as
+many records as it has already folded in. State is checkpointed to CLUSTER_CHECKPOINT_PATH.
+
+  python -m app.clusters [requests_responses.jsonl] [--checkpoint PATH]   # fold in, list flags
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import threading
+import warnings
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    SITES,
+    TOOL_GROUPS,
+    PERSIST_PATH,
+    CLUSTER_CHECKPOINT_PATH,
+    CLUSTER_K,
+    CLUSTER_BATCH_SIZE,
+    CLUSTER_MAX_COUNT,
+    CLUSTER_SIGNAL_WEIGHT,
+    CLUSTER_WINDOW_HOURS,
+    CLUSTER_MAX_DISTANCE,
+    CLUSTER_RESEED_DISTANCE,
+    CLUSTER_MIN_MEMBERS,
+    CLUSTER_MIN_SPAN,
+    CLUSTER_POLL_S,
+)
+from app.persistence import scored_request
+from app.records import SIGNAL_VOCABULARIES, to_epoch
+from app.schema import METRIC_ORDER
+
+HOUR_SECONDS = 3600.0
+SPAN_FIELDS = {"site": SITES, "tool_group": TOOL_GROUPS}
+
+# Window member: (log epoch, cluster, site, tool_group, response_id)
+Member = Tuple[float, int, Optional[str], Optional[str], Optional[str]]
+
+
+def _span_value(request: Dict[str, Any], field: str) -> Optional[str]:
+    """Site / tool group as picked; the dropdown placeholder counts as unknown."""
+    v = request.get(field)
+    return v if v and v != SPAN_FIELDS[field][0] else None
+
+
+def _iso(epoch: float) -> str:
+    """Inverse of to_epoch for the naive log timestamps."""
+    return dt.datetime.fromtimestamp(epoch, dt.timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+def now_epoch() -> float:
+    """Current wall time on the log's ts scale (naive local time read as UTC by to_epoch)."""
+    return to_epoch(dt.datetime.now().isoformat())
+
+
+def corpus_reference() -> Tuple[np.ndarray, np.ndarray]:
+    """(center, scale) per metric from the case corpus, used to z-score submissions."""
+    from app.corpus import load_corpus
+
+    corpus = load_corpus()
+    if len(corpus) == 0:
+        return np.zeros(len(METRIC_ORDER)), np.ones(len(METRIC_ORDER))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN metric columns
+        center = np.nanmedian(corpus.metrics, axis=0)
+    return np.where(np.isfinite(center), center, 0.0), np.asarray(corpus.metric_scale, dtype=np.float64)
+
+
+class ClusterModel:
+    """Mini-batch k-means centers + the recent-member window. Thread-safe."""
+
+    def __init__(self, k: int = CLUSTER_K, seed: int = 0) -> None:
+        self.k = k
+        self.center: Optional[np.ndarray] = None  # metric standardization
+        self.scale: Optional[np.ndarray] = None
+        self.centers: Optional[np.ndarray] = None  # (k, d)
+        self.counts = np.zeros(k)
+        self.members: Deque[Member] = deque()
+        self.pending: List[Dict[str, Any]] = []  # records seen before the centers exist
+        self.log_offset = 0
+        self.log_inode: Optional[int] = None
+        self.log_records = 0  # non-blank log lines folded in
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+
+    # ---------- features ----------
+    def features(self, requests: List[Dict[str, Any]]) -> np.ndarray:
+        """Requests -> (n, d) feature rows (standardized metrics | weighted signal one-hots)."""
+        from app.buckets import classify_metrics, metrics_matrix
+
+        if self.center is None:
+            self.center, self.scale = corpus_reference()
+        matrix = metrics_matrix([r.get("metrics") or {} for r in requests])
+        z = np.nan_to_num((matrix - self.center) / self.scale, nan=0.0)
+        codes = classify_metrics(matrix)
+        parts = [z]
+        for key, vocab in SIGNAL_VOCABULARIES.items():
+            # Code 0 (missing) gets no column.
+            parts.append((codes[key][:, None] == np.arange(1, len(vocab))) * CLUSTER_SIGNAL_WEIGHT)
+        return np.hstack(parts)
+
+    def _distances(self, x: np.ndarray) -> np.ndarray:
+        """(n, k) squared distances to the centers."""
+        d2 = (x * x).sum(1)[:, None] - 2.0 * x @ self.centers.T + (self.centers * self.centers).sum(1)
+        return np.maximum(d2, 0.0)
+
+    def _rms(self, d2: np.ndarray) -> np.ndarray:
+        """Squared distance -> RMS per-feature distance, comparable across feature counts."""
+        return np.sqrt(d2 / self.centers.shape[1])
+
+    def _init_centers(self, x: np.ndarray) -> None:
+        """k-means++ seeding on the first batch."""
+        centers = [x[self._rng.integers(len(x))]]
+        d2 = ((x - centers[0]) ** 2).sum(1)
+        for _ in range(1, self.k):
+            total = d2.sum()
+            i = self._rng.choice(len(x), p=d2 / total) if total > 0 else self._rng.integers(len(x))
+            centers.append(x[i])
+            d2 = np.minimum(d2, ((x - x[i]) ** 2).sum(1))
+        self.centers = np.array(centers, dtype=np.float64)
+
+    # ---------- updates ----------
+    def partial_fit(self, records: List[Dict[str, Any]]) -> None:
+        """Fold one batch of log records into the centers and the member window."""
+        with self._lock:
+            if self.centers is None:
+                self.pending.extend({k: r.get(k) for k in ("ts", "request", "response_id")} for r in records)
+                if len(self.pending) < self.k:
+                    return
+                records, self.pending = self.pending, []
+                x = self.features([r.get("request") or {} for r in records])
+                self._init_centers(x)
+            else:
+                x = self.features([r.get("request") or {} for r in records])
+
+            d2 = self._distances(x)
+            if (self._rms(d2.min(1)) > CLUSTER_RESEED_DISTANCE).any():
+                d2 = self._reseed(x, d2)
+            labels = d2.argmin(1)
+            rms = self._rms(d2[np.arange(len(x)), labels])
+
+            sums = np.zeros_like(self.centers)
+            np.add.at(sums, labels, x)
+            n = np.bincount(labels, minlength=self.k).astype(np.float64)
+            hit = n > 0
+            counts = self.counts + n
+            self.centers[hit] += (sums[hit] - n[hit, None] * self.centers[hit]) / counts[hit, None]
+            self.counts = np.minimum(counts, CLUSTER_MAX_COUNT)
+
+            for record, label, dist in zip(records, labels, rms):
+                if dist > CLUSTER_MAX_DISTANCE:
+                    continue
+                request = record.get("request") or {}
+                self.members.append(
+                    (
+                        to_epoch(record["ts"]),
+                        int(label),
+                        _span_value(request, "site"),
+                        _span_value(request, "tool_group"),
+                        record.get("response_id"),
+                    )
+                )
+            if self.members:
+                self._prune(self.members[-1][0])  # log order is ts order
+
+    def _reseed(self, x: np.ndarray, d2: np.ndarray) -> np.ndarray:
+        """
+        Move the lowest-count center onto each submission far from every center, so a new
+        signature gets its own cluster instead of being absorbed by the nearest broad one.
+        Each center is reseeded at most once per batch. Window members of a reseeded center
+        are dropped. Returns the updated distances.
+        """
+        reseeded = np.zeros(self.k, dtype=bool)
+        for i in np.flatnonzero(self._rms(d2.min(1)) > CLUSTER_RESEED_DISTANCE):
+            if reseeded.all():
+                break
+            if self._rms(self._distances(x[i : i + 1]).min()) <= CLUSTER_RESEED_DISTANCE:
+                continue  # an earlier reseed in this batch already covers it
+            c = int(np.where(reseeded, np.inf, self.counts).argmin())
+            reseeded[c] = True
+            self.centers[c] = x[i]
+            self.counts[c] = 0.0
+            self.members = deque(m for m in self.members if m[1] != c)
+        return self._distances(x)
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - CLUSTER_WINDOW_HOURS * HOUR_SECONDS
+        while self.members and self.members[0][0] < cutoff:
+            self.members.popleft()
+
+    def catch_up(self, log_path: str) -> int:
+        """Fold in log records past the last one read. Returns the number of records folded in."""
+        if not os.path.exists(log_path):
+            return 0
+        st = os.stat(log_path)
+        skip = 0
+        with self._lock:
+            if st.st_ino != self.log_inode or st.st_size < self.log_offset:
+                # Rewritten (compaction) or truncated: rescan, skipping the records already folded in.
+                skip, self.log_records = self.log_records, 0
+                self.log_inode, self.log_offset = st.st_ino, 0
+            offset, records = self.log_offset, self.log_records
+
+        n = 0
+        batch: List[Dict[str, Any]] = []
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                offset += len(raw)
+                if not raw.strip():
+                    continue  # compaction drops blank lines
+                records += 1
+                if records <= skip:
+                    continue
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                # Clustered as scored, with the baseline-derived values the submit used.
+                batch.append({**record, "request": scored_request(record)})
+                if len(batch) >= CLUSTER_BATCH_SIZE:
+                    n += self._fold(batch, offset, records)
+                    batch = []
+        return n + self._fold(batch, offset, records)
+
+    def _fold(self, batch: List[Dict[str, Any]], offset: int, records: int) -> int:
+        with self._lock:
+            if batch:
+                self.partial_fit(batch)
+            self.log_offset, self.log_records = offset, records
+        return len(batch)
+
+    # ---------- flags ----------
+    def _window(self, now: float) -> List[Member]:
+        cutoff = now - CLUSTER_WINDOW_HOURS * HOUR_SECONDS
+        return [m for m in self.members if m[0] >= cutoff]
+
+    @staticmethod
+    def _flag(cluster: int, members: List[Member]) -> Optional[Dict[str, Any]]:
+        sites = sorted({m[2] for m in members if m[2]})
+        tool_groups = sorted({m[3] for m in members if m[3]})
+        if len(members) < CLUSTER_MIN_MEMBERS or max(len(sites), len(tool_groups)) < CLUSTER_MIN_SPAN:
+            return None
+        return {
+            "cluster": cluster,
+            "members": len(members),
+            "sites": sites,
+            "tool_groups": tool_groups,
+            "first_ts": _iso(min(m[0] for m in members)),
+            "last_ts": _iso(max(m[0] for m in members)),
+            "response_ids": [m[4] for m in members if m[4]],
+        }
+
+    def signature(self, cluster: int) -> Dict[str, str]:
+        """Signal labels of a center (its metric part mapped back to metric units)."""
+        from app.buckets import derive_signals
+
+        metrics = self.centers[cluster, : len(METRIC_ORDER)] * self.scale + self.center
+        return {k: v for k, v in derive_signals(dict(zip(METRIC_ORDER, metrics.tolist()))).items() if v}
+
+    def flagged(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Flagged clusters in the window ending at `now` (default: the newest member), most members first."""
+        with self._lock:
+            if self.centers is None or not self.members:
+                return []
+            now = now if now is not None else self.members[-1][0]
+            by_cluster: Dict[int, List[Member]] = {}
+            for m in self._window(now):
+                by_cluster.setdefault(m[1], []).append(m)
+            out = []
+            for cluster, members in by_cluster.items():
+                flag = self._flag(cluster, members)
+                if flag:
+                    flag["signature"] = self.signature(cluster)
+                    out.append(flag)
+        return sorted(out, key=lambda f: (-f["members"], f["cluster"]))
+
+    def assess(self, payload: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Flag for a new submission: its nearest cluster counted with the submission included,
+        or None when it is not part of a cross-site / cross-tool-group cluster.
+        """
+        now = now if now is not None else now_epoch()
+        with self._lock:
+            if self.centers is None:
+                return None
+            d2 = self._distances(self.features([payload]))[0]
+            cluster = int(d2.argmin())
+            if self._rms(d2[cluster]) > CLUSTER_MAX_DISTANCE:
+                return None
+            own: Member = (now, cluster, _span_value(payload, "site"), _span_value(payload, "tool_group"), None)
+            flag = self._flag(cluster, [m for m in self._window(now) if m[1] == cluster] + [own])
+            if flag is None:
+                return None
+            flag["signature"] = self.signature(cluster)
+        others = flag["members"] - 1
+        flag["window_hours"] = CLUSTER_WINDOW_HOURS
+        flag["detail"] = (
+            f"Same signature as {others} other submission{'s' if others != 1 else ''} in the last "
+            f"{CLUSTER_WINDOW_HOURS:g} h across sites {', '.join(flag['sites']) or '—'} / "
+            f"tool groups {', '.join(flag['tool_groups']) or '—'}."
+        )
+        return flag
+
+    # ---------- checkpointing ----------
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            arr = lambda a: None if a is None else a.tolist()  # noqa: E731
+            return {
+                "k": self.k,
+                "center": arr(self.center),
+                "scale": arr(self.scale),
+                "centers": arr(self.centers),
+                "counts": self.counts.tolist(),
+                "members": list(self.members),
+                "pending": self.pending,
+                "log_offset": self.log_offset,
+                "log_inode": self.log_inode,
+                "log_records": self.log_records,
+            }
+
+    def save(self, path: str) -> None:
+        """Atomic checkpoint (write temp file, then rename)."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ClusterModel":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        model = cls(k=int(state.get("k", CLUSTER_K)))
+        arr = lambda v: None if v is None else np.asarray(v, dtype=np.float64)  # noqa: E731
+        model.center, model.scale, model.centers = arr(state.get("center")), arr(state.get("scale")), arr(state.get("centers"))
+        model.counts = np.asarray(state.get("counts") or np.zeros(model.k), dtype=np.float64)
+        model.members = deque(tuple(m) for m in state.get("members", []))
+        model.pending = state.get("pending", [])
+        model.log_offset = int(state.get("log_offset", 0))
+        model.log_inode = state.get("log_inode")
+        model.log_records = int(state.get("log_records", 0))
+        return model
+
+
+@lru_cache(maxsize=None)
+def get_cluster_model(checkpoint_path: str = CLUSTER_CHECKPOINT_PATH) -> ClusterModel:
+    """Process-wide model, restored from its checkpoint (ClusterJob folds in the log tail)."""
+    return ClusterModel.load(checkpoint_path)
+
+
+class ClusterJob(threading.Thread):
+    """Background tail of the request log into the cluster model; checkpoints after new records."""
+
+    def __init__(
+        self, log_path: str = PERSIST_PATH, checkpoint_path: str = CLUSTER_CHECKPOINT_PATH, poll_s: float = CLUSTER_POLL_S
+    ) -> None:
+        super().__init__(daemon=True, name="cluster-job")
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path
+        self.poll_s = poll_s
+        self.model = get_cluster_model(checkpoint_path)
+        self._stop_event = threading.Event()
+
+    def step(self) -> int:
+        n = self.model.catch_up(self.log_path)
+        if n:
+            self.model.save(self.checkpoint_path)
+        return n
+
+    def run(self) -> None:
+        while True:
+            self.step()
+            if self._stop_event.wait(self.poll_s):
+                return
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=PERSIST_PATH)
+    parser.add_argument("--checkpoint", default=CLUSTER_CHECKPOINT_PATH)
+    args = parser.parse_args(argv)
+
+    job = ClusterJob(args.log, args.checkpoint)
+    n = job.step()
+    flags = job.model.flagged()
+    print(f"folded in {n} records; {len(flags)} flagged cluster(s) in the last {CLUSTER_WINDOW_HOURS:g} h")
+    for f in flags:
+        sig = ", ".join(f"{k}={v}" for k, v in f["signature"].items())
+        print(
+            f"  cluster {f['cluster']}: {f['members']} submissions, sites={','.join(f['sites'])} "
+            f"tool_groups={','.join(f['tool_groups'])} [{sig}]"
+        )
+
+
+if __name__ == "__main__":
+    main()
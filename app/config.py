@@ -42,4 +42,163 @@ DEFAULTS = {
     "rework_rate": 4.2,
 }
 
-PERSIST_PATH = "requests_responses.jsonl"
\ No newline at end of file
+# Metric -> bucket ranges (inclusive). Used by synthetic_data_gen.py for sampling and by the
+# app to derive "signals" for live payloads and imported cases.
+BUCKET_RANGES = {
+    "yield_bucket": {
+        "none": (91.5, 96.0),    # Normal Baseline
+        "small": (89.0, 92.4),   # Mild dip
+        "medium": (80.0, 88.9),  # Distinct drop
+        "large": (50.0, 79.9)    # Catastrophic
+    },
+    "variance_bucket": {
+        "low": (0.01, 0.15),
+        "medium": (0.16, 0.35),
+        "high": (0.36, 0.90)
+    },
+    "change_bucket": {
+        "small": (0.1, 4.0),
+        "medium": (4.1, 10.0),
+        "large": (10.1, 25.0)
+    },
+    "measurement_bucket": {
+        "low": (0.0, 0.50), "medium": (0.51, 0.80), "high": (0.81, 1.0)
+    },
+    "lots_bucket": {
+        "small": (1, 3), "medium": (4, 10), "large": (11, 50)
+    },
+    "rework_bucket": {
+        "low": (0.0, 2.0), "medium": (2.1, 8.0), "high": (8.1, 25.0)
+    },
+    "window_bucket": {
+        "short": (1, 12), "medium": (13, 48), "long": (49, 168)
+    }
+}
+
+# Which metric each bucket is computed from (change_bucket uses |change_magnitude|).
+BUCKET_METRICS = {
+    "yield_bucket": "yield_pct",
+    "variance_bucket": "metric_variance",
+    "change_bucket": "change_magnitude",
+    "measurement_bucket": "measurement_confidence",
+    "lots_bucket": "affected_lot_count",
+    "rework_bucket": "rework_rate",
+    "window_bucket": "time_window_hours",
+}
+
+PERSIST_PATH = "requests_responses.jsonl"
+# "dedup": response sub-objects are stored once in <log>.blobs.jsonl and referenced by hash
+# (see app/blobstore.py); "plain": full responses inline. Dedup is opt-in: on server start
+# it also rewrites an existing plain log in place, which plain-log readers can't follow.
+PERSIST_MODE = "plain"
+
+# Triage scheduler (app/scheduler.py)
+SCHEDULER_WORKERS = 4
+SCHEDULER_MAX_QUEUE_DEPTH = 64  # waiting submissions before load shedding
+SCHEDULER_CLIENT_RATE_PER_S = 0.5  # token refill per client
+SCHEDULER_CLIENT_BURST = 5
+SCHEDULER_RETRY_AFTER_S = 5.0  # suggested back-off for shed submissions
+
+# Parquet export (app/export.py)
+EXPORT_DIR = "exports/parquet"
+EXPORT_ROW_GROUP_SIZE = 50_000
+EXPORT_MAX_OPEN_WRITERS = 32  # partitions with an open file at once
+EXPORT_BUFFER_ROWS = 200_000  # rows buffered across all partitions before the fullest is flushed
+
+# Feedback-learned similarity weights (app/feedback.py)
+FEEDBACK_DB_PATH = "feedback.sqlite3"
+FEEDBACK_LEARNING_RATE = 0.1
+FEEDBACK_WEIGHT_MAX = 5.0
+
+# Near-duplicate cases (app/neardup.py): MinHash/LSH over signals + context + resolution words
+NEARDUP_NUM_PERM = 64
+NEARDUP_BANDS = 16  # 4 rows per band: pairs at Jaccard 0.7 become candidates ~99% of the time
+NEARDUP_THRESHOLD = 0.7  # estimated Jaccard to count as the same case
+NEARDUP_OVERSAMPLE = 4  # similar-case candidates fetched per shown slot before collapsing
+
+# Log replay (app/replay.py)
+REPLAY_WORKERS = 4
+REPLAY_CHUNK_SIZE = 200  # records per pool task
+
+# Incident-store backends (app/incident_store.py). None = in-process corpus search only;
+# otherwise store specs federated per query: "memory", "disk[:DIR]", "http://host:port".
+INCIDENT_STORES = None
+INCIDENT_INDEX_DIR = "app/data/incident_index"
+INCIDENT_HTTP_PORT = 8765
+FEDERATION_TIMEOUT_S = 0.5  # per store, per query
+FEDERATION_HEDGE_QUANTILE = 0.9  # hedge an attempt slower than this quantile of recent ones
+FEDERATION_HEDGE_MIN_S = 0.02
+FEDERATION_WORKERS = 16
+
+# Batch escalation packets (app/packets.py)
+PACKET_WORKERS = 4
+PACKET_CHUNK_SIZE = 250  # investigations per pool task
+
+# Raw measurement-file intake (app/measurements.py)
+MEASUREMENT_CHUNK_ROWS = 500_000  # rows reduced per chunk
+
+CASES_PATH = "app/data/realistic_cases.json"
+
+# Retrieval over the case corpus.
+# RETRIEVAL_WINDOW_DAYS: only cases created within N days before the intake timestamp
+#   are considered (None = no hard time filter).
+# RECENCY_HALF_LIFE_DAYS: a case this many days older than the intake counts half as much
+#   when ranking (None = no recency weighting).
+RETRIEVAL_WINDOW_DAYS = None
+RECENCY_HALF_LIFE_DAYS = 90.0
+SIMILAR_TOP_K = 3
+# Paging past the top-k: the ranked ids of up to SIMILAR_RANKED_LIMIT cases are cached per
+# response (app/cursors.py) and shown SIMILAR_PAGE_SIZE at a time.
+SIMILAR_RANKED_LIMIT = 200
+SIMILAR_PAGE_SIZE = 10
+SIMILAR_CURSOR_TTL_S = 1800.0  # since last page read
+SIMILAR_CURSOR_MAX_ENTRIES = 2000
+
+# Decision table for next checks (hot-reloaded when the file changes).
+NEXT_CHECK_RULES_PATH = "app/data/next_check_rules.json"
+
+# Streaming per-segment drift/shift detection over persisted submissions.
+DRIFT_CHECKPOINT_PATH = "drift_state.json"
+DRIFT_METRICS = ("yield_pct", "rework_rate", "metric_variance")
+DRIFT_EWMA_ALPHA = 0.2
+DRIFT_CUSUM_K = 0.5  # slack, in standard deviations
+DRIFT_CUSUM_H = 5.0  # alarm threshold, in standard deviations
+DRIFT_EWMA_Z = 3.0
+DRIFT_MIN_SAMPLES = 5
+
+# Sharded corpus search (process-pool fan-out). Used once the corpus reaches
+# SHARDED_SEARCH_MIN_CASES; smaller corpora are scored in-process.
+SHARD_BY = "site"  # "site" | "tool_group"
+SHARD_WORKERS = 4
+SHARDED_SEARCH_MIN_CASES = 50_000
+
+# Bulk import of historical incident exports (python -m app.ingest).
+INGEST_CHUNK_SIZE = 5000
+INGEST_WORKERS = 4
+
+# Per-session investigation history (ring buffer in memory, older entries spilled to SQLite).
+HISTORY_RING_SIZE = 5
+HISTORY_DB_PATH = "session_history.sqlite3"
+HISTORY_MEMORY_BUDGET_BYTES = 32 * 1024 * 1024  # server-wide, across all sessions
+HISTORY_RETENTION_DAYS = 7
+HISTORY_PURGE_INTERVAL_S = 3600.0  # spilled entries past retention are purged at most this often
+
+# Cross-site clustering of recent submissions (app/clusters.py)
+CLUSTER_CHECKPOINT_PATH = "cluster_state.json"
+CLUSTER_K = 16
+CLUSTER_BATCH_SIZE = 256  # log records per mini-batch
+CLUSTER_MAX_COUNT = 500.0  # cap on a center's count: older submissions fade out
+CLUSTER_SIGNAL_WEIGHT = 1.0  # per signal-bucket one-hot, relative to a z-scored metric
+CLUSTER_WINDOW_HOURS = 24.0
+CLUSTER_MAX_DISTANCE = 0.15  # RMS feature distance to the center for a submission to count
+CLUSTER_RESEED_DISTANCE = 0.5  # farther than this from every center: start a new cluster
+CLUSTER_MIN_MEMBERS = 3
+CLUSTER_MIN_SPAN = 2  # distinct sites or tool groups
+CLUSTER_POLL_S = 5.0
+
+# Per-segment metric baselines (app/baselines.py)
+BASELINE_METRICS = ("yield_pct", "rework_rate", "metric_variance")
+BASELINE_WINDOW = 200  # most recent values per segment and metric
+BASELINE_MIN_SAMPLES = 5  # fewer: fall back to the next roll-up level
+BASELINE_IQR_K = 1.5  # Tukey fences
+BASELINE_REFRESH_S = 10.0  # at most one incremental log tail per interval
@@ -0,0 +1,193 @@
+# app/corpus.py
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import pickle
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import CASES_PATH
+from app.records import CONTEXT_FIELDS, SIGNAL_VOCABULARIES, CaseTable, to_epoch
+from app.schema import METRIC_ORDER
+
+
+class CaseCorpus:
+    """
+    Historical cases kept sorted by created_at, stored column-wise in a CaseTable.
+
+    - times: ascending epoch seconds (typed array -> bisect time index)
+    - metrics: (n, len(METRIC_ORDER)) float view, NaN where a metric is missing
+    - context: per-field uint8 vocabulary codes (see records.encode_context)
+    - signals: per-bucket uint8 codes (see records.SIGNAL_VOCABULARIES)
+    All columns share the same row order, so a time range is a contiguous slice.
+    Rows become dicts only through case(i) / iter_cases().
+    """
+
+    def __init__(self, cases: Iterable[Dict[str, Any]], metric_scale: Optional[np.ndarray] = None) -> None:
+        self.table = CaseTable.from_cases(cases)
+        self._sort_by_time()
+        # Shards pass the full corpus' scale so their scores stay comparable when merged.
+        self.metric_scale = metric_scale if metric_scale is not None else self._metric_scale()
+        self._index_ids()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    # ---------- zero-copy column views ----------
+    @property
+    def times(self) -> Sequence[float]:
+        return self.table.created_at
+
+    @property
+    def time_array(self) -> np.ndarray:
+        return self.table.times_view()
+
+    @property
+    def metrics(self) -> np.ndarray:
+        return self.table.metrics_view()
+
+    @property
+    def context(self) -> Dict[str, np.ndarray]:
+        return {f: self.table.context_view(f) for f in CONTEXT_FIELDS}
+
+    @property
+    def signals(self) -> Dict[str, np.ndarray]:
+        return {k: self.table.signal_view(k) for k in SIGNAL_VOCABULARIES}
+
+    @property
+    def case_ids(self) -> Sequence[str]:
+        return self.table.case_ids
+
+    # ---------- rows ----------
+    def case(self, i: int) -> Dict[str, Any]:
+        return self.table.row(i)
+
+    def iter_cases(self) -> Iterator[Dict[str, Any]]:
+        return self.table.iter_rows()
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        i = self._row_by_id.get(case_id)
+        return None if i is None else self.table.row(i)
+
+    # ---------- index maintenance ----------
+    def _sort_by_time(self) -> None:
+        times = self.table.times_view()
+        if times.size > 1 and not bool(np.all(times[1:] >= times[:-1])):
+            order = np.argsort(times, kind="stable")
+            del times  # release the buffer export before the columns are rebuilt
+            self.table.reorder(order)
+
+    def _index_ids(self) -> None:
+        self._row_by_id = {cid: i for i, cid in enumerate(self.table.case_ids)}
+
+    def _metric_scale(self) -> np.ndarray:
+        """Per-metric spread used to normalize distances (std, floored so constants don't divide by 0)."""
+        if len(self) == 0:
+            return np.ones(len(METRIC_ORDER))
+        with np.errstate(invalid="ignore"):
+            std = np.nanstd(self.metrics, axis=0)
+        return np.where(np.isfinite(std) & (std > 1e-9), std, 1.0)
+
+    def extend(self, cases: List[Dict[str, Any]]) -> None:
+        """Add new cases to the time-sorted index in place, without re-reading existing rows."""
+        if not cases:
+            return
+        new = sorted(cases, key=lambda c: to_epoch(c["created_at"]))
+        last = self.table.created_at[-1] if len(self) else float("-inf")
+        self.table.extend(new)
+        if to_epoch(new[0]["created_at"]) < last:
+            # Backfill older than the newest indexed case: restore time order.
+            self._sort_by_time()
+        self.metric_scale = self._metric_scale()
+        self._index_ids()
+
+    def time_slice(self, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+        """Rows with start <= created_at <= end (either bound may be None)."""
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self) if end is None else bisect.bisect_right(self.times, end)
+        return slice(lo, max(lo, hi))
+
+
+def ingested_path_for(path: str) -> str:
+    """app/data/realistic_cases.json -> app/data/realistic_cases.ingested.jsonl (append-only import store)."""
+    return os.path.splitext(path)[0] + ".ingested.jsonl"
+
+
+def read_cases(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the case corpus: the JSON list at `path` plus any cases appended to its
+    ingested JSONL store. Missing files -> empty corpus.
+    """
+    cases: List[Dict[str, Any]] = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cases.extend(json.load(f))
+    ingested = ingested_path_for(path)
+    if os.path.exists(ingested):
+        with open(ingested, "r", encoding="utf-8") as f:
+            cases.extend(json.loads(line) for line in f if line.strip())
+    return cases
+
+
+# Bump when CaseCorpus' attributes change so stale snapshots are rebuilt.
+SNAPSHOT_VERSION = 2
+
+
+def snapshot_path_for(path: str) -> str:
+    """app/data/realistic_cases.json -> app/data/realistic_cases.snapshot.pkl"""
+    return os.path.splitext(path)[0] + ".snapshot.pkl"
+
+
+def save_snapshot(corpus: CaseCorpus, path: str) -> None:
+    """Pickle the built corpus (sorted cases + NumPy index) so later processes skip JSON parsing."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": SNAPSHOT_VERSION, "corpus": corpus}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str, source_path: str) -> Optional[CaseCorpus]:
+    """Snapshot if it exists, matches SNAPSHOT_VERSION and is not older than the source files."""
+    if not os.path.exists(path):
+        return None
+    for src in (source_path, ingested_path_for(source_path)):
+        if os.path.exists(src) and os.path.getmtime(path) < os.path.getmtime(src):
+            return None
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != SNAPSHOT_VERSION:
+        return None
+    return state["corpus"]
+
+
+def build_snapshot(path: str = CASES_PATH) -> CaseCorpus:
+    corpus = CaseCorpus(read_cases(path))
+    save_snapshot(corpus, snapshot_path_for(path))
+    return corpus
+
+
+@lru_cache(maxsize=None)
+def load_corpus(path: str = CASES_PATH) -> CaseCorpus:
+    """Load the indexed corpus once per process: prebuilt snapshot first, JSON (+ snapshot write) otherwise."""
+    corpus = load_snapshot(snapshot_path_for(path), path)
+    if corpus is not None:
+        return corpus
+    corpus = CaseCorpus(read_cases(path))
+    if len(corpus):
+        try:
+            save_snapshot(corpus, snapshot_path_for(path))
+        except OSError:
+            pass  # read-only deploys still work, just without the fast path
+    return corpus
+
+
+if __name__ == "__main__":
+    built = build_snapshot(CASES_PATH)
+    print(f"Wrote {snapshot_path_for(CASES_PATH)} ({len(built)} cases)")
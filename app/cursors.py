@@ -0,0 +1,78 @@
+# app/cursors.py
+"""
+Server-side cache of ranked result lists behind opaque cursors.
+
+A response carries only a cursor token and the total count. Later pages slice the cached
+list by offset, so paging never re-runs retrieval. Entries expire SIMILAR_CURSOR_TTL_S after
+they were last read. At most SIMILAR_CURSOR_MAX_ENTRIES are kept, and the least recently
+read entry is evicted first.
+"""
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import SIMILAR_CURSOR_TTL_S, SIMILAR_CURSOR_MAX_ENTRIES
+
+
+class _Entry:
+    __slots__ = ("items", "context", "expires")
+
+    def __init__(self, items: List[Any], context: Dict[str, Any], expires: float) -> None:
+        self.items = items
+        self.context = context
+        self.expires = expires
+
+
+class CursorCache:
+    """cursor -> (ranked items, context) with TTL + LRU eviction. Thread-safe."""
+
+    def __init__(self, ttl_s: float = SIMILAR_CURSOR_TTL_S, max_entries: int = SIMILAR_CURSOR_MAX_ENTRIES) -> None:
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, items: List[Any], context: Optional[Dict[str, Any]] = None) -> str:
+        """Cache a ranked list; returns its cursor."""
+        cursor = secrets.token_urlsafe(12)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[cursor] = _Entry(items, context or {}, now + self.ttl_s)
+        return cursor
+
+    def page(self, cursor: str, offset: int, limit: int) -> Optional[Tuple[List[Any], int, Dict[str, Any]]]:
+        """(items[offset:offset + limit], total, context), or None if the cursor is unknown/expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cursor)
+            if entry is None or entry.expires <= now:
+                self._entries.pop(cursor, None)
+                return None
+            entry.expires = now + self.ttl_s
+            self._entries.move_to_end(cursor)
+        return entry.items[offset:offset + limit], len(entry.items), entry.context
+
+    def _evict_expired(self, now: float) -> None:
+        # Entries are ordered by last read and every read extends the TTL by the same amount,
+        # so expiry times increase along the dict: stop at the first live one.
+        while self._entries:
+            cursor, entry = next(iter(self._entries.items()))
+            if entry.expires > now:
+                break
+            del self._entries[cursor]
+
+
+@lru_cache(maxsize=None)
+def get_cursor_cache() -> CursorCache:
+    return CursorCache()
@@ -0,0 +1,251 @@
+# app/drift.py
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    SITES,
+    TOOL_GROUPS,
+    PROCESS_STEPS,
+    PERSIST_PATH,
+    DRIFT_CHECKPOINT_PATH,
+    DRIFT_METRICS,
+    DRIFT_EWMA_ALPHA,
+    DRIFT_CUSUM_K,
+    DRIFT_CUSUM_H,
+    DRIFT_EWMA_Z,
+    DRIFT_MIN_SAMPLES,
+)
+
+# Segment dimensions and their dropdown options (index 0 is the placeholder).
+SEGMENT_DIMENSIONS = {"site": SITES, "tool_group": TOOL_GROUPS, "process_step": PROCESS_STEPS}
+ALL_SEGMENT = "all"
+
+
+class RunningStats:
+    """Welford mean/variance + EWMA + two-sided standardized CUSUM. O(1) per update."""
+
+    __slots__ = ("n", "mean", "m2", "ewma", "cusum_pos", "cusum_neg")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma: Optional[float] = None
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def update(self, x: float) -> None:
+        # CUSUM runs against the baseline *before* this point is folded in.
+        std = self.std
+        if self.n >= DRIFT_MIN_SAMPLES and std > 0:
+            s = (x - self.mean) / std
+            self.cusum_pos = max(0.0, self.cusum_pos + s - DRIFT_CUSUM_K)
+            self.cusum_neg = max(0.0, self.cusum_neg - s - DRIFT_CUSUM_K)
+
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.ewma = x if self.ewma is None else DRIFT_EWMA_ALPHA * x + (1 - DRIFT_EWMA_ALPHA) * self.ewma
+
+    def ewma_z(self) -> float:
+        """EWMA distance from the long-run mean, in EWMA standard errors."""
+        std = self.std
+        if self.ewma is None or std <= 0:
+            return 0.0
+        se = std * math.sqrt(DRIFT_EWMA_ALPHA / (2 - DRIFT_EWMA_ALPHA))
+        return (self.ewma - self.mean) / se
+
+    def shifted(self) -> bool:
+        if self.n < DRIFT_MIN_SAMPLES:
+            return False
+        return (
+            self.cusum_pos > DRIFT_CUSUM_H
+            or self.cusum_neg > DRIFT_CUSUM_H
+            or abs(self.ewma_z()) > DRIFT_EWMA_Z
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RunningStats":
+        rs = cls()
+        for k in cls.__slots__:
+            setattr(rs, k, d.get(k, getattr(rs, k)))
+        return rs
+
+
+def segment_keys(payload: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(dimension, value) segments a submission belongs to; placeholders are skipped."""
+    keys = [(ALL_SEGMENT, ALL_SEGMENT)]
+    for dim, options in SEGMENT_DIMENSIONS.items():
+        v = payload.get(dim)
+        if v and v != options[0]:
+            keys.append((dim, v))
+    return keys
+
+
+class DriftMonitor:
+    """
+    Per-segment online statistics over persisted submissions.
+
+    State: {"dim=value": {metric: RunningStats}} plus the byte offset of the request log
+    that has been folded in, so a restart resumes from the checkpoint and only replays the
+    log tail written after it.
+    """
+
+    def __init__(self) -> None:
+        self.segments: Dict[str, Dict[str, RunningStats]] = {}
+        self.log_offset = 0
+        self._lock = threading.RLock()
+
+    # ---------- updates ----------
+    def update(self, payload: Dict[str, Any]) -> None:
+        metrics = payload.get("metrics") or {}
+        with self._lock:
+            for dim, value in segment_keys(payload):
+                seg = self.segments.setdefault(f"{dim}={value}", {})
+                for m in DRIFT_METRICS:
+                    x = metrics.get(m)
+                    if x is None:
+                        continue
+                    seg.setdefault(m, RunningStats()).update(float(x))
+
+    def catch_up(self, log_path: str) -> int:
+        """Fold in log records appended after log_offset. Returns the number of records read."""
+        if not os.path.exists(log_path):
+            return 0
+        if os.path.getsize(log_path) < self.log_offset:
+            # Log was truncated/rotated; the checkpoint no longer lines up with it.
+            self.log_offset = 0
+        n = 0
+        with open(log_path, "rb") as f:
+            f.seek(self.log_offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                self.log_offset += len(raw)
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                self.update(record.get("request") or {})
+                n += 1
+        return n
+
+    def observe(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold in a new submission and return its scope assessment."""
+        with self._lock:
+            self.update(payload)
+            return self.assess(payload)
+
+    def advance(self, nbytes: int) -> None:
+        """Mark a just-appended log record (already observed) as folded in."""
+        with self._lock:
+            self.log_offset += nbytes
+
+    def rebase_log(self, rewrite: Callable[[int], int]) -> None:
+        """Run a log rewrite that maps log_offset to the matching offset in the new file."""
+        with self._lock:
+            self.log_offset = rewrite(self.log_offset)
+
+    # ---------- assessment ----------
+    def assess(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Localized vs systemic, based on which segments currently show a shift:
+          - systemic: another segment in the same dimension is shifted too
+          - localized: only this submission's segment(s) are shifted
+          - other_segments_shifted: this submission's segments are not shifted, others are
+          - no_shift_detected: no segment is shifted
+        """
+        own = dict(segment_keys(payload))
+        shifted: List[str] = []
+        with self._lock:
+            for key, stats in self.segments.items():
+                if any(s.shifted() for s in stats.values()):
+                    shifted.append(key)
+            sampled = sum(
+                1 for dim, v in own.items()
+                if any(s.n >= DRIFT_MIN_SAMPLES for s in self.segments.get(f"{dim}={v}", {}).values())
+            )
+
+        if sampled == 0:
+            return {
+                "scope": "insufficient_data",
+                "shifted_segments": [],
+                "detail": f"Fewer than {DRIFT_MIN_SAMPLES} prior submissions to compare against.",
+            }
+
+        own_keys = {f"{d}={v}" for d, v in own.items() if d != ALL_SEGMENT}
+        others = sorted(k for k in shifted if k not in own_keys and not k.startswith(ALL_SEGMENT))
+        own_shifted = sorted(k for k in shifted if k in own_keys)
+        other_dims = {k.split("=", 1)[0] for k in others}
+        own_dims = {k.split("=", 1)[0] for k in own_shifted}
+
+        if own_dims & other_dims:
+            scope = "systemic"
+            detail = "Shift also present in other segments: " + ", ".join(others) + "."
+        elif own_shifted:
+            scope = "localized"
+            detail = "Shift confined to: " + ", ".join(own_shifted) + "."
+        elif shifted:
+            scope = "other_segments_shifted"
+            detail = "This submission's segments are in line; shifted elsewhere: " + ", ".join(sorted(shifted)) + "."
+        else:
+            scope = "no_shift_detected"
+            detail = "No segment currently deviates from its running baseline."
+        return {"scope": scope, "shifted_segments": sorted(shifted), "detail": detail}
+
+    # ---------- checkpointing ----------
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "log_offset": self.log_offset,
+                "segments": {
+                    key: {m: s.to_dict() for m, s in stats.items()}
+                    for key, stats in self.segments.items()
+                },
+            }
+
+    def save(self, path: str) -> None:
+        """Atomic checkpoint (write temp file, then rename)."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftMonitor":
+        mon = cls()
+        if not os.path.exists(path):
+            return mon
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        mon.log_offset = int(state.get("log_offset", 0))
+        mon.segments = {
+            key: {m: RunningStats.from_dict(d) for m, d in stats.items()}
+            for key, stats in state.get("segments", {}).items()
+        }
+        return mon
+
+
+@lru_cache(maxsize=None)
+def get_monitor(
+    checkpoint_path: str = DRIFT_CHECKPOINT_PATH, log_path: str = PERSIST_PATH
+) -> DriftMonitor:
+    """Process-wide monitor: checkpoint + replay of the log tail written since."""
+    mon = DriftMonitor.load(checkpoint_path)
+    if mon.catch_up(log_path):
+        mon.save(checkpoint_path)
+    return mon
@@ -0,0 +1,284 @@
+# app/export.py
+"""
+Streaming export of the request/response log to Parquet, partitioned by date and site.
+
+  python -m app.export [requests_responses.jsonl] [--out exports/parquet] [--row-group-size N] [--buffer-rows N] [--full]
+
+Layout (Hive-style, readable with pyarrow.dataset / pandas / Spark):
+
+  <out>/date=2026-10-19/site=Plant-A/part-<run>-<n>.parquet
+  <out>/_watermark.json      {"last_ts": "...", "records": <total exported>}
+
+Records are streamed from the log (plain or dedup form) and buffered per partition. A
+partition's buffer is flushed as one row group once it reaches the row-group size, and the
+fullest buffer is flushed whenever all partitions together hold EXPORT_BUFFER_ROWS rows, so
+memory stays bounded by that budget for any log size and partition count. Incremental runs skip
+every record whose "ts" is not newer than the watermark, checking it without a full JSON
+parse. Parts are written under dot-prefixed names, which readers ignore. They are renamed
+and the watermark advanced only once the run completes, so an interrupted run can be re-run
+without duplicating rows.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import re
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.blobstore import blob_path_for, get_blob_store, rehydrate
+from app.config import SITES, PERSIST_PATH, EXPORT_DIR, EXPORT_ROW_GROUP_SIZE, EXPORT_MAX_OPEN_WRITERS, EXPORT_BUFFER_ROWS
+from app.schema import INT_METRICS, METRIC_ORDER
+
+WATERMARK_FILE = "_watermark.json"
+PARTITION_KEYS = ("date", "site")
+
+_DICT = pa.dictionary(pa.int16(), pa.string())
+# Partition columns live in the directory names, not in the files.
+SCHEMA = pa.schema(
+    [
+        ("ts", pa.timestamp("us")),
+        ("response_id", pa.string()),
+        ("tool_group", _DICT),
+        ("process_step", _DICT),
+        ("severity", _DICT),
+        ("metrics_input_mode", _DICT),
+        ("anomaly_timestamp", pa.timestamp("us")),
+        ("anomaly_summary", pa.string()),
+        *[(m, pa.int64() if m in INT_METRICS else pa.float64()) for m in METRIC_ORDER],
+        ("similar_case_ids", pa.list_(pa.string())),
+        ("top_similarity", _DICT),
+        ("no_strong_match", pa.bool_()),
+        ("next_check_categories", pa.list_(_DICT)),
+        ("scope", _DICT),
+        ("cross_site_cluster", pa.int32()),
+    ]
+)
+DICTIONARY_COLUMNS = [f.name for f in SCHEMA if pa.types.is_dictionary(f.type) or f.name == "next_check_categories"]
+
+# Log lines start with {"ts": "<iso>", ... (see main.respond_and_persist).
+_TS_PREFIX = re.compile(r'^\{"ts":\s*"([^"]+)"')
+
+
+def _parse_ts(value: Optional[str]) -> Optional[dt.datetime]:
+    if not value:
+        return None
+    try:
+        parsed = dt.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Naive timestamps (intake form, log ts) are kept as wall time; aware ones go to UTC.
+    return parsed.astimezone(dt.timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def flatten_record(record: Dict[str, Any]) -> Tuple[Tuple[str, str], Dict[str, Any]]:
+    """Log record -> ((date, site) partition, row dict matching SCHEMA)."""
+    request = record.get("request") or {}
+    response = record.get("response") or {}
+    metrics = request.get("metrics") or {}
+    ts = _parse_ts(record.get("ts"))
+    similar = response.get("similar_cases") or []
+    row = {
+        "ts": ts,
+        "response_id": record.get("response_id"),
+        "tool_group": request.get("tool_group"),
+        "process_step": request.get("process_step"),
+        "severity": request.get("severity"),
+        "metrics_input_mode": request.get("metrics_input_mode"),
+        "anomaly_timestamp": _parse_ts(request.get("timestamp")),
+        "anomaly_summary": request.get("anomaly_summary"),
+        "similar_case_ids": [c["case_id"] for c in similar if c.get("case_id")],
+        "top_similarity": similar[0].get("similarity") if similar else None,
+        "no_strong_match": bool(response.get("no_strong_match_note")),
+        "next_check_categories": [c.get("category") for c in response.get("next_checks") or []],
+        "scope": (response.get("scope_assessment") or {}).get("scope"),
+        "cross_site_cluster": (response.get("cross_site_cluster") or {}).get("cluster"),
+    }
+    for m in METRIC_ORDER:
+        v = metrics.get(m)
+        # Counts logged from JSON input can be fractional (5.7 lots): round, don't truncate.
+        row[m] = None if v is None else (round(float(v)) if m in INT_METRICS else float(v))
+    site = request.get("site")
+    partition = (ts.date().isoformat() if ts else "unknown", site if site and site != SITES[0] else "unknown")
+    return partition, row
+
+
+def iter_new_records(path: str, after_ts: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Rehydrated log records with ts > after_ts. Older lines are skipped on their ts prefix alone."""
+    store = get_blob_store(blob_path_for(path))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if after_ts is not None:
+                m = _TS_PREFIX.match(line)
+                if m and m.group(1) <= after_ts:
+                    continue
+            record = json.loads(line)
+            if after_ts is not None and (record.get("ts") or "") <= after_ts:
+                continue
+            if "response" in record:
+                record["response"] = rehydrate(record["response"], store)
+            yield record
+
+
+def _partition_dir(out_dir: str, partition: Tuple[str, str]) -> str:
+    # URI-escaped, as Hive does and pyarrow.dataset decodes: a "/" in a value can't add a level.
+    return os.path.join(out_dir, *(f"{k}={quote(v, safe='')}" for k, v in zip(PARTITION_KEYS, partition)))
+
+
+class PartitionedWriter:
+    """
+    Per-partition row buffers -> row groups; at most buffer_rows rows buffered in total and at
+    most max_open Parquet writers open at once.
+    """
+
+    def __init__(self, out_dir: str, row_group_size: int, max_open: int, buffer_rows: int = EXPORT_BUFFER_ROWS) -> None:
+        self.out_dir = out_dir
+        self.row_group_size = row_group_size
+        self.max_open = max_open
+        self.buffer_rows = max(buffer_rows, 1)
+        self.run_id = dt.datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.buffers: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.writers: "OrderedDict[Tuple[str, str], pq.ParquetWriter]" = OrderedDict()
+        self.pending: List[str] = []  # dot-prefixed part files written this run
+        self.buffered = 0
+        self.rows = 0
+        self.row_groups = 0
+
+    def add(self, partition: Tuple[str, str], row: Dict[str, Any]) -> None:
+        buf = self.buffers.setdefault(partition, [])
+        buf.append(row)
+        self.buffered += 1
+        self.rows += 1
+        if len(buf) >= self.row_group_size:
+            self._flush(partition)
+        elif self.buffered >= self.buffer_rows:
+            # Global budget: flush the fullest buffer (fewest, largest row groups).
+            self._flush(max(self.buffers, key=lambda p: len(self.buffers[p])))
+
+    def _writer(self, partition: Tuple[str, str]) -> pq.ParquetWriter:
+        writer = self.writers.get(partition)
+        if writer is not None:
+            self.writers.move_to_end(partition)
+            return writer
+        if len(self.writers) >= self.max_open:
+            _, oldest = self.writers.popitem(last=False)
+            oldest.close()
+        directory = _partition_dir(self.out_dir, partition)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f".part-{self.run_id}-{len(self.pending)}.parquet")
+        self.pending.append(path)
+        writer = pq.ParquetWriter(path, SCHEMA, compression="zstd", use_dictionary=DICTIONARY_COLUMNS)
+        self.writers[partition] = writer
+        return writer
+
+    def _flush(self, partition: Tuple[str, str]) -> None:
+        rows = self.buffers.pop(partition, None)
+        if not rows:
+            return
+        self.buffered -= len(rows)
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        self._writer(partition).write_table(table, row_group_size=self.row_group_size)
+        self.row_groups += 1
+
+    def close(self) -> List[str]:
+        """Flush everything, close writers and publish the part files. Returns their final paths."""
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+        published = []
+        for path in self.pending:
+            final = os.path.join(os.path.dirname(path), os.path.basename(path)[1:])
+            os.replace(path, final)
+            published.append(final)
+        return published
+
+
+def read_watermark(out_dir: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {"last_ts": None, "records": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_watermark(out_dir: str, watermark: Dict[str, Any]) -> None:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(watermark, f)
+    os.replace(tmp, path)
+
+
+def export_log(
+    path: str = PERSIST_PATH,
+    out_dir: str = EXPORT_DIR,
+    *,
+    row_group_size: int = EXPORT_ROW_GROUP_SIZE,
+    max_open_writers: int = EXPORT_MAX_OPEN_WRITERS,
+    buffer_rows: int = EXPORT_BUFFER_ROWS,
+    incremental: bool = True,
+) -> Dict[str, Any]:
+    """Export records newer than the watermark (all records if not incremental). Returns a report."""
+    os.makedirs(out_dir, exist_ok=True)
+    watermark = read_watermark(out_dir) if incremental else {"last_ts": None, "records": 0}
+    writer = PartitionedWriter(out_dir, row_group_size, max_open_writers, buffer_rows)
+    last_ts = watermark["last_ts"]
+
+    try:
+        for record in iter_new_records(path, watermark["last_ts"]):
+            partition, row = flatten_record(record)
+            writer.add(partition, row)
+            ts = record.get("ts")
+            if ts and (last_ts is None or ts > last_ts):
+                last_ts = ts
+    except BaseException:
+        for w in writer.writers.values():
+            w.close()
+        for p in writer.pending:
+            if os.path.exists(p):
+                os.remove(p)
+        raise
+
+    files = writer.close()
+    new_watermark = {"last_ts": last_ts, "records": watermark["records"] + writer.rows}
+    write_watermark(out_dir, new_watermark)
+    return {"rows": writer.rows, "row_groups": writer.row_groups, "files": files, "watermark": new_watermark}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=PERSIST_PATH)
+    parser.add_argument("--out", default=EXPORT_DIR)
+    parser.add_argument("--row-group-size", type=int, default=EXPORT_ROW_GROUP_SIZE)
+    parser.add_argument("--max-open-writers", type=int, default=EXPORT_MAX_OPEN_WRITERS)
+    parser.add_argument("--buffer-rows", type=int, default=EXPORT_BUFFER_ROWS, help="rows buffered across all partitions")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and export everything (into an empty --out)")
+    args = parser.parse_args(argv)
+
+    report = export_log(
+        args.path,
+        args.out,
+        row_group_size=args.row_group_size,
+        max_open_writers=args.max_open_writers,
+        buffer_rows=args.buffer_rows,
+        incremental=not args.full,
+    )
+    print(
+        f"rows={report['rows']} row_groups={report['row_groups']} files={len(report['files'])} "
+        f"watermark={report['watermark']['last_ts']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# app/feedback.py
+"""
+Engineer feedback on responses and online per-feature similarity weights.
+
+Features (FEATURE_NAMES): each metric, each context field and each bucketed signal. The
+retrieval score (retrieval.score_slice) weights
+  - metrics inside the z-distance:   exp(-0.5 * sum w_m z_m^2 / sum w_m)
+  - context + signals in the categorical agreement: sum w_f match_f / sum w_f
+With DEFAULT_WEIGHTS (metrics/context 1, signals 0) this is exactly the unweighted score.
+
+When a similar case is marked as having helped, the other cases shown with it are the
+negatives, and each weight moves by lr * (agreement on the helpful case - mean agreement on
+the others). That is O(features x shown cases) per click. Every update is stored as a new
+version in SQLite and swapped in as the live weight array, so the next search uses it with
+no reindex. rollback(version) swaps an older array back in.
+
+  python -m app.feedback versions | rollback <version> | checks
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import warnings
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.buckets import derive_signals, metrics_matrix
+from app.config import (
+    BUCKET_RANGES,
+    FEEDBACK_DB_PATH,
+    FEEDBACK_LEARNING_RATE,
+    FEEDBACK_WEIGHT_MAX,
+)
+from app.records import CONTEXT_FIELDS
+from app.schema import METRIC_ORDER
+
+SIGNAL_FEATURES = tuple(BUCKET_RANGES)
+FEATURE_NAMES = (
+    *(f"metric:{m}" for m in METRIC_ORDER),
+    *(f"context:{f}" for f in CONTEXT_FIELDS),
+    *(f"signal:{b}" for b in SIGNAL_FEATURES),
+)
+METRIC_SLICE = slice(0, len(METRIC_ORDER))
+CONTEXT_INDEX = {f: len(METRIC_ORDER) + i for i, f in enumerate(CONTEXT_FIELDS)}
+SIGNAL_INDEX = {b: len(METRIC_ORDER) + len(CONTEXT_FIELDS) + i for i, b in enumerate(SIGNAL_FEATURES)}
+
+ACTIVE_POLL_S = 1.0
+
+DEFAULT_WEIGHTS = np.array(
+    [1.0] * len(METRIC_ORDER) + [1.0] * len(CONTEXT_FIELDS) + [0.0] * len(SIGNAL_FEATURES),
+    dtype=np.float64,
+)
+
+
+def feature_agreement(payload: Dict[str, Any], cases: List[Dict[str, Any]], metric_scale: np.ndarray) -> np.ndarray:
+    """(len(cases), len(FEATURE_NAMES)) agreement in [0, 1]; NaN where a feature is undefined."""
+    from app.retrieval import query_vector, selected_context
+
+    out = np.full((len(cases), len(FEATURE_NAMES)), np.nan)
+    z = (metrics_matrix([c.get("metrics") or {} for c in cases]) - query_vector(payload)) / metric_scale
+    out[:, METRIC_SLICE] = np.exp(-0.5 * z * z)
+    for f, v in selected_context(payload).items():
+        out[:, CONTEXT_INDEX[f]] = [(c.get("context") or {}).get(f) == v for c in cases]
+    query_signals = derive_signals(payload.get("metrics") or {})
+    for b in SIGNAL_FEATURES:
+        if query_signals.get(b) is not None:
+            out[:, SIGNAL_INDEX[b]] = [(c.get("signals") or {}).get(b) == query_signals[b] for c in cases]
+    return out
+
+
+def pairwise_update(
+    weights: np.ndarray, agreement: np.ndarray, helpful: int, lr: float, w_max: float
+) -> np.ndarray:
+    """One ranking step: pull weights toward features where the helpful case beats the rest."""
+    others = np.delete(agreement, helpful, axis=0)
+    if others.shape[0] == 0:
+        return weights
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        delta = agreement[helpful] - np.nanmean(others, axis=0)
+    delta[~np.isfinite(delta)] = 0.0
+    return np.clip(weights + lr * delta, 0.0, w_max)
+
+
+class WeightStore:
+    """Feedback log + versioned weights (SQLite); the active version is held in memory."""
+
+    def __init__(self, db_path: str = FEEDBACK_DB_PATH) -> None:
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS feedback ("
+            " ts REAL NOT NULL, response_id TEXT NOT NULL, kind TEXT NOT NULL, item TEXT NOT NULL,"
+            " helpful INTEGER NOT NULL, detail TEXT, UNIQUE (response_id, kind, item));"
+            "CREATE TABLE IF NOT EXISTS weight_versions ("
+            " version INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, parent INTEGER,"
+            " weights TEXT NOT NULL, note TEXT);"
+            "CREATE TABLE IF NOT EXISTS weight_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        )
+        row = self.db.execute("SELECT value FROM weight_state WHERE key = 'active'").fetchone()
+        if row is None:
+            self.version = self._save_version(DEFAULT_WEIGHTS, None, "defaults")
+            self.weights = DEFAULT_WEIGHTS.copy()
+        else:
+            self.version = row[0]
+            self.weights = self.load_version(self.version)
+        self.weights.flags.writeable = False
+        self._checked = time.monotonic()
+
+    # ---------- versions ----------
+    def _save_version(self, weights: np.ndarray, parent: Optional[int], note: str) -> int:
+        cur = self.db.execute(
+            "INSERT INTO weight_versions (created, parent, weights, note) VALUES (?, ?, ?, ?)",
+            (time.time(), parent, json.dumps(dict(zip(FEATURE_NAMES, weights.tolist()))), note),
+        )
+        self.db.execute("INSERT OR REPLACE INTO weight_state VALUES ('active', ?)", (cur.lastrowid,))
+        self.db.commit()
+        return cur.lastrowid
+
+    def load_version(self, version: int) -> np.ndarray:
+        """Weights of a stored version (e.g. for a replay pinned to it)."""
+        row = self.db.execute("SELECT weights FROM weight_versions WHERE version = ?", (version,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown weight version {version}.")
+        stored = json.loads(row[0])
+        # Features added after the snapshot start from their defaults.
+        return np.array(
+            [stored.get(name, DEFAULT_WEIGHTS[i]) for i, name in enumerate(FEATURE_NAMES)], dtype=np.float64
+        )
+
+    def _activate(self, weights: np.ndarray, version: int) -> None:
+        weights.flags.writeable = False
+        # One reference swap: concurrent searches see either the old or the new array.
+        self.weights, self.version = weights, version
+
+    def current(self) -> Tuple[int, np.ndarray]:
+        """Live (version, weights). Picks up a rollback/update made by another process within ~1 s."""
+        now = time.monotonic()
+        if now - self._checked > ACTIVE_POLL_S:
+            with self.lock:
+                self._checked = now
+                row = self.db.execute("SELECT value FROM weight_state WHERE key = 'active'").fetchone()
+                if row and row[0] != self.version:
+                    self._activate(self.load_version(row[0]), row[0])
+        return self.version, self.weights
+
+    def rollback(self, version: int) -> None:
+        """Make an earlier version live again (later updates continue from it)."""
+        with self.lock:
+            weights = self.load_version(version)
+            self.db.execute("INSERT OR REPLACE INTO weight_state VALUES ('active', ?)", (version,))
+            self.db.commit()
+            self._activate(weights, version)
+
+    def versions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT version, created, parent, note, weights FROM weight_versions ORDER BY version DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"version": v, "created": c, "parent": p, "note": n, "active": v == self.version, "weights": json.loads(w)}
+            for v, c, p, n, w in rows
+        ]
+
+    # ---------- feedback ----------
+    def _insert_feedback(self, response_id: str, kind: str, item: str, helpful: bool, detail: Dict[str, Any]) -> bool:
+        """False if this exact feedback was already recorded (repeat clicks are ignored)."""
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO feedback VALUES (?, ?, ?, ?, ?, ?)",
+            (time.time(), response_id, kind, item, int(helpful), json.dumps(detail, ensure_ascii=False)),
+        )
+        return cur.rowcount == 1
+
+    def record_case_feedback(self, request: Dict[str, Any], response: Dict[str, Any], index: int) -> Optional[int]:
+        """
+        similar_cases[index] helped. Persists the feedback and, when it is a corpus case shown
+        alongside others, applies one weight update. Returns the new weight version, if any.
+        """
+        from app.corpus import load_corpus
+
+        shown = response.get("similar_cases") or []
+        response_id = (response.get("meta") or {}).get("response_id", "")
+        helpful_case = shown[index]
+        item = helpful_case.get("case_id") or f"#{index}"
+        corpus = load_corpus()
+        # Generic fallback references (no case_id) and cases gone from the corpus can't be scored.
+        cases = [corpus.get(c["case_id"]) if c.get("case_id") else None for c in shown]
+        with self.lock:
+            if not self._insert_feedback(response_id, "case", item, True, {"shown": [c.get("case_id") for c in shown]}):
+                return None
+            if None in cases or len(cases) < 2:
+                self.db.commit()
+                return None
+            agreement = feature_agreement(request, cases, corpus.metric_scale)
+            weights = pairwise_update(
+                self.weights, agreement, index, FEEDBACK_LEARNING_RATE, FEEDBACK_WEIGHT_MAX
+            )
+            version = self._save_version(weights, self.version, f"case {item} helped ({response_id})")
+            self._activate(weights, version)
+            return version
+
+    def record_check_feedback(self, response: Dict[str, Any], index: int) -> None:
+        """next_checks[index] helped (persisted for rules-table tuning; no weight update)."""
+        check = (response.get("next_checks") or [])[index]
+        response_id = (response.get("meta") or {}).get("response_id", "")
+        with self.lock:
+            self._insert_feedback(response_id, "check", check.get("check", f"#{index}"), True, check)
+            self.db.commit()
+
+    def check_feedback_counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT json_extract(detail, '$.category'), COUNT(*) FROM feedback"
+                " WHERE kind = 'check' AND helpful = 1 GROUP BY 1"
+            ).fetchall()
+        return dict(sorted(rows, key=lambda r: -r[1]))
+
+
+@lru_cache(maxsize=None)
+def get_weight_store(db_path: str = FEEDBACK_DB_PATH) -> WeightStore:
+    return WeightStore(db_path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    v = sub.add_parser("versions", help="list recent weight versions")
+    v.add_argument("--limit", type=int, default=10)
+    r = sub.add_parser("rollback", help="make a weight version live again")
+    r.add_argument("version", type=int)
+    sub.add_parser("checks", help="helpful-feedback counts per next-check category")
+    args = parser.parse_args(argv)
+
+    store = get_weight_store()
+    if args.cmd == "versions":
+        for row in store.versions(args.limit):
+            mark = "*" if row["active"] else " "
+            changed = {k: round(w, 3) for k, w in row["weights"].items() if w != DEFAULT_WEIGHTS[FEATURE_NAMES.index(k)]}
+            print(f"{mark} v{row['version']} (parent {row['parent']}) {row['note']}: {changed or 'defaults'}")
+    elif args.cmd == "rollback":
+        store.rollback(args.version)
+        print(f"active weights: v{args.version}")
+    else:
+        for category, n in store.check_feedback_counts().items():
+            print(f"{n:6d}  {category}")
+
+
+if __name__ == "__main__":
+    main()
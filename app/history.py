@@ -0,0 +1,187 @@
+# app/history.py
+"""
+Per-session investigation history with a server-wide memory budget.
+
+Each session keeps its latest HISTORY_RING_SIZE investigations in memory (as encoded JSON,
+so the byte count is exact); anything older is spilled to a shared SQLite store. The
+registry tracks every live session and, when the total in-memory bytes exceed
+HISTORY_MEMORY_BUDGET_BYTES, spills the oldest entries server-wide until it fits again.
+Spilled entries older than HISTORY_RETENTION_DAYS are purged at startup and then at most once
+per HISTORY_PURGE_INTERVAL_S, on the next add.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from app.config import (
+    HISTORY_DB_PATH,
+    HISTORY_RING_SIZE,
+    HISTORY_MEMORY_BUDGET_BYTES,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_PURGE_INTERVAL_S,
+)
+
+
+class Entry(NamedTuple):
+    seq: int
+    ts: float
+    label: str
+    blob: bytes  # {"request": ..., "response": ...} as UTF-8 JSON
+
+
+def entry_label(payload: Dict[str, Any], ts: float) -> str:
+    when = dt.datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+    return (
+        f"{when} · {payload.get('site')} / {payload.get('tool_group')} / "
+        f"{payload.get('process_step')} · {payload.get('severity')}"
+    )
+
+
+class HistoryRegistry:
+    """Server-wide bookkeeping: live sessions (weakly held), the spill store, and the RAM budget."""
+
+    def __init__(self, db_path: str = HISTORY_DB_PATH, budget_bytes: int = HISTORY_MEMORY_BUDGET_BYTES) -> None:
+        self.budget_bytes = budget_bytes
+        self.sessions: "weakref.WeakValueDictionary[str, SessionHistory]" = weakref.WeakValueDictionary()
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, ts REAL NOT NULL,"
+            " label TEXT NOT NULL, blob BLOB NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self.purged_at = float("-inf")
+        self.maybe_purge()
+
+    # ---------- spill store ----------
+    def spill(self, session_id: str, entry: Entry) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?)",
+                (session_id, entry.seq, entry.ts, entry.label, entry.blob),
+            )
+            self.db.commit()
+
+    def spilled_index(self, session_id: str) -> List[Entry]:
+        """Spilled entries without their blobs (for listing)."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT seq, ts, label FROM history WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [Entry(seq, ts, label, b"") for seq, ts, label in rows]
+
+    def load_spilled(self, session_id: str, seq: int) -> Optional[bytes]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT blob FROM history WHERE session_id = ? AND seq = ?", (session_id, seq)
+            ).fetchone()
+        return row[0] if row else None
+
+    def purge_older_than(self, days: float) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM history WHERE ts < ?", (time.time() - days * 86400,))
+            self.db.commit()
+
+    def maybe_purge(self) -> None:
+        """Enforce HISTORY_RETENTION_DAYS, at most once per HISTORY_PURGE_INTERVAL_S."""
+        now = time.monotonic()
+        if now - self.purged_at < HISTORY_PURGE_INTERVAL_S:
+            return
+        self.purged_at = now
+        self.purge_older_than(HISTORY_RETENTION_DAYS)
+
+    # ---------- memory budget ----------
+    def register(self, history: "SessionHistory") -> None:
+        with self.lock:
+            self.sessions[history.session_id] = history
+
+    def bytes_in_memory(self) -> int:
+        with self.lock:
+            return sum(h.bytes_in_memory for h in list(self.sessions.values()))
+
+    def enforce_budget(self) -> None:
+        """Spill the globally oldest in-memory entries until the total fits the budget."""
+        with self.lock:
+            live = [h for h in list(self.sessions.values()) if h.ring]
+            total = sum(h.bytes_in_memory for h in live)
+            while total > self.budget_bytes and live:
+                oldest = min(live, key=lambda h: h.ring[0].ts)
+                total -= oldest.spill_oldest()
+                if not oldest.ring:
+                    live.remove(oldest)
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            live = list(self.sessions.values())
+            spilled = self.db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(blob)), 0) FROM history").fetchone()
+        in_memory = sum(h.bytes_in_memory for h in live)
+        return {
+            "sessions": len(live),
+            "entries_in_memory": sum(len(h.ring) for h in live),
+            "bytes_in_memory": in_memory,
+            "budget_bytes": self.budget_bytes,
+            "budget_used_pct": round(100 * in_memory / self.budget_bytes, 1) if self.budget_bytes else 0.0,
+            "entries_on_disk": spilled[0],
+            "bytes_on_disk": spilled[1],
+        }
+
+
+@lru_cache(maxsize=None)
+def get_registry(db_path: str = HISTORY_DB_PATH) -> HistoryRegistry:
+    return HistoryRegistry(db_path)
+
+
+class SessionHistory:
+    """One session's investigations: fixed-size ring in memory, older entries on disk."""
+
+    def __init__(self, session_id: str, registry: HistoryRegistry, ring_size: int = HISTORY_RING_SIZE) -> None:
+        self.session_id = session_id
+        self.registry = registry
+        self.ring: Deque[Entry] = deque()
+        self.ring_size = ring_size
+        self.bytes_in_memory = 0
+        self.next_seq = 0
+        registry.register(self)
+
+    def add(self, request: Dict[str, Any], response: Dict[str, Any]) -> int:
+        ts = time.time()
+        blob = json.dumps({"request": request, "response": response}, ensure_ascii=False).encode("utf-8")
+        entry = Entry(self.next_seq, ts, entry_label(request, ts), blob)
+        self.next_seq += 1
+        with self.registry.lock:
+            self.ring.append(entry)
+            self.bytes_in_memory += len(blob)
+            while len(self.ring) > self.ring_size:
+                self.spill_oldest()
+        self.registry.enforce_budget()
+        self.registry.maybe_purge()
+        return entry.seq
+
+    def spill_oldest(self) -> int:
+        """Move the oldest in-memory entry to disk. Returns the bytes freed."""
+        entry = self.ring.popleft()
+        self.registry.spill(self.session_id, entry)
+        self.bytes_in_memory -= len(entry.blob)
+        return len(entry.blob)
+
+    def entries(self) -> List[Entry]:
+        """All entries of this session, newest first (blobs omitted for spilled ones)."""
+        with self.registry.lock:
+            in_memory = list(self.ring)
+        return sorted(self.registry.spilled_index(self.session_id) + in_memory, key=lambda e: -e.seq)
+
+    def get(self, seq: int) -> Optional[Dict[str, Any]]:
+        """{"request", "response"} for an entry, from memory or the spill store."""
+        with self.registry.lock:
+            blob = next((e.blob for e in self.ring if e.seq == seq), None)
+        if blob is None:
+            blob = self.registry.load_spilled(self.session_id, seq)
+        return None if blob is None else json.loads(blob)
@@ -0,0 +1,94 @@
+# app/importtime.py
+"""
+Cold-start profiling for `streamlit run main.py`.
+
+  python -m app.importtime            # `-X importtime` of `import main`, aggregated per app module
+  python -m app.importtime --render   # + wall time for a fresh process to render main.py once
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold process: interpreter start -> imports -> first full script run (no browser involved).
+_RENDER_SNIPPET = (
+    "from streamlit.testing.v1 import AppTest\n"
+    "at = AppTest.from_file('main.py', default_timeout=60).run()\n"
+    "assert not at.exception, at.exception\n"
+)
+
+
+def profile_imports(target: str = "main") -> List[Tuple[str, int, int, int]]:
+    """Run `python -X importtime -c 'import <target>'`. Returns [(module, depth, self_us, cumulative_us)]."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cum_us)))
+    if proc.returncode != 0 and not rows:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    return rows
+
+
+def aggregate(rows: List[Tuple[str, int, int, int]]) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, int]]:
+    """
+    app_modules: {module: (self_us, cumulative_us)} for main and app.*
+    packages: {top-level third-party package: total self_us}
+    """
+    app_modules: Dict[str, Tuple[int, int]] = {}
+    packages: Dict[str, int] = {}
+    for name, _depth, self_us, cum_us in rows:
+        root = name.split(".", 1)[0]
+        if root in ("app", "main"):
+            app_modules[name] = (self_us, cum_us)
+        else:
+            packages[root] = packages.get(root, 0) + self_us
+    return app_modules, packages
+
+
+def time_first_render() -> float:
+    """Seconds from process spawn until main.py has rendered once."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", _RENDER_SNIPPET], cwd=ROOT, check=True)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=10, help="third-party packages to list")
+    parser.add_argument("--render", action="store_true", help="also time a cold first render")
+    args = parser.parse_args()
+
+    rows = profile_imports(args.target)
+    app_modules, packages = aggregate(rows)
+    total_us = sum(r[3] for r in rows if r[1] == 0)
+
+    print(f"Total import time for `import {args.target}`: {total_us / 1000:.1f} ms\n")
+    print(f"{'app module':<28}{'self ms':>10}{'cumul ms':>10}")
+    for name, (self_us, cum_us) in sorted(app_modules.items(), key=lambda kv: -kv[1][1]):
+        print(f"{name:<28}{self_us / 1000:>10.1f}{cum_us / 1000:>10.1f}")
+    print(f"\n{'third-party package':<28}{'self ms':>10}")
+    for name, self_us in sorted(packages.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{name:<28}{self_us / 1000:>10.1f}")
+
+    if args.render:
+        print(f"\nTime to first render (cold process): {time_first_render() * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
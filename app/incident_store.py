@@ -0,0 +1,423 @@
+# app/incident_store.py
+"""
+Incident-store backends behind one interface, plus a federating searcher over several.
+
+  store.search(query, top_k, weights) -> [{"case_id", "similarity", "score", "case"}], best first
+
+`query` is a request payload; `weights` are the similarity feature weights to score with
+(retrieval.score_slice; None = the fixed defaults). Every backend is given the same weights,
+so the scores they return for the same corpus agree. Backends:
+  MemoryStore   the in-process corpus (app.corpus.load_corpus)
+  DiskStore     a memory-mapped on-disk index (build_disk_index). Only the columns a query
+                touches are paged in, and a case record is read by offset when it is returned.
+  HttpStore     a client for `python -m app.incident_store serve`, a local stand-in for a
+                future remote store
+
+FederatedSearcher queries its stores concurrently on a shared thread pool:
+  - every store has FEDERATION_TIMEOUT_S. A store that misses it is reported as "timeout"
+    and left out, so the slowest store bounds the latency instead of adding to it;
+  - if an attempt is still running after that store's recent FEDERATION_HEDGE_QUANTILE
+    latency (at least FEDERATION_HEDGE_MIN_S), one hedge request is sent and the first answer
+    wins. A failed attempt is retried right away;
+  - scores are mapped to [0, 1] per store before merging: with the store's declared
+    score_range, or the min/max of its own hits if it declares none. A case found by several
+    stores keeps its best normalized score.
+
+  python -m app.incident_store build-index [--out DIR]
+  python -m app.incident_store serve [--store memory|disk:DIR] [--port N] [--delay-ms MS]
+  python -m app.incident_store search [--stores SPEC ...] [--top-k K] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import (
+    DEFAULTS,
+    SIMILAR_TOP_K,
+    INCIDENT_STORES,
+    INCIDENT_INDEX_DIR,
+    INCIDENT_HTTP_PORT,
+    FEDERATION_TIMEOUT_S,
+    FEDERATION_HEDGE_MIN_S,
+    FEDERATION_HEDGE_QUANTILE,
+    FEDERATION_WORKERS,
+)
+from app.records import CONTEXT_FIELDS, SIGNAL_VOCABULARIES
+
+Hit = Dict[str, Any]
+ScoreRange = Optional[Tuple[float, float]]
+
+
+class IncidentStore(ABC):
+    """Backend interface. score_range: bounds of "score", or None if the store doesn't know."""
+
+    name = "store"
+    score_range: ScoreRange = (0.0, 1.0)  # similarity x recency weight
+
+    @abstractmethod
+    def search(self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None) -> List[Hit]:
+        """Top-k hits for a request payload, best first."""
+
+
+class MemoryStore(IncidentStore):
+    name = "memory"
+
+    def search(self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None) -> List[Hit]:
+        from app.retrieval import search_similar
+
+        return search_similar(query, top_k=top_k, weights=weights)
+
+
+# ---------- on-disk index ----------
+def build_disk_index(corpus: Any, directory: str = INCIDENT_INDEX_DIR) -> int:
+    """Write a corpus as .npy columns + a JSONL of case records with a row-offset table."""
+    tmp = directory.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    def save(name: str, array: np.ndarray) -> None:
+        np.save(os.path.join(tmp, name + ".npy"), array)
+
+    save("times", np.asarray(corpus.time_array))
+    save("metrics", np.asarray(corpus.metrics))
+    save("metric_scale", np.asarray(corpus.metric_scale))
+    for f, codes in corpus.context.items():
+        save(f"context_{f}", np.asarray(codes))
+    for k, codes in corpus.signals.items():
+        save(f"signal_{k}", np.asarray(codes))
+    ids = np.array(list(corpus.case_ids), dtype=str)
+    order = np.argsort(ids, kind="stable")
+    save("case_ids", ids)
+    save("sorted_ids", ids[order])
+    save("id_rows", order.astype(np.int64))
+
+    offsets = [0]
+    with open(os.path.join(tmp, "cases.jsonl"), "wb") as f:
+        for case in corpus.iter_cases():
+            offsets.append(offsets[-1] + f.write((json.dumps(case, ensure_ascii=False) + "\n").encode("utf-8")))
+    save("case_offsets", np.array(offsets, dtype=np.int64))
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return len(ids)
+
+
+class DiskCaseIndex:
+    """Read-only, memory-mapped index with the corpus API retrieval.rank_similar uses."""
+
+    def __init__(self, directory: str = INCIDENT_INDEX_DIR) -> None:
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+
+        self.time_array = load("times")
+        self.metrics = load("metrics")
+        self.metric_scale = np.array(load("metric_scale"))
+        self.context = {f: load(f"context_{f}") for f in CONTEXT_FIELDS}
+        self.signals = {k: load(f"signal_{k}") for k in SIGNAL_VOCABULARIES}
+        self.case_ids = load("case_ids")
+        self._sorted_ids = load("sorted_ids")
+        self._id_rows = load("id_rows")
+        self._offsets = load("case_offsets")
+        self._cases_path = os.path.join(directory, "cases.jsonl")
+
+    def __len__(self) -> int:
+        return self.time_array.shape[0]
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.time_array
+
+    def time_slice(self, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self.time_array, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.time_array, end, side="right"))
+        return slice(lo, max(lo, hi))
+
+    def case(self, i: int) -> Dict[str, Any]:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        with open(self._cases_path, "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        i = int(np.searchsorted(self._sorted_ids, case_id))
+        if i >= len(self._sorted_ids) or self._sorted_ids[i] != case_id:
+            return None
+        return self.case(int(self._id_rows[i]))
+
+
+class DiskStore(IncidentStore):
+    name = "disk"
+
+    def __init__(self, directory: str = INCIDENT_INDEX_DIR) -> None:
+        self.index = DiskCaseIndex(directory)
+
+    def search(self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None) -> List[Hit]:
+        from app.retrieval import rank_similar
+
+        hits = rank_similar(query, corpus=self.index, top_k=top_k, weights=weights)
+        for hit in hits:
+            hit["case"] = self.index.get(hit["case_id"])
+        return hits
+
+
+# ---------- local HTTP stand-in ----------
+class HttpStore(IncidentStore):
+    """POST <url>/search {"query", "top_k", "weights"} -> {"store", "score_range", "hits"}."""
+
+    def __init__(self, url: str, timeout_s: float = FEDERATION_TIMEOUT_S) -> None:
+        self.url = url.rstrip("/")
+        self.name = self.url
+        self.timeout_s = timeout_s
+        # Every server-side store scores in [0, 1]; replies update it if a server declares otherwise.
+        self.score_range: ScoreRange = (0.0, 1.0)
+
+    def search(self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None) -> List[Hit]:
+        sent = {"query": query, "top_k": top_k, "weights": None if weights is None else np.asarray(weights).tolist()}
+        request = urllib.request.Request(
+            self.url + "/search",
+            data=json.dumps(sent).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_s) as reply:
+            body = json.loads(reply.read())
+        if body.get("score_range"):
+            self.score_range = tuple(body["score_range"])
+        return body["hits"]
+
+
+def serve(store: IncidentStore, port: int = INCIDENT_HTTP_PORT, host: str = "127.0.0.1", delay_ms: float = 0.0) -> ThreadingHTTPServer:
+    """HTTP server for a store (blocking: call serve_forever()). delay_ms simulates a remote hop."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up (timeout or a hedge won)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "store": store.name, "score_range": store.score_range})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/search":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                weights = request.get("weights")
+                hits = store.search(
+                    request["query"],
+                    int(request.get("top_k", SIMILAR_TOP_K)),
+                    None if weights is None else np.asarray(weights, dtype=np.float64),
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            if delay_ms:
+                time.sleep(delay_ms / 1000)
+            self._reply(200, {"store": store.name, "score_range": store.score_range, "hits": hits})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def store_from_spec(spec: str) -> IncidentStore:
+    """"memory" | "disk" | "disk:<dir>" | "http://host:port"."""
+    if spec == "memory":
+        return MemoryStore()
+    if spec == "disk" or spec.startswith("disk:"):
+        return DiskStore(spec.partition(":")[2] or INCIDENT_INDEX_DIR)
+    if spec.startswith(("http://", "https://")):
+        return HttpStore(spec)
+    raise ValueError(f"Unknown incident store {spec!r}; expected memory, disk[:DIR] or http://host:port.")
+
+
+# ---------- federation ----------
+class LatencyTracker:
+    """Recent attempt latencies of one store; hedge_after() is their configured quantile."""
+
+    def __init__(self, window: int = 256, min_samples: int = 8) -> None:
+        self.recent: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self.lock:
+            self.recent.append(seconds)
+
+    def hedge_after(self, timeout_s: float) -> float:
+        with self.lock:
+            if len(self.recent) < self.min_samples:
+                return timeout_s / 2  # no history yet
+            q = float(np.quantile(np.fromiter(self.recent, dtype=float), FEDERATION_HEDGE_QUANTILE))
+        return min(max(q, FEDERATION_HEDGE_MIN_S), timeout_s)
+
+
+def normalize_scores(hits: List[Hit], score_range: ScoreRange) -> List[float]:
+    """Map a store's scores onto [0, 1]."""
+    scores = [float(h.get("score", 0.0)) for h in hits]
+    if not scores:
+        return []
+    lo, hi = score_range if score_range else (min(scores), max(scores))
+    if hi <= lo:
+        return [1.0] * len(scores)
+    return [min(1.0, max(0.0, (s - lo) / (hi - lo))) for s in scores]
+
+
+class FederatedSearcher(IncidentStore):
+    """Fan a query out to several stores; merge what arrives within the timeout."""
+
+    name = "federated"
+    score_range = (0.0, 1.0)
+
+    def __init__(self, stores: Sequence[IncidentStore], timeout_s: float = FEDERATION_TIMEOUT_S) -> None:
+        self.stores = list(stores)
+        self.timeout_s = timeout_s
+        self.latency = {s.name: LatencyTracker() for s in self.stores}
+        # Dedicated pool: an abandoned attempt keeps its thread, but nothing waits on it.
+        self.executor = ThreadPoolExecutor(max_workers=FEDERATION_WORKERS, thread_name_prefix="incident-store")
+
+    def _timed_search(self, store: IncidentStore, query: Dict[str, Any], top_k: int, weights: Optional[np.ndarray]) -> List[Hit]:
+        t0 = time.perf_counter()
+        try:
+            return store.search(query, top_k, weights)
+        finally:
+            # Recorded even for attempts that lost a hedge race, so slow stores show up.
+            self.latency[store.name].add(time.perf_counter() - t0)
+
+    async def _query_store(
+        self, store: IncidentStore, query: Dict[str, Any], top_k: int, weights: Optional[np.ndarray]
+    ) -> Tuple[List[Hit], Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        deadline = t0 + self.timeout_s
+
+        def attempt() -> "asyncio.Future[List[Hit]]":
+            return loop.run_in_executor(self.executor, self._timed_search, store, query, top_k, weights)
+
+        pending = {attempt()}
+        hedged = False
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            wait_s = remaining if hedged else min(remaining, self.latency[store.name].hedge_after(self.timeout_s))
+            done, pending = await asyncio.wait(pending, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    report = {"status": "ok", "latency_ms": round(1000 * (time.perf_counter() - t0), 2), "hedged": hedged}
+                    return fut.result(), report
+                error = fut.exception()
+            if not hedged:
+                # Still running past the store's usual latency, or failed: one more try.
+                pending.add(attempt())
+                hedged = True
+        status = "timeout" if pending or error is None else "error"
+        report = {"status": status, "latency_ms": round(1000 * (time.perf_counter() - t0), 2), "hedged": hedged}
+        if status == "error":
+            report["error"] = f"{type(error).__name__}: {error}"
+        return [], report
+
+    async def search_async(
+        self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None
+    ) -> Tuple[List[Hit], Dict[str, Any]]:
+        """(merged hits, {store name: {"status", "latency_ms", "hedged", ...}})."""
+        results = await asyncio.gather(*(self._query_store(s, query, top_k, weights) for s in self.stores))
+        merged: Dict[str, Hit] = {}
+        report: Dict[str, Any] = {}
+        for store, (hits, store_report) in zip(self.stores, results):
+            report[store.name] = {**store_report, "hits": len(hits)}
+            for hit, norm in zip(hits, normalize_scores(hits, store.score_range)):
+                key = hit.get("case_id") or f"{store.name}#{len(merged)}"
+                best = merged.get(key)
+                if best is None or norm > best["score"]:
+                    merged[key] = {**hit, "raw_score": hit.get("score"), "score": norm, "store": store.name,
+                                   "stores": (best or {}).get("stores", []) + [store.name]}
+                else:
+                    best["stores"].append(store.name)
+        ranked = sorted(merged.values(), key=lambda h: -h["score"])[:top_k]
+        return ranked, report
+
+    def search_with_report(
+        self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None
+    ) -> Tuple[List[Hit], Dict[str, Any]]:
+        """Blocking search_async for callers without an event loop (Streamlit, scheduler workers)."""
+        return asyncio.run(self.search_async(query, top_k, weights))
+
+    def search(self, query: Dict[str, Any], top_k: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None) -> List[Hit]:
+        return self.search_with_report(query, top_k, weights)[0]
+
+
+@lru_cache(maxsize=None)
+def get_incident_store() -> FederatedSearcher:
+    """The configured INCIDENT_STORES (in-memory corpus only if unset), federated."""
+    return FederatedSearcher([store_from_spec(s) for s in INCIDENT_STORES or ["memory"]])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build-index", help="write the corpus as an on-disk index")
+    b.add_argument("--out", default=INCIDENT_INDEX_DIR)
+    s = sub.add_parser("serve", help="serve a store over local HTTP")
+    s.add_argument("--store", default="memory")
+    s.add_argument("--port", type=int, default=INCIDENT_HTTP_PORT)
+    s.add_argument("--delay-ms", type=float, default=0.0, help="added to every reply (simulated network hop)")
+    q = sub.add_parser("search", help="federated search with a default-metrics query")
+    q.add_argument("--stores", nargs="+", default=None, help="store specs (default: INCIDENT_STORES)")
+    q.add_argument("--top-k", type=int, default=SIMILAR_TOP_K)
+    q.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build-index":
+        from app.corpus import load_corpus
+
+        print(f"indexed {build_disk_index(load_corpus(), args.out)} cases -> {args.out}")
+    elif args.cmd == "serve":
+        server = serve(store_from_spec(args.store), args.port, delay_ms=args.delay_ms)
+        print(f"serving {args.store} on http://127.0.0.1:{args.port}")
+        server.serve_forever()
+    else:
+        searcher = FederatedSearcher([store_from_spec(x) for x in args.stores]) if args.stores else get_incident_store()
+        query = {"severity": "high", "metrics": dict(DEFAULTS)}
+        latencies = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            hits, report = searcher.search_with_report(query, args.top_k)
+            latencies.append(1000 * (time.perf_counter() - t0))
+        for h in hits:
+            print(f"{h['score']:.3f}  {h['case_id']}  via {','.join(h['stores'])}")
+        print(json.dumps(report))
+        if args.repeat > 1:
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"latency p50={p50:.1f} ms p99={p99:.1f} ms max={max(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# app/ingest.py
+"""
+Bulk import of historical incidents (CSV / JSONL exports) into the case corpus.
+
+  python -m app.ingest exports/week_41.csv exports/week_42.jsonl [--workers 4] [--chunk-size 5000]
+
+Rows are read in chunks, validated + bucketed + MinHashed in a process pool, deduplicated by
+content hash, collapsed into a known case when they near-duplicate it (app/neardup.py) and
+appended to the corpus' ingested store; the in-memory index is extended in place and the
+snapshot rewritten once at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.buckets import classify_metrics, decode_signals, metrics_matrix
+from app.config import SITES, TOOL_GROUPS, PROCESS_STEPS, CASES_PATH, INGEST_CHUNK_SIZE, INGEST_WORKERS
+from app.corpus import CONTEXT_FIELDS, ingested_path_for, load_corpus, save_snapshot, snapshot_path_for, to_epoch
+from app.neardup import corpus_index, set_corpus_index, signatures
+from app.pool import bounded_map
+from app.schema import INT_METRICS, METRIC_KEYS
+
+# Real vocabulary per context field (index 0 of each option list is the UI placeholder).
+VOCABULARIES = {"site": SITES[1:], "tool_group": TOOL_GROUPS[1:], "process_step": PROCESS_STEPS[1:]}
+
+# Same limits the intake form enforces.
+METRIC_LIMITS = {
+    "yield_pct": (0.0, 100.0),
+    "metric_variance": (0.0, math.inf),
+    "change_magnitude": (-math.inf, math.inf),
+    "measurement_confidence": (0.0, 1.0),
+    "affected_lot_count": (0, math.inf),
+    "rework_rate": (0.0, 100.0),
+    "time_window_hours": (1, math.inf),
+}
+
+Chunk = Tuple[int, List[Dict[str, Any]]]  # (first line number, rows)
+
+
+# ---------- reading ----------
+def iter_chunks(path: str, chunk_size: int = INGEST_CHUNK_SIZE) -> Iterator[Chunk]:
+    """Stream an export in chunks of raw rows. Unparseable JSONL lines become {"__error__": ...}."""
+    is_csv = path.lower().endswith(".csv")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows: Iterable[Dict[str, Any]]
+        if is_csv:
+            rows = csv.DictReader(f)
+            first_line = 2  # header is line 1
+        else:
+            rows = (_parse_json_line(line) for line in f)
+            first_line = 1
+        chunk: List[Dict[str, Any]] = []
+        start = first_line
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield start, chunk
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield start, chunk
+
+
+def _parse_json_line(line: str) -> Dict[str, Any]:
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"__error__": f"Invalid JSON: {e.msg}"}
+    return row if isinstance(row, dict) else {"__error__": "Row must be a JSON object."}
+
+
+# ---------- validation (runs in workers) ----------
+def content_hash(case: Dict[str, Any]) -> str:
+    """Hash of what makes a case distinct; ids and derived fields are excluded."""
+    key = {
+        "created_at": case.get("created_at"),
+        "context": case.get("context"),
+        "metrics": case.get("metrics"),
+        "title": case.get("title"),
+        "resolution_summary": case.get("resolution_summary"),
+    }
+    blob = json.dumps(key, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _parse_number(key: str, raw: Any) -> float:
+    if isinstance(raw, bool) or raw is None or (isinstance(raw, str) and raw.strip() == ""):
+        raise ValueError(f"Metric '{key}' is missing.")
+    try:
+        v = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"Metric '{key}' must be a number, got {raw!r}.") from None
+    lo, hi = METRIC_LIMITS[key]
+    if not math.isfinite(v) or v < lo or v > hi:
+        raise ValueError(f"Metric '{key}'={v} is outside [{lo}, {hi}].")
+    if key in INT_METRICS:
+        if v != int(v):
+            raise ValueError(f"Metric '{key}' must be an integer, got {v}.")
+        return int(v)
+    return v
+
+
+def _hints(raw: Any) -> List[str]:
+    if raw is None or raw == "":
+        return []
+    if isinstance(raw, list):
+        return [str(h) for h in raw]
+    return [h.strip() for h in str(raw).split(";") if h.strip()]
+
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat CSV row or nested JSONL case -> validated corpus case. Raises ValueError."""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+
+    ctx_src = row.get("context") if isinstance(row.get("context"), dict) else row
+    context = {}
+    for f in CONTEXT_FIELDS:
+        v = str(ctx_src.get(f) or "").strip()
+        if v not in VOCABULARIES[f]:
+            raise ValueError(f"Unknown {f} {v!r}.")
+        context[f] = v
+
+    m_src = row.get("metrics") if isinstance(row.get("metrics"), dict) else row
+    extra = set(m_src) - METRIC_KEYS if m_src is not row else set()
+    if extra:
+        raise ValueError(f"Extra metric keys: {sorted(extra)}.")
+    metrics = {k: _parse_number(k, m_src.get(k)) for k in sorted(METRIC_KEYS)}
+
+    created_at = str(row.get("created_at") or "").strip()
+    try:
+        to_epoch(created_at)
+    except ValueError:
+        raise ValueError(f"Invalid created_at {created_at!r}.") from None
+
+    title = str(row.get("title") or "").strip()
+    case: Dict[str, Any] = {
+        "case_id": str(row.get("case_id") or "").strip(),
+        "created_at": created_at,
+        "family": str(row.get("family") or title),
+        "title": title,
+        "context": context,
+        "metrics": metrics,
+        "signals": {},  # filled per chunk by the vectorized classifier
+        "matched_signals_template": str(row.get("matched_signals_template") or ""),
+        "resolution_summary": str(row.get("resolution_summary") or "").strip(),
+        "next_checks_hint": _hints(row.get("next_checks_hint")),
+    }
+    case["content_hash"] = content_hash(case)
+    if not case["case_id"]:
+        case["case_id"] = f"H-{case['content_hash'][:12]}"
+    return case
+
+
+def validate_chunk(
+    start_line: int, rows: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]], np.ndarray]:
+    """Worker task: (valid cases, [(line number, error)], their MinHash signatures)."""
+    cases, errors = [], []
+    for i, row in enumerate(rows):
+        try:
+            cases.append(normalize_row(row))
+        except (ValueError, TypeError) as e:  # one malformed row goes to the error list, not the import
+            errors.append((start_line + i, str(e)))
+    if cases:
+        signals = decode_signals(classify_metrics(metrics_matrix([c["metrics"] for c in cases])))
+        for c, sig in zip(cases, signals):
+            c["signals"] = sig
+    return cases, errors, signatures(cases)
+
+
+# ---------- pipeline ----------
+def ingest_files(
+    paths: List[str],
+    *,
+    cases_path: str = CASES_PATH,
+    workers: int = INGEST_WORKERS,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    max_errors: int = 50,
+    collapse_near_duplicates: bool = True,
+) -> Dict[str, Any]:
+    """
+    Import exports into the corpus store. Returns counts plus the first `max_errors` row errors
+    and near-duplicate collapses. Exact duplicates (content hash) are always skipped; rows that
+    near-duplicate a known case (app/neardup.py) are collapsed into it unless disabled.
+    """
+    corpus = load_corpus(cases_path)
+    seen = {c.get("content_hash") or content_hash(c) for c in corpus.iter_cases()}
+    index = corpus_index(corpus)
+    store = ingested_path_for(cases_path)
+    report: Dict[str, Any] = {
+        "rows": 0,
+        "accepted": 0,
+        "duplicates": 0,
+        "near_duplicates": 0,
+        "rejected": 0,
+        "errors": [],
+        "collapsed": [],
+    }
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            chunks = iter_chunks(path, chunk_size)
+            for cases, errors, sigs in bounded_map(pool, validate_chunk, chunks, max_in_flight=workers * 2):
+                report["rows"] += len(cases) + len(errors)
+                report["rejected"] += len(errors)
+                room = max_errors - len(report["errors"])
+                report["errors"].extend((path, line, msg) for line, msg in errors[:room])
+
+                fresh = []
+                for c, sig in zip(cases, sigs):
+                    if c["content_hash"] in seen:
+                        report["duplicates"] += 1
+                        continue
+                    seen.add(c["content_hash"])
+                    if collapse_near_duplicates:
+                        rep = index.find(sig)
+                        if rep is not None:
+                            report["near_duplicates"] += 1
+                            if len(report["collapsed"]) < max_errors:
+                                report["collapsed"].append((path, c["case_id"], rep))
+                            continue
+                    index.add(c["case_id"], sig)
+                    fresh.append(c)
+                if not fresh:
+                    continue
+                with open(store, "a", encoding="utf-8", newline="\n") as out:
+                    out.writelines(json.dumps(c, ensure_ascii=False) + "\n" for c in fresh)
+                corpus.extend(fresh)
+                report["accepted"] += len(fresh)
+
+    set_corpus_index(corpus, index)
+    if report["accepted"]:
+        save_snapshot(corpus, snapshot_path_for(cases_path))
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="CSV or JSONL exports")
+    parser.add_argument("--cases-path", default=CASES_PATH)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument(
+        "--keep-near-duplicates", action="store_true", help="import rows that near-duplicate a known case"
+    )
+    args = parser.parse_args(argv)
+
+    missing = [p for p in args.paths if not os.path.exists(p)]
+    if missing:
+        parser.error(f"File(s) not found: {missing}")
+
+    report = ingest_files(
+        args.paths,
+        cases_path=args.cases_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        collapse_near_duplicates=not args.keep_near_duplicates,
+    )
+    print(
+        f"rows={report['rows']} accepted={report['accepted']} duplicates={report['duplicates']} "
+        f"near_duplicates={report['near_duplicates']} rejected={report['rejected']}"
+    )
+    for path, case_id, rep in report["collapsed"]:
+        print(f"  {path}: {case_id} collapsed into {rep}")
+    for path, line, msg in report["errors"]:
+        print(f"  {path}:{line}: {msg}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# app/measurements.py
+"""
+Summary metrics derived from raw per-lot / per-wafer measurement files (CSV or Parquet).
+
+  python -m app.measurements measurements.parquet --window-hours 48 [--until 2026-10-19T08:00]
+
+Columns (others are ignored):
+  timestamp   required  measurement time (ISO string or Parquet timestamp)
+  lot_id      required
+  pass        optional  1 = unit passed, 0 = failed
+  value       optional  the monitored measurement
+  rework      optional  1 = unit was reworked
+  confidence  optional  measurement confidence, 0-1
+
+The analysis window is the time_window_hours ending at the latest measurement at or before
+`until` (the intake timestamp). The baseline window is the same length immediately before it.
+Files are read in MEASUREMENT_CHUNK_ROWS chunks in two passes: the first reads only the
+timestamp column to find the window end, and the second folds each chunk into running
+counts, sums and (count, mean, M2) moments. Memory stays bounded by the chunk size, plus one entry per
+distinct failing lot.
+
+Derived metrics (the same keys as the form/JSON input):
+  yield_pct               100 x mean(pass) in the window
+  affected_lot_count      lots with a failed unit in the window (all lots seen if no pass column)
+  time_window_hours       as given
+  metric_variance         sample variance of value in the window
+  change_magnitude        window - baseline yield_pct in percentage points. Without a pass
+                          column, the % change of mean(value) vs the baseline
+  measurement_confidence  mean(confidence) in the window
+  rework_rate             100 x mean(rework) in the window
+Metrics whose column is absent (or has no rows in the window) are None.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import MEASUREMENT_CHUNK_ROWS
+
+REQUIRED_COLUMNS = ("timestamp", "lot_id")
+OPTIONAL_COLUMNS = ("pass", "value", "rework", "confidence")
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+_NS_PER_HOUR = 3_600 * 10**9
+
+
+def file_kind(name: str) -> str:
+    return "parquet" if os.path.splitext(name.lower())[1] in PARQUET_EXTENSIONS else "csv"
+
+
+def _rewind(source: Any) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _header(source: Any, kind: str) -> List[str]:
+    _rewind(source)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(source).schema_arrow.names)
+    return [str(c).strip() for c in pd.read_csv(source, nrows=0).columns]
+
+
+def iter_chunks(source: Any, kind: str, columns: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """`columns` of the file, chunk_rows rows at a time. `source` is a path or a seekable file object."""
+    _rewind(source)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        # skipinitialspace + strip so "timestamp, lot_id" headers still match.
+        with pd.read_csv(
+            source, usecols=lambda c: str(c).strip() in columns, chunksize=chunk_rows, skipinitialspace=True
+        ) as reader:
+            for chunk in reader:
+                chunk.columns = [str(c).strip() for c in chunk.columns]
+                yield chunk
+
+
+def timestamps_ns(column: pd.Series) -> np.ndarray:
+    """int64 ns since the epoch (naive wall time; aware timestamps are converted to UTC). NaT -> INT64 min."""
+    ts = pd.to_datetime(column, errors="coerce")
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    return ts.to_numpy(dtype="datetime64[ns]").view("i8")
+
+
+def _moment_ns(moment: dt.datetime) -> int:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return int(pd.Timestamp(moment).value)
+
+
+def _numeric(column: pd.Series) -> np.ndarray:
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class RunningMoments:
+    """Count / mean / M2 merged chunk by chunk (Chan et al. parallel update)."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        n_b = values.size
+        if n_b == 0:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+
+    @property
+    def variance(self) -> Optional[float]:
+        return self.m2 / (self.n - 1) if self.n > 1 else None
+
+
+def _window_end(source: Any, kind: str, until_ns: Optional[int], chunk_rows: int) -> Optional[int]:
+    """Latest timestamp at or before `until` (pass 1: timestamp column only)."""
+    end: Optional[int] = None
+    for chunk in iter_chunks(source, kind, ["timestamp"], chunk_rows):
+        t = timestamps_ns(chunk["timestamp"])
+        t = t[t != np.iinfo(np.int64).min]
+        if until_ns is not None:
+            t = t[t <= until_ns]
+        if t.size:
+            m = int(t.max())
+            end = m if end is None else max(end, m)
+    return end
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def derive_metrics(
+    source: Any,
+    *,
+    name: str,
+    time_window_hours: float,
+    until: Optional[dt.datetime] = None,
+    chunk_rows: int = MEASUREMENT_CHUNK_ROWS,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Returns (metrics, summary). `name` picks the format by extension. Raises ValueError for a
+    file that is missing required columns or has no measurements in the window.
+    """
+    if not time_window_hours or time_window_hours <= 0:
+        raise ValueError("Time window (hours) must be positive to derive metrics from measurements.")
+    kind = file_kind(name)
+    header = _header(source, kind)
+    missing = [c for c in REQUIRED_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"Measurement file is missing required columns: {missing}. Found: {header[:20]}")
+    present = [c for c in OPTIONAL_COLUMNS if c in header]
+    if "pass" not in present and "value" not in present:
+        raise ValueError("Measurement file needs a 'pass' or a 'value' column.")
+
+    end = _window_end(source, kind, None if until is None else _moment_ns(until), chunk_rows)
+    if end is None:
+        raise ValueError("Measurement file has no valid timestamps at or before the intake timestamp.")
+    width = int(time_window_hours * _NS_PER_HOUR)
+    start, base_start = end - width, end - 2 * width
+
+    # Pass 2: fold every chunk into the window / baseline accumulators.
+    sums = {f"{c}_{w}": 0.0 for c in ("pass", "rework", "confidence") for w in ("cur", "base")}
+    counts = dict.fromkeys(sums, 0)
+    value_cur, value_base = RunningMoments(), RunningMoments()
+    lots: Set[Any] = set()
+    rows = rows_cur = rows_base = 0
+
+    def fold(key: str, values: np.ndarray) -> None:
+        ok = ~np.isnan(values)
+        sums[key] += float(values[ok].sum())
+        counts[key] += int(ok.sum())
+
+    for chunk in iter_chunks(source, kind, [*REQUIRED_COLUMNS, *present], chunk_rows):
+        rows += len(chunk)
+        t = timestamps_ns(chunk["timestamp"])
+        cur = (t > start) & (t <= end)
+        base = (t > base_start) & (t <= start)
+        rows_cur += int(cur.sum())
+        rows_base += int(base.sum())
+        if not (cur.any() or base.any()):
+            continue
+        lot_ids = chunk["lot_id"].to_numpy()
+        if "pass" in present:
+            passed = _numeric(chunk["pass"])
+            fold("pass_cur", passed[cur])
+            fold("pass_base", passed[base])
+            lots.update(pd.unique(lot_ids[cur & (passed == 0)]).tolist())
+        else:
+            lots.update(pd.unique(lot_ids[cur]).tolist())
+        if "value" in present:
+            values = _numeric(chunk["value"])
+            value_cur.add(values[cur])
+            value_base.add(values[base])
+        for c in ("rework", "confidence"):
+            if c in present:
+                values = _numeric(chunk[c])
+                fold(f"{c}_cur", values[cur])
+                fold(f"{c}_base", values[base])
+
+    if rows_cur == 0:
+        raise ValueError("No measurements fall inside the analysis window.")
+
+    def mean(key: str) -> Optional[float]:
+        return sums[key] / counts[key] if counts[key] else None
+
+    yield_cur, yield_base = mean("pass_cur"), mean("pass_base")
+    change: Optional[float] = None
+    if yield_cur is not None:
+        change = None if yield_base is None else 100.0 * (yield_cur - yield_base)
+    elif value_cur.n and value_base.n and value_base.mean != 0:
+        change = 100.0 * (value_cur.mean - value_base.mean) / abs(value_base.mean)
+    rework = mean("rework_cur")
+
+    metrics = {
+        "yield_pct": _round(None if yield_cur is None else 100.0 * yield_cur, 2),
+        "affected_lot_count": len(lots),
+        "time_window_hours": int(time_window_hours) if float(time_window_hours).is_integer() else time_window_hours,
+        "metric_variance": _round(value_cur.variance, 4),
+        "change_magnitude": _round(change, 2),
+        "measurement_confidence": _round(mean("confidence_cur"), 3),
+        "rework_rate": _round(None if rework is None else 100.0 * rework, 2),
+    }
+    summary = {
+        "file": name,
+        "format": kind,
+        "rows": rows,
+        "rows_in_window": rows_cur,
+        "rows_in_baseline": rows_base,
+        "window": [pd.Timestamp(start).isoformat(), pd.Timestamp(end).isoformat()],
+        "baseline": [pd.Timestamp(base_start).isoformat(), pd.Timestamp(start).isoformat()],
+        "columns": [*REQUIRED_COLUMNS, *present],
+    }
+    return metrics, summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--window-hours", type=float, required=True)
+    parser.add_argument("--until", type=dt.datetime.fromisoformat, default=None, help="intake timestamp (default: latest measurement)")
+    parser.add_argument("--chunk-rows", type=int, default=MEASUREMENT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    metrics, summary = derive_metrics(
+        args.path, name=args.path, time_window_hours=args.window_hours, until=args.until, chunk_rows=args.chunk_rows
+    )
+    print(json.dumps({"metrics": metrics, "summary": summary}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# app/neardup.py
+"""
+Near-duplicate detection for cases with MinHash + LSH banding.
+
+A case's token set is its bucketed signals, its context and the words of its resolution
+summary. NEARDUP_NUM_PERM MinHash values estimate the Jaccard similarity of two token sets.
+The signature is cut into NEARDUP_BANDS bands, and only cases sharing at least one band
+bucket are compared. Each case joins the first group whose representative it matches at
+>= NEARDUP_THRESHOLD estimated Jaccard, so indexing n cases costs about O(n x bands)
+instead of O(n^2) pairwise comparisons.
+
+Used by ingest (rows that near-duplicate a known case are collapsed into it) and by
+diversify() (at most one case per group in the similar_cases shown to engineers).
+"""
+from __future__ import annotations
+
+import re
+import weakref
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import NEARDUP_NUM_PERM, NEARDUP_BANDS, NEARDUP_THRESHOLD
+from app.records import CONTEXT_FIELDS
+
+_PRIME = np.uint64((1 << 31) - 1)  # Mersenne prime; 31-bit values keep a * x + b inside uint64
+_rng = np.random.default_rng(20240901)  # fixed: signatures must be stable across processes/runs
+_A = _rng.integers(1, int(_PRIME), size=NEARDUP_NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NEARDUP_NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]{3,}")
+
+
+def case_tokens(case: Dict[str, Any]) -> List[str]:
+    """Signals + context + resolution words (context may be nested under "context" or flat)."""
+    ctx = case.get("context") or case
+    tokens = [f"sig:{k}={v}" for k, v in (case.get("signals") or {}).items() if v is not None]
+    tokens += [f"ctx:{f}={ctx.get(f)}" for f in CONTEXT_FIELDS if ctx.get(f)]
+    tokens += [f"res:{w}" for w in _WORD.findall((case.get("resolution_summary") or "").lower())]
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) % int(_PRIME)
+
+
+def _token_hashes(tokens: Iterable[str]) -> List[int]:
+    return sorted({_token_hash(t) for t in tokens})
+
+
+def minhash(tokens: Iterable[str]) -> np.ndarray:
+    """(NEARDUP_NUM_PERM,) uint64 signature; an empty token set gets the all-max signature."""
+    return signatures_from_hashes([_token_hashes(tokens)])[0]
+
+
+def signatures_from_hashes(token_hashes: List[List[int]], block: int = 1024) -> np.ndarray:
+    """Batch MinHash in blocks of rows; rows are padded by repeating their first hash (min is unaffected)."""
+    out = np.full((len(token_hashes), NEARDUP_NUM_PERM), _PRIME, dtype=np.uint64)
+    for start in range(0, len(token_hashes), block):
+        rows = token_hashes[start:start + block]
+        width = max(len(h) for h in rows)
+        if width == 0:
+            continue
+        padded = np.array([h + [h[0]] * (width - len(h)) if h else [int(_PRIME)] * width for h in rows], dtype=np.uint64)
+        sig = ((padded[:, :, None] * _A + _B) % _PRIME).min(axis=1)
+        sig[[not h for h in rows]] = _PRIME
+        out[start:start + len(rows)] = sig
+    return out
+
+
+def signatures(cases: List[Dict[str, Any]]) -> np.ndarray:
+    """(len(cases), NEARDUP_NUM_PERM) signatures."""
+    return signatures_from_hashes([_token_hashes(case_tokens(c)) for c in cases])
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / a.size
+
+
+class NearDupIndex:
+    """LSH index over signatures; every entry belongs to a group named by its first member."""
+
+    def __init__(self, bands: int = NEARDUP_BANDS, threshold: float = NEARDUP_THRESHOLD) -> None:
+        if NEARDUP_NUM_PERM % bands:
+            raise ValueError(f"NEARDUP_NUM_PERM ({NEARDUP_NUM_PERM}) must be divisible by bands ({bands}).")
+        self.rows = NEARDUP_NUM_PERM // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self.sigs: List[np.ndarray] = []
+        self.ids: List[str] = []
+        self.group: List[int] = []  # entry -> index of its group representative
+        self.group_of: Dict[str, str] = {}  # case_id -> representative case_id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        return [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def find(self, sig: np.ndarray) -> Optional[str]:
+        """Representative case_id of the group `sig` near-duplicates, or None."""
+        rep = self._find(self._band_keys(sig), sig)
+        return None if rep is None else self.ids[rep]
+
+    def _find(self, keys: List[bytes], sig: np.ndarray) -> Optional[int]:
+        checked = set()
+        for band, key in zip(self.buckets, keys):
+            for entry in band.get(key, ()):
+                rep = self.group[entry]
+                if rep in checked:
+                    continue
+                checked.add(rep)
+                if estimated_jaccard(sig, self.sigs[rep]) >= self.threshold:
+                    return rep
+        return None
+
+    def add(self, case_id: str, sig: np.ndarray) -> str:
+        """Index a case. Returns the case_id of its group representative (itself if new)."""
+        keys = self._band_keys(sig)
+        rep = self._find(keys, sig)
+        entry = len(self.ids)
+        self.sigs.append(sig)
+        self.ids.append(case_id)
+        self.group.append(entry if rep is None else rep)
+        for band, key in zip(self.buckets, keys):
+            band.setdefault(key, []).append(entry)
+        self.group_of[case_id] = self.ids[self.group[entry]]
+        return self.group_of[case_id]
+
+    def groups(self) -> Dict[str, List[str]]:
+        """Representative -> members, for groups with more than one member."""
+        out: Dict[str, List[str]] = {}
+        for case_id, rep in self.group_of.items():
+            out.setdefault(rep, []).append(case_id)
+        return {rep: members for rep, members in out.items() if len(members) > 1}
+
+
+def build_index(cases: Iterable[Dict[str, Any]], chunk: int = 2048) -> NearDupIndex:
+    index = NearDupIndex()
+    batch: List[Dict[str, Any]] = []
+    for case in cases:
+        batch.append(case)
+        if len(batch) >= chunk:
+            for c, sig in zip(batch, signatures(batch)):
+                index.add(c.get("case_id", ""), sig)
+            batch = []
+    for c, sig in zip(batch, signatures(batch)):
+        index.add(c.get("case_id", ""), sig)
+    return index
+
+
+# Per-corpus index, rebuilt when the corpus grows (CaseCorpus.extend).
+_CORPUS_INDEXES: "weakref.WeakKeyDictionary[Any, Tuple[int, NearDupIndex]]" = weakref.WeakKeyDictionary()
+
+
+def corpus_index(corpus: Any) -> NearDupIndex:
+    cached = _CORPUS_INDEXES.get(corpus)
+    if cached is None or cached[0] != len(corpus):
+        cached = (len(corpus), build_index(corpus.iter_cases()))
+        _CORPUS_INDEXES[corpus] = cached
+    return cached[1]
+
+
+def set_corpus_index(corpus: Any, index: NearDupIndex) -> None:
+    """Register an index kept in step with the corpus (ingest adds rows to both)."""
+    _CORPUS_INDEXES[corpus] = (len(corpus), index)
+
+
+def diversify(hits: List[Dict[str, Any]], index: NearDupIndex, top_k: int) -> List[Dict[str, Any]]:
+    """Best-first hits with at most one per near-duplicate group, truncated to top_k."""
+    out, seen = [], set()
+    for hit in hits:
+        group = index.group_of.get(hit["case_id"], hit["case_id"])
+        if group in seen:
+            continue
+        seen.add(group)
+        out.append(hit)
+        if len(out) == top_k:
+            break
+    return out
@@ -1,5 +1,15 @@
 import streamlit as st
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
+
+from app.scheduler import TRY_AGAIN_STATUSES
+
+SCOPE_LABELS = {
+    "localized": "Localized",
+    "systemic": "Systemic",
+    "other_segments_shifted": "Shifted elsewhere",
+    "no_shift_detected": "No shift detected",
+    "insufficient_data": "Insufficient history",
+}
 
 def render_readiness(pct: int) -> None:
     """Single overall readiness bar + subtle status."""
@@ -13,8 +23,143 @@ def render_readiness(pct: int) -> None:
         st.success("Sufficient context (> 70%). Ready for meaningful guidance.")
 
 
-def render_outputs(last_response: Optional[Dict[str, Any]]) -> None:
-    """Right column output sections in strict order."""
+def render_history_picker(history: Any) -> Optional[Dict[str, Any]]:
+    """
+    Selector over this session's investigations (newest first).
+    Returns the selected {"request", "response"}, or None when there is nothing to pick from.
+    """
+    entries = history.entries()
+    if len(entries) < 2:
+        return None
+    labels = {e.seq: e.label for e in entries}
+    seq = st.selectbox(
+        "Investigation history (this session)",
+        list(labels),
+        format_func=lambda s: labels[s],
+        key="history_seq",
+    )
+    return history.get(seq)
+
+
+def _give_feedback(key: str, on_feedback: Callable[[str, int], None], kind: str, index: int) -> None:
+    st.session_state.feedback_given.add(key)
+    on_feedback(kind, index)
+
+
+def render_feedback_button(response: Dict[str, Any], kind: str, index: int, on_feedback: Callable[[str, int], None]) -> None:
+    """"This helped" button for one similar case / next check; disabled once clicked."""
+    rid = response.get("meta", {}).get("response_id", "")
+    key = f"feedback_{kind}_{rid}_{index}"
+    given = key in st.session_state.setdefault("feedback_given", set())
+    st.button(
+        "Helped ✓" if given else "This helped",
+        key=key,
+        disabled=given,
+        on_click=_give_feedback,
+        args=(key, on_feedback, kind, index),
+    )
+
+
+def _render_case(number: int, c: Dict[str, Any]) -> None:
+    st.markdown(f"**Case {number} — Similarity: {c.get('similarity', 'Low')}**")
+    if c.get("case_id"):
+        st.caption(f"{c['case_id']} · {c.get('title', '')}")
+    st.write(f"Matched signals: {c.get('matched_signals', '')}")
+    st.write(f"Resolution: {c.get('resolution', '')}")
+
+
+def _set_offset(key: str, offset: int) -> None:
+    st.session_state[key] = offset
+
+
+def render_similar_cases(response: Dict[str, Any], on_feedback: Optional[Callable[[str, int], None]]) -> None:
+    """
+    Top-k cases from the response, then "Show next N" pages fetched by the response's
+    similar_cases_page cursor (ranked ids cached server-side; retrieval is not re-run).
+    Feedback buttons are offered on the top-k, which is what the feedback store scores against.
+    """
+    from app.config import SIMILAR_PAGE_SIZE
+
+    cases = response.get("similar_cases", [])
+    paging = response.get("similar_cases_page")
+    if paging and not paging.get("cursor"):
+        st.caption(paging.get("unavailable", "Paging is not available for these results."))
+        paging = None
+    key = f"similar_offset_{paging['cursor']}" if paging else None
+    offset = st.session_state.get(key, 0) if key else 0
+
+    if offset:
+        from app.placeholder import similar_cases_page
+
+        page = similar_cases_page(paging["cursor"], offset, SIMILAR_PAGE_SIZE)
+        if page is None:
+            st.info("These ranked results have expired. Resubmit the investigation to page further.")
+            st.button("Back to top", key=f"{key}_top", on_click=_set_offset, args=(key, 0))
+            return
+        shown, total = page
+    else:
+        shown, total = cases, paging["total"] if paging else len(cases)
+
+    if paging:
+        st.caption(f"Cases {offset + 1}–{offset + len(shown)} of {total} ranked")
+    for i, c in enumerate(shown):
+        with st.container(border=True):
+            _render_case(offset + i + 1, c)
+            if on_feedback and not offset:
+                render_feedback_button(response, "case", i, on_feedback)
+
+    if paging:
+        left, right = st.columns(2)
+        next_offset = offset + len(shown)
+        if next_offset < total:
+            with left:
+                st.button(
+                    f"Show next {min(SIMILAR_PAGE_SIZE, total - next_offset)}",
+                    key=f"{key}_next",
+                    on_click=_set_offset,
+                    args=(key, next_offset),
+                )
+        if offset:
+            with right:
+                st.button("Back to top", key=f"{key}_top", on_click=_set_offset, args=(key, 0))
+
+
+def render_cluster_flags(flags: List[Dict[str, Any]]) -> None:
+    """Clusters of recent submissions spanning several sites / tool groups (app/clusters.py)."""
+    from app.config import CLUSTER_WINDOW_HOURS
+
+    if not flags:
+        st.write(f"No signature shared across sites or tool groups in the last {CLUSTER_WINDOW_HOURS:g} h.")
+        return
+    st.dataframe(
+        [
+            {
+                "cluster": f["cluster"],
+                "submissions": f["members"],
+                "sites": ", ".join(f["sites"]),
+                "tool groups": ", ".join(f["tool_groups"]),
+                "first": f["first_ts"],
+                "last": f["last_ts"],
+                "signature": ", ".join(f"{k}={v}" for k, v in f["signature"].items()),
+            }
+            for f in flags
+        ],
+        hide_index=True,
+    )
+
+
+def render_outputs(
+    last_response: Optional[Dict[str, Any]], on_feedback: Optional[Callable[[str, int], None]] = None
+) -> None:
+    """
+    Right column output sections in strict order.
+    on_feedback(kind, index), kind "case" | "check": adds "This helped" buttons when given.
+    """
+    status = (last_response or {}).get("meta", {}).get("status")
+    if status in TRY_AGAIN_STATUSES:
+        st.warning(last_response["meta"]["message"])
+        return
+
     st.subheader("Similar cases")
     if not last_response:
         st.write("Submit an investigation to view similar historical cases.")
@@ -23,28 +168,35 @@ def render_outputs(last_response: Optional[Dict[str, Any]]) -> None:
         if note:
             st.info(note)
 
-        cases = last_response.get("similar_cases", [])
-        if not cases:
+        if not last_response.get("similar_cases"):
             st.write("No similar cases to display.")
         else:
-            for i, c in enumerate(cases, 1):
-                with st.container(border=True):
-                    st.markdown(f"**Case {i} — Similarity: {c.get('similarity', 'Low')}**")
-                    st.write(f"Matched signals: {c.get('matched_signals', '')}")
-                    st.write(f"Resolution: {c.get('resolution', '')}")
+            render_similar_cases(last_response, on_feedback)
 
     st.subheader("Next checks")
     if not last_response:
         st.write("Next checks will appear here after analysis.")
     else:
+        scope = last_response.get("scope_assessment")
+        if scope:
+            label = SCOPE_LABELS.get(scope.get("scope"), scope.get("scope", ""))
+            st.info(f"Scope assessment: **{label}** — {scope.get('detail', '')}")
+        baseline = last_response.get("baseline")
+        if baseline:
+            (st.warning if baseline.get("out_of_baseline") else st.caption)(baseline.get("detail", ""))
+        cluster = last_response.get("cross_site_cluster")
+        if cluster:
+            st.warning(f"Cross-site cluster: {cluster.get('detail', '')}")
         checks = last_response.get("next_checks", [])
         if len(checks) < 2:
             st.warning("Expected at least 2 checks; placeholder response is incomplete.")
-        for chk in checks:
+        for i, chk in enumerate(checks):
             with st.container(border=True):
                 st.markdown(f"**{chk.get('category', 'Check')}**")
                 st.write(chk.get("check", ""))
                 st.caption(chk.get("why", ""))
+                if on_feedback:
+                    render_feedback_button(last_response, "check", i, on_feedback)
 
     st.subheader("Escalation summary")
     if not last_response:
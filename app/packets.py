@@ -0,0 +1,257 @@
+# app/packets.py
+"""
+Batch escalation packets (Markdown or HTML) for logged investigations.
+
+  python -m app.packets --out review.html [requests_responses.jsonl]
+      [--since 2026-10-12] [--until 2026-10-19] [--site Plant-A] [--tool-group ...]
+      [--severity high ...] [--limit N] [--workers N] [--chunk-size N]
+
+Each packet holds the request context and metrics, the matched cases, the next checks, the
+scope assessment and the stored escalation summary. The templates
+(app/templates/escalation_packets.{md,html}.j2) are compiled once, in the parent before the
+pool forks, so workers inherit them. The parent streams raw log lines in chunks and drops
+lines before --since on their ts prefix alone. Workers parse and filter each chunk, rehydrate
+only the matching responses and render them. Rendered chunks are written in log order while
+later chunks are still rendering, with at most workers x 2 chunks in flight. The output is
+written to <out>.tmp and renamed when complete.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import PERSIST_PATH, PACKET_WORKERS, PACKET_CHUNK_SIZE
+from app.pool import bounded_map
+from app.schema import METRIC_ORDER
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+FORMATS = ("md", "html")
+
+# Log lines start with {"ts": "<iso>", ... (see main.respond_and_persist).
+_TS_PREFIX_LEN = len('{"ts": "')
+
+
+@lru_cache(maxsize=None)
+def template_module(fmt: str) -> Any:
+    """Compiled template for a format; its macros header / packet / footer render the parts."""
+    import jinja2
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown packet format {fmt!r}; expected one of {FORMATS}.")
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=lambda name: bool(name) and name.endswith(".html.j2"),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+    )
+    return env.get_template(f"escalation_packets.{fmt}.j2").module
+
+
+def packet_context(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Log record -> template variables."""
+    request = record.get("request") or {}
+    response = record.get("response") or {}
+    metrics = request.get("metrics") or {}
+    scope = response.get("scope_assessment")
+    return {
+        "ts": record.get("ts", ""),
+        "response_id": record.get("response_id") or (response.get("meta") or {}).get("response_id", ""),
+        "site": request.get("site", ""),
+        "tool_group": request.get("tool_group", ""),
+        "process_step": request.get("process_step", ""),
+        "severity": request.get("severity", ""),
+        "anomaly_timestamp": request.get("timestamp", ""),
+        "anomaly_summary": (request.get("anomaly_summary") or "").strip(),
+        "metrics_input_mode": request.get("metrics_input_mode", ""),
+        "metrics": [(m, "—" if metrics.get(m) is None else metrics[m]) for m in METRIC_ORDER],
+        "scope": {
+            "label": (scope.get("scope") or "").replace("_", " ").capitalize(),
+            "detail": scope.get("detail", ""),
+        } if scope else None,
+        "similar_cases": response.get("similar_cases") or [],
+        "no_strong_match_note": response.get("no_strong_match_note"),
+        "next_checks": response.get("next_checks") or [],
+        "escalation_summary": response.get("escalation_summary", ""),
+    }
+
+
+def _matches(request: Dict[str, Any], filters: Dict[str, Sequence[str]]) -> bool:
+    return all(request.get(field) in allowed for field, allowed in filters.items())
+
+
+def _before(line: str, since: Optional[str]) -> bool:
+    """True if the line's ts is known to be older than `since` (ISO strings compare as text)."""
+    return since is not None and line.startswith('{"ts": "') and line[_TS_PREFIX_LEN:_TS_PREFIX_LEN + len(since)] < since
+
+
+def _parse_match(
+    line: str, since: Optional[str], until: Optional[str], filters: Dict[str, Sequence[str]], store: Any
+) -> Optional[Dict[str, Any]]:
+    """Parsed, rehydrated record if the line passes the time range and filters, else None."""
+    from app.blobstore import rehydrate
+
+    if not line.strip() or _before(line, since):
+        return None
+    record = json.loads(line)
+    ts = record.get("ts") or ""
+    if (since is not None and ts < since) or (until is not None and ts >= until):
+        return None
+    if not _matches(record.get("request") or {}, filters):
+        return None
+    if "response" in record:
+        record["response"] = rehydrate(record["response"], store)
+    return record
+
+
+def _render_chunk(
+    lines: List[str], fmt: str, log_path: str, since: Optional[str], until: Optional[str], filters: Dict[str, Sequence[str]]
+) -> List[str]:
+    """Worker task: parse, filter and render one chunk of raw log lines. One string per packet."""
+    from app.blobstore import blob_path_for, get_blob_store
+
+    store = get_blob_store(blob_path_for(log_path))
+    packet = template_module(fmt).packet
+    out = []
+    for line in lines:
+        record = _parse_match(line, since, until, filters, store)
+        if record is not None:
+            out.append(str(packet(packet_context(record))))
+    return out
+
+
+def iter_matching_records(
+    path: str,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    filters: Optional[Dict[str, Sequence[str]]] = None,
+    limit: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Log records with since <= ts < until whose request matches every filter (field -> allowed
+    values). Responses are rehydrated only for matches.
+    """
+    from app.blobstore import blob_path_for, get_blob_store
+
+    store = get_blob_store(blob_path_for(path))
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = _parse_match(line, since, until, filters or {}, store)
+            if record is None:
+                continue
+            yield record
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+
+def _line_chunks(path: str, chunk_size: int, since: Optional[str]) -> Iterator[List[str]]:
+    """Raw log lines, chunk_size at a time; lines older than `since` are dropped unparsed."""
+    chunk: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if _before(line, since):
+                continue
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_packets(
+    out_path: str,
+    log_path: str = PERSIST_PATH,
+    *,
+    fmt: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    filters: Optional[Dict[str, Sequence[str]]] = None,
+    limit: Optional[int] = None,
+    workers: int = PACKET_WORKERS,
+    chunk_size: int = PACKET_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Render matching investigations into one document at out_path. Returns a small report."""
+    fmt = fmt or ("html" if out_path.lower().endswith((".html", ".htm")) else "md")
+    module = template_module(fmt)  # compile before forking
+    shown_filters = {k: ",".join(v) for k, v in (filters or {}).items()}
+    if since:
+        shown_filters["since"] = since
+    if until:
+        shown_filters["until"] = until
+    doc = {"generated": dt.datetime.now().isoformat(timespec="seconds"), "log": log_path, "filters": shown_filters}
+
+    tasks = ((lines, fmt, log_path, since, until, filters or {}) for lines in _line_chunks(log_path, chunk_size, since))
+    count = 0
+    tmp = out_path + ".tmp"
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    try:
+        with open(tmp, "w", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            out.write(str(module.header(doc)))
+            for packets in bounded_map(pool, _render_chunk, tasks, max_in_flight=workers * 2):
+                if limit is not None:
+                    packets = packets[:limit - count]
+                out.writelines(packets)
+                count += len(packets)
+                if limit is not None and count >= limit:
+                    break
+            out.write(str(module.footer({**doc, "count": count})))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, out_path)
+    return {"out": out_path, "format": fmt, "packets": count, "bytes": os.path.getsize(out_path)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=PERSIST_PATH)
+    parser.add_argument("--out", required=True, help="output file (.md or .html)")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from --out's extension")
+    parser.add_argument("--since", help="submitted at or after (ISO date/time)")
+    parser.add_argument("--until", help="submitted before (ISO date/time)")
+    parser.add_argument("--site", nargs="+")
+    parser.add_argument("--tool-group", nargs="+")
+    parser.add_argument("--process-step", nargs="+")
+    parser.add_argument("--severity", nargs="+")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=PACKET_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=PACKET_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    filters = {
+        field: values
+        for field, values in (
+            ("site", args.site),
+            ("tool_group", args.tool_group),
+            ("process_step", args.process_step),
+            ("severity", args.severity),
+        )
+        if values
+    }
+    report = render_packets(
+        args.out,
+        args.log,
+        fmt=args.format,
+        since=args.since,
+        until=args.until,
+        filters=filters,
+        limit=args.limit,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    print(f"{report['packets']} packets -> {report['out']} ({report['format']}, {report['bytes']:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
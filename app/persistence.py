@@ -1,8 +1,42 @@
 import json
+import threading
 from typing import Dict, Any
 
-def append_jsonl(path: str, record: Dict[str, Any]) -> None:
-    """Append a single JSON record to a JSONL file."""
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+from app.config import PERSIST_MODE
 
+# Serializes in-process appends with log rewrites (app.blobstore.compact_log).
+LOG_LOCK = threading.RLock()
+
+
+def append_jsonl(path: str, record: Dict[str, Any]) -> int:
+    """Append a single JSON record to a JSONL file. Returns the number of bytes written."""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with LOG_LOCK, open(path, "a", encoding="utf-8", newline="\n") as f:
+        f.write(line)
+    return len(line.encode("utf-8"))
+
+
+def append_log_record(path: str, record: Dict[str, Any]) -> int:
+    """
+    Append a request/response record to the log in PERSIST_MODE. In "dedup" mode the response's
+    sub-objects go to the blob store and the line only carries references; read such logs with
+    app.blobstore.iter_log. Returns the number of bytes written to the log.
+    """
+    if PERSIST_MODE == "dedup" and isinstance(record.get("response"), dict):
+        from app.blobstore import blob_path_for, get_blob_store, intern_response
+
+        store = get_blob_store(blob_path_for(path))
+        record = dict(record, response=intern_response(record["response"], store))
+    return append_jsonl(path, record)
+
+
+def scored_request(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A log record's request as it was scored: the submitted request plus any values the app
+    derived for it (record["derived"], e.g. a baseline-filled change_magnitude).
+    """
+    request = record.get("request") or {}
+    derived = (record.get("derived") or {}).get("metrics")
+    if not derived:
+        return request
+    return {**request, "metrics": {**(request.get("metrics") or {}), **derived}}
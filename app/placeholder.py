@@ -1,21 +1,94 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import datetime as dt
+import time
+import uuid
 
+# Raw similarity thresholds for the labels shown in the UI.
+HIGH_SIMILARITY = 0.75
+MEDIUM_SIMILARITY = 0.5
 
-def build_placeholder_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+
+def similarity_label(similarity: float) -> str:
+    if similarity >= HIGH_SIMILARITY:
+        return "High"
+    if similarity >= MEDIUM_SIMILARITY:
+        return "Medium"
+    return "Low"
+
+
+def format_similar_case(hit: Dict[str, Any], query_signals: Dict[str, Any]) -> Dict[str, str]:
+    """Corpus hit -> similar_cases entry rendered by output_render."""
+    from app.buckets import describe_match
+
+    case = hit["case"]
+    return {
+        "case_id": case.get("case_id", ""),
+        "title": case.get("title", ""),
+        "similarity": similarity_label(hit["similarity"]),
+        # Buckets actually shared with this payload (generated, not the case's template).
+        "matched_signals": describe_match(query_signals, case.get("signals") or {})
+        or "No shared signal buckets; closest by metric distance and context.",
+        "resolution": case.get("resolution_summary", ""),
+    }
+
+
+def similar_cases_page(cursor: str, offset: int, limit: int) -> Optional[Tuple[List[Dict[str, str]], int]]:
+    """
+    similar_cases entries ranked [offset, offset + limit) for a response's "similar_cases_page"
+    cursor, plus the ranked total. Only this page's case records are materialized; retrieval
+    is not re-run. None once the cursor has expired.
+    """
+    from app.corpus import load_corpus
+    from app.cursors import get_cursor_cache
+
+    page = get_cursor_cache().page(cursor, offset, limit)
+    if page is None:
+        return None
+    ranked, total, context = page
+    corpus = load_corpus()
+    cases = []
+    for case_id, similarity in ranked:
+        case = corpus.get(case_id)
+        if case is not None:  # dropped from the corpus since the query ran
+            cases.append(format_similar_case({"case": case, "similarity": similarity}, context["query_signals"]))
+    return cases, total
+
+
+def build_live_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The app's response path: scored with the live feedback-learned weights, version in meta."""
+    from app.feedback import get_weight_store
+
+    version, weights = get_weight_store().current()
+    response = build_placeholder_response(payload, weights=weights)
+    response["meta"]["weights_version"] = version
+    return response
+
+
+def build_placeholder_response(payload: Dict[str, Any], weights: Optional[Any] = None) -> Dict[str, Any]:
     """
     Placeholder v1 response (Milestone 1):
       - similar_cases: 0-3
       - next_checks: min 2
       - escalation_summary: always visible
       - narrative: placeholder
+    weights: similarity feature weights (default: the fixed defaults; see build_live_response).
     """
+    t0 = time.perf_counter()
     severity = payload.get("severity", "low")
     metrics = payload.get("metrics", {})
     yield_pct = metrics.get("yield_pct")
 
+    # Imported lazily: pulls in NumPy and the corpus, which the first render doesn't need.
+    from app.buckets import derive_signals
+
+    query_signals = derive_signals(metrics)
+    t_signals = time.perf_counter()
+    hints: List[str] = []
+
     # Use simple heuristic just to make placeholders feel alive (not "smart").
     similar_cases: List[Dict[str, str]] = []
+    similar_page = None
+    store_report = None
     no_strong_match_note = None
 
     if yield_pct is None:
@@ -29,64 +102,73 @@ def build_placeholder_response(payload: Dict[str, Any]) -> Dict[str, Any]:
             }
         ]
     else:
-        # Provide up to 3 (but could be fewer)
-        similar_cases = [
-            {
-                "similarity": "High" if severity == "high" else "Medium",
-                "matched_signals": f"Yield shift observed; severity='{severity}'.",
-                "resolution": "Validated measurement path; segmented by tool_group; reviewed recent changes.",
-            },
-            {
-                "similarity": "Medium",
-                "matched_signals": "Temporal clustering within the provided time window.",
-                "resolution": "Scoped impacted lots; isolated to process_step segment; documented escalation pack.",
-            },
-        ]
-        if severity == "high":
-            similar_cases.append(
+        from app.config import INCIDENT_STORES, NEARDUP_OVERSAMPLE, SIMILAR_TOP_K, SIMILAR_RANKED_LIMIT
+        from app.corpus import load_corpus
+
+        corpus = load_corpus()
+        if INCIDENT_STORES:
+            # Federated stores (app/incident_store.py): merged top-k only.
+            from app.incident_store import get_incident_store
+            from app.neardup import corpus_index, diversify
+
+            hits, store_report = get_incident_store().search_with_report(
+                payload, SIMILAR_TOP_K * NEARDUP_OVERSAMPLE, weights=weights
+            )
+            hits = diversify([h for h in hits if h.get("case")], corpus_index(corpus), SIMILAR_TOP_K)
+            # Stores return their top hits only, so there is no ranked list to page through.
+            similar_page = {
+                "cursor": None,
+                "total": len(hits),
+                "unavailable": "Paging is not available with federated incident stores; showing the merged top matches.",
+            }
+        else:
+            from app.cursors import get_cursor_cache
+            from app.shards import rank_cases
+
+            # Rank once past the top-k; the rest of the ids stay server-side for paging.
+            ranked = rank_cases(payload, SIMILAR_RANKED_LIMIT, weights=weights)
+            hits = [{**h, "case": corpus.get(h["case_id"])} for h in ranked[:SIMILAR_TOP_K]]
+            if len(ranked) > SIMILAR_TOP_K:
+                cursor = get_cursor_cache().put(
+                    [(h["case_id"], h["similarity"]) for h in ranked], {"query_signals": query_signals}
+                )
+                similar_page = {"cursor": cursor, "total": len(ranked)}
+        if hits:
+            similar_cases = [format_similar_case(h, query_signals) for h in hits]
+            hints = [h for hit in hits for h in hit["case"].get("next_checks_hint", [])]
+            if hits[0]["similarity"] < MEDIUM_SIMILARITY:
+                no_strong_match_note = "No strong matches found — showing best available references."
+        else:
+            # Empty corpus (or nothing in the time window): keep the generic references.
+            similar_cases = [
+                {
+                    "similarity": "High" if severity == "high" else "Medium",
+                    "matched_signals": f"Yield shift observed; severity='{severity}'.",
+                    "resolution": "Validated measurement path; segmented by tool_group; reviewed recent changes.",
+                },
                 {
                     "similarity": "Medium",
-                    "matched_signals": "High operational impact signal; potential drift vs shift ambiguity.",
-                    "resolution": "Ran measurement cross-check; compared recent recipe/config changes; escalated with evidence.",
-                }
-            )
+                    "matched_signals": "Temporal clustering within the provided time window.",
+                    "resolution": "Scoped impacted lots; isolated to process_step segment; documented escalation pack.",
+                },
+            ]
+            if severity == "high":
+                similar_cases.append(
+                    {
+                        "similarity": "Medium",
+                        "matched_signals": "High operational impact signal; potential drift vs shift ambiguity.",
+                        "resolution": "Ran measurement cross-check; compared recent recipe/config changes; escalated with evidence.",
+                    }
+                )
 
-    next_checks: List[Dict[str, str]] = [
-        {
-            "category": "Scope & segmentation",
-            "check": "Segment the anomaly by site/tool_group/process_step and compare impacted vs non-impacted slices.",
-            "why": "Confirm whether this is localized (single segment) or systemic (multi-segment).",
-        },
-        {
-            "category": "Measurement validation",
-            "check": "Validate measurement confidence: repeat measurement or cross-check with an independent signal.",
-            "why": "Avoid chasing a false anomaly caused by instrumentation or data pipeline issues.",
-        },
-    ]
+    t_search = time.perf_counter()
 
-    if severity == "high":
-        next_checks.append(
-            {
-                "category": "Recent changes review",
-                "check": "Review recent changes (recipes/configs/maintenance/software) within the reported time window.",
-                "why": "High severity warrants prioritizing change-driven hypotheses early.",
-            }
-        )
-        next_checks.append(
-            {
-                "category": "Escalation packaging",
-                "check": "Prepare an escalation packet: summary, scope, evidence, missing info, and next steps attempted.",
-                "why": "Enables fast handoff to SMEs without losing investigation context.",
-            }
-        )
-    else:
-        next_checks.append(
-            {
-                "category": "Recent changes review",
-                "check": "Check for any recent changes that align with the anomaly start time.",
-                "why": "Even moderate issues are often change-correlated; confirm early to reduce search space.",
-            }
-        )
+    # Decision table (app/data/next_check_rules.json), keyed on severity, bucketed metrics,
+    # context and the next_checks_hint values of the matched cases.
+    from app.rules import get_rulebook
+
+    next_checks: List[Dict[str, str]] = get_rulebook().next_checks(payload, query_signals, hints)
+    t_rules = time.perf_counter()
 
     escalation_summary = (
         "Escalation summary (decision-support only):\n"
@@ -105,13 +187,27 @@ def build_placeholder_response(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     resp = {
         "similar_cases": similar_cases[:3],
+        # {"cursor", "total"} when more ranked cases than shown (see similar_cases_page());
+        # cursor None plus an "unavailable" reason under federated stores.
+        "similar_cases_page": similar_page,
         "no_strong_match_note": no_strong_match_note,
         "next_checks": next_checks,
         "escalation_summary": escalation_summary,
         "narrative": narrative,
         "meta": {
-            "response_id": f"resp_{dt.datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            # Second-resolution time + random suffix: unique across concurrent sessions, which
+            # feedback (keyed by response_id) relies on.
+            "response_id": f"resp_{dt.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}",
+            # Per-stage latency; compared across builds by app.replay.
+            "timings_ms": {
+                "signals": round(1000 * (t_signals - t0), 3),
+                "search": round(1000 * (t_search - t_signals), 3),
+                "rules": round(1000 * (t_rules - t_search), 3),
+                "total": round(1000 * (time.perf_counter() - t0), 3),
+            },
         },
     }
+    if store_report:
+        resp["meta"]["stores"] = store_report
     return resp
 
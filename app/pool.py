@@ -0,0 +1,24 @@
+# app/pool.py
+"""
+Shared process-pool helper for the batch CLIs (ingest, replay, packets).
+
+bounded_map is an ordered pool.map that submits lazily: at most max_in_flight chunks are
+queued or held as results at once, so a large input streams through instead of being
+materialized up front.
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+
+def bounded_map(pool: Executor, fn: Callable[..., Any], items: Iterable[Tuple], max_in_flight: int) -> Iterator[Any]:
+    """Ordered pool.map that never holds more than max_in_flight chunks in memory."""
+    pending: deque = deque()
+    for item in items:
+        pending.append(pool.submit(fn, *item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
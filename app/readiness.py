@@ -74,7 +74,8 @@ def compute_readiness(
         filled += int(is_number_filled(form_metrics.get("affected_lot_count")))
         filled += int(is_number_filled(form_metrics.get("time_window_hours")))
     else:
-        # JSON mode: treat all core metrics as "present" if textarea is non-empty
+        # JSON/Measurements mode: treat all core metrics as "present" if textarea is non-empty
+        # (or a measurement file is uploaded)
         filled += int(json_metrics_present)
         filled += int(json_metrics_present)
         filled += int(json_metrics_present)
@@ -88,7 +89,7 @@ def compute_readiness(
         filled += int(is_number_filled(form_metrics.get("measurement_confidence")))
         filled += int(is_number_filled(form_metrics.get("rework_rate")))
     else:
-        # JSON mode: treat advanced metrics as "present" if textarea is non-empty
+        # JSON/Measurements mode: treat advanced metrics as "present" if textarea is non-empty
         filled += int(json_metrics_present)
         filled += int(json_metrics_present)
         filled += int(json_metrics_present)
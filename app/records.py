@@ -0,0 +1,210 @@
+# app/records.py
+"""
+Compact record types.
+
+CaseTable is the struct-of-arrays case corpus. Metrics and timestamps live in typed arrays,
+context fields and signals are small-int codes against the config vocabularies, and repeated
+text (titles, resolutions, templates) is dictionary-encoded. NumPy views over the arrays are
+zero-copy; rows become dicts only when rendered or persisted.
+
+Requests and responses stay plain dicts. They are built, logged and rendered in their JSON
+shape, and kept in memory only as encoded JSON (app/history.py), so slotted record types for
+them would add conversions without saving memory.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import SITES, TOOL_GROUPS, PROCESS_STEPS, BUCKET_RANGES
+from app.schema import METRIC_ORDER
+
+CONTEXT_FIELDS = ("site", "tool_group", "process_step")
+
+# Code 0 is the placeholder option, i.e. "unknown / not selected".
+CONTEXT_VOCABULARIES = {"site": SITES, "tool_group": TOOL_GROUPS, "process_step": PROCESS_STEPS}
+
+# Signal labels per key; code 0 = missing.
+SIGNAL_VOCABULARIES: Dict[str, Tuple[Optional[str], ...]] = {
+    **{bucket: (None, *labels) for bucket, labels in BUCKET_RANGES.items()},
+    "change_dir": (None, "neg", "zero", "pos"),
+}
+
+TEXT_FIELDS = ("family", "title", "matched_signals_template", "resolution_summary")
+
+_CASE_KEYS = {"case_id", "created_at", "context", "metrics", "signals", "next_checks_hint", *TEXT_FIELDS}
+
+
+def to_epoch(ts: str) -> float:
+    """ISO timestamp -> POSIX seconds. Naive timestamps (intake form) are treated as UTC."""
+    parsed = dt.datetime.fromisoformat(ts)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed.timestamp()
+
+
+def encode_context(field_name: str, value: Optional[str]) -> int:
+    """Vocabulary code for a context value; unknown/placeholder -> 0."""
+    try:
+        return CONTEXT_VOCABULARIES[field_name].index(value)
+    except ValueError:
+        return 0
+
+
+# ---------- case table ----------
+class StringPool:
+    """Dictionary encoding for repeated strings: value <-> uint32 code."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def __getstate__(self) -> List[str]:
+        return self.values
+
+    def __setstate__(self, values: List[str]) -> None:
+        self.values = values
+        self._codes = {v: i for i, v in enumerate(values)}
+
+
+class CaseTable:
+    """
+    Column store for corpus cases (row order is whatever the caller appends in).
+
+    NumPy views (times_view / metrics_view / context_view / signal_view) share memory with
+    the underlying arrays. Drop them before appending: a typed array cannot grow while a
+    view is exported.
+    """
+
+    __slots__ = (
+        "case_ids", "created_at", "created_at_iso", "metrics", "context", "signals",
+        "text", "hints", "pool", "extras",
+    )
+
+    def __init__(self) -> None:
+        self.case_ids: List[str] = []
+        self.created_at = array("d")
+        self.created_at_iso: List[str] = []
+        self.metrics = array("d")  # row-major, len(METRIC_ORDER) per row, NaN = missing
+        self.context = {f: array("B") for f in CONTEXT_FIELDS}
+        self.signals = {k: array("B") for k in SIGNAL_VOCABULARIES}
+        self.text = {f: array("I") for f in TEXT_FIELDS}
+        self.hints = array("I")  # pooled ";"-joined next_checks_hint
+        self.pool = StringPool()
+        # Keys outside the case schema (e.g. content_hash from ingest); None for most rows.
+        self.extras: List[Optional[Dict[str, Any]]] = []
+
+    @classmethod
+    def from_cases(cls, cases: Iterable[Dict[str, Any]]) -> "CaseTable":
+        table = cls()
+        table.extend(cases)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.case_ids)
+
+    # ---------- writes ----------
+    def append(self, case: Dict[str, Any]) -> None:
+        self.case_ids.append(case.get("case_id", ""))
+        self.created_at_iso.append(case["created_at"])
+        self.created_at.append(to_epoch(case["created_at"]))
+
+        metrics = case.get("metrics") or {}
+        self.metrics.extend(
+            float("nan") if metrics.get(k) is None else float(metrics[k]) for k in METRIC_ORDER
+        )
+        ctx = case.get("context") or {}
+        for f in CONTEXT_FIELDS:
+            self.context[f].append(encode_context(f, ctx.get(f)))
+        signals = case.get("signals") or {}
+        for k, labels in SIGNAL_VOCABULARIES.items():
+            v = signals.get(k)
+            self.signals[k].append(labels.index(v) if v in labels else 0)
+        for f in TEXT_FIELDS:
+            self.text[f].append(self.pool.encode(case.get(f) or ""))
+        self.hints.append(self.pool.encode(";".join(case.get("next_checks_hint") or [])))
+
+        extra = {k: v for k, v in case.items() if k not in _CASE_KEYS}
+        self.extras.append(extra or None)
+
+    def extend(self, cases: Iterable[Dict[str, Any]]) -> None:
+        for c in cases:
+            self.append(c)
+
+    def reorder(self, order: Sequence[int]) -> None:
+        """Permute rows in place (order[i] = old index of new row i)."""
+        idx = np.asarray(order, dtype=np.intp)
+        width = len(METRIC_ORDER)
+
+        def take(arr: array, w: int = 1) -> array:
+            src = np.frombuffer(arr, dtype=arr.typecode).reshape(-1, w) if len(arr) else None
+            out = array(arr.typecode)
+            if src is not None:
+                out.frombytes(src[idx].tobytes())
+            return out
+
+        self.created_at = take(self.created_at)
+        self.metrics = take(self.metrics, width)
+        self.hints = take(self.hints)
+        self.context = {f: take(a) for f, a in self.context.items()}
+        self.signals = {k: take(a) for k, a in self.signals.items()}
+        self.text = {f: take(a) for f, a in self.text.items()}
+        self.case_ids = [self.case_ids[i] for i in idx]
+        self.created_at_iso = [self.created_at_iso[i] for i in idx]
+        self.extras = [self.extras[i] for i in idx]
+
+    # ---------- zero-copy NumPy views ----------
+    def times_view(self) -> np.ndarray:
+        return np.frombuffer(self.created_at, dtype=np.float64)
+
+    def metrics_view(self) -> np.ndarray:
+        return np.frombuffer(self.metrics, dtype=np.float64).reshape(len(self), len(METRIC_ORDER))
+
+    def context_view(self, field_name: str) -> np.ndarray:
+        return np.frombuffer(self.context[field_name], dtype=np.uint8)
+
+    def signal_view(self, key: str) -> np.ndarray:
+        return np.frombuffer(self.signals[key], dtype=np.uint8)
+
+    # ---------- materialization ----------
+    def row(self, i: int) -> Dict[str, Any]:
+        """Row i as the corpus JSON dict (for rendering / persistence)."""
+        width = len(METRIC_ORDER)
+        values = self.metrics[i * width:(i + 1) * width]
+        hints = self.pool.values[self.hints[i]]
+        case: Dict[str, Any] = {
+            "case_id": self.case_ids[i],
+            "created_at": self.created_at_iso[i],
+            "family": self.pool.values[self.text["family"][i]],
+            "title": self.pool.values[self.text["title"][i]],
+            "context": {f: CONTEXT_VOCABULARIES[f][self.context[f][i]] for f in CONTEXT_FIELDS},
+            "metrics": {k: (None if v != v else v) for k, v in zip(METRIC_ORDER, values)},
+            "signals": {k: SIGNAL_VOCABULARIES[k][self.signals[k][i]] for k in SIGNAL_VOCABULARIES},
+            "matched_signals_template": self.pool.values[self.text["matched_signals_template"][i]],
+            "resolution_summary": self.pool.values[self.text["resolution_summary"][i]],
+            "next_checks_hint": hints.split(";") if hints else [],
+        }
+        for k in ("affected_lot_count", "time_window_hours"):
+            v = case["metrics"][k]
+            if v is not None and v == int(v):
+                case["metrics"][k] = int(v)
+        if self.extras[i]:
+            case.update(self.extras[i])
+        return case
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
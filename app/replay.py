@@ -0,0 +1,270 @@
+# app/replay.py
+"""
+Deterministic replay of logged traffic through the current response pipeline.
+
+  python -m app.replay requests_responses.jsonl [--workers 4] [--limit N] [--weights-version V]
+                       [--out replay_summary.json] [--baseline previous_summary.json]
+
+Stored `request` objects, with any "derived" values merged back in, are streamed out of the
+log (plain or dedup form) in chunks and re-run with build_placeholder_response across a
+process pool. Each new response is diffed
+against the stored `response`, skipping IGNORED_FIELDS. Memory stays bounded for any log
+size: at most 2 x workers chunks are in flight, and the summary keeps counters, a fixed-size
+latency reservoir per stage and the first few diff examples.
+
+Similarity is scored with fixed weights, so a replay does not depend on feedback that arrived
+after the log was written. The defaults are feedback.DEFAULT_WEIGHTS. --weights-version loads
+one stored version from the feedback store; live responses record theirs in
+meta.weights_version.
+
+Latency deltas compare against the stage timings stored in each record's meta, when the
+record has them, and against a previous replay summary (--baseline).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.blobstore import iter_log
+from app.config import PERSIST_PATH, REPLAY_WORKERS, REPLAY_CHUNK_SIZE
+from app.pool import bounded_map
+from app.persistence import scored_request
+
+# meta: response id and timings change every run; scope_assessment: depends on the drift
+# monitor's state at submit time, which a replay cannot reproduce; similar_cases_page: holds
+# a fresh random cursor per run.
+IGNORED_FIELDS = {"meta", "baseline", "scope_assessment", "cross_site_cluster", "similar_cases_page"}
+STAGES = ("signals", "search", "rules", "total")
+MAX_EXAMPLES = 20
+EXAMPLE_CHARS = 200
+
+# (line number, [(path, stored, new)], new timings, stored timings, error)
+ReplayResult = Tuple[int, List[Tuple[str, Any, Any]], Dict[str, float], Optional[Dict[str, float]], Optional[str]]
+
+
+def diff_responses(old: Any, new: Any, path: str = "", depth: int = 3) -> List[Tuple[str, Any, Any]]:
+    """Changed paths between two responses, e.g. "similar_cases[0].case_id". Stops at `depth`."""
+    if old == new:
+        return []
+    if depth > 0 and isinstance(old, dict) and isinstance(new, dict):
+        out = []
+        for key in sorted(set(old) | set(new)):
+            if not path and key in IGNORED_FIELDS:
+                continue
+            sub = f"{path}.{key}" if path else key
+            out.extend(diff_responses(old.get(key), new.get(key), sub, depth - 1))
+        return out
+    if depth > 0 and isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        out = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            out.extend(diff_responses(a, b, f"{path}[{i}]", depth - 1))
+        return out
+    return [(path, old, new)]
+
+
+def _replay_chunk(records: List[Tuple[int, Dict[str, Any], Dict[str, Any]]], weights: Any) -> List[ReplayResult]:
+    """Worker task: rebuild responses for one chunk and diff them against the stored ones."""
+    from app.placeholder import build_placeholder_response
+
+    out: List[ReplayResult] = []
+    for line_no, request, stored in records:
+        stored_timings = (stored.get("meta") or {}).get("timings_ms")
+        try:
+            new = build_placeholder_response(request, weights=weights)
+        except Exception as e:  # report and keep going; one bad record must not stop a replay
+            out.append((line_no, [], {}, stored_timings, f"{type(e).__name__}: {e}"))
+            continue
+        out.append((line_no, diff_responses(stored, new), new["meta"]["timings_ms"], stored_timings, None))
+    return out
+
+
+def iter_record_chunks(path: str, chunk_size: int, limit: Optional[int] = None) -> Iterator[Tuple[List]]:
+    """(line number, request, stored response) triples, chunk_size at a time."""
+    records = (
+        (i, scored_request(rec), rec.get("response") or {})
+        for i, rec in enumerate(iter_log(path), start=1)
+    )
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield (chunk,)
+
+
+class LatencyStats:
+    """Count / mean plus a fixed-size uniform reservoir for percentiles (deterministic seed)."""
+
+    def __init__(self, reservoir_size: int = 4096, seed: int = 0) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.sample: List[float] = []
+        self.reservoir_size = reservoir_size
+        self._rng = random.Random(seed)
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self.total += x
+        if len(self.sample) < self.reservoir_size:
+            self.sample.append(x)
+        else:
+            j = self._rng.randrange(self.count)
+            if j < self.reservoir_size:
+                self.sample[j] = x
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.sample:
+            return None
+        ordered = sorted(self.sample)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+        }
+
+
+def _clip(value: Any) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= EXAMPLE_CHARS else text[:EXAMPLE_CHARS] + "…"
+
+
+def replay_log(
+    path: str = PERSIST_PATH,
+    *,
+    workers: int = REPLAY_WORKERS,
+    chunk_size: int = REPLAY_CHUNK_SIZE,
+    limit: Optional[int] = None,
+    weights: Any = None,
+) -> Dict[str, Any]:
+    """Replay a log and return the summary (see module docstring). weights: default DEFAULT_WEIGHTS."""
+    from app.feedback import DEFAULT_WEIGHTS
+
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    # Warm the corpus and rules in the parent so forked workers inherit them copy-on-write.
+    from app.corpus import load_corpus
+    from app.rules import get_rulebook
+
+    load_corpus()
+    get_rulebook().compiled()
+
+    new_stats = {s: LatencyStats() for s in STAGES}
+    stored_stats = {s: LatencyStats() for s in STAGES}
+    paired_delta = {s: LatencyStats() for s in STAGES}  # new - stored, same record
+    changed_fields: Counter = Counter()
+    summary: Dict[str, Any] = {"log": path, "records": 0, "unchanged": 0, "changed": 0, "errors": 0}
+    examples: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        chunks = ((chunk, weights) for (chunk,) in iter_record_chunks(path, chunk_size, limit))
+        for results in bounded_map(pool, _replay_chunk, chunks, max_in_flight=workers * 2):
+            for line_no, diffs, timings, stored_timings, error in results:
+                summary["records"] += 1
+                if error is not None:
+                    summary["errors"] += 1
+                    if len(errors) < MAX_EXAMPLES:
+                        errors.append({"line": line_no, "error": error})
+                    continue
+                summary["changed" if diffs else "unchanged"] += 1
+                # Count each changed top-level field once per record.
+                changed_fields.update({p.split(".")[0].split("[")[0] for p, _, _ in diffs})
+                for p, old, new in diffs:
+                    if len(examples) < MAX_EXAMPLES:
+                        examples.append({"line": line_no, "path": p, "stored": _clip(old), "new": _clip(new)})
+                for s in STAGES:
+                    new_stats[s].add(timings[s])
+                    if stored_timings and s in stored_timings:
+                        stored_stats[s].add(stored_timings[s])
+                        paired_delta[s].add(timings[s] - stored_timings[s])
+
+    summary["changed_fields"] = dict(changed_fields.most_common())
+    summary["latency"] = {
+        s: {
+            "new": new_stats[s].to_dict(),
+            "stored": stored_stats[s].to_dict(),
+            "delta_vs_stored": paired_delta[s].to_dict(),
+        }
+        for s in STAGES
+    }
+    summary["examples"] = examples
+    summary["error_examples"] = errors
+    return summary
+
+
+def compare_to_baseline(summary: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Per-stage mean/p50/p95 deltas (ms) of this replay's new latencies vs a previous replay's."""
+    out: Dict[str, Dict[str, Optional[float]]] = {}
+    for s in STAGES:
+        cur = summary["latency"][s]["new"]
+        base = ((baseline.get("latency") or {}).get(s) or {}).get("new") or {}
+        out[s] = {
+            k: None if cur.get(k) is None or base.get(k) is None else round(cur[k] - base[k], 3)
+            for k in ("mean_ms", "p50_ms", "p95_ms")
+        }
+    return out
+
+
+def _fmt(x: Optional[float], signed: bool = False) -> str:
+    if x is None:
+        return "—"
+    return f"{x:+.2f}" if signed else f"{x:.2f}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=PERSIST_PATH)
+    parser.add_argument("--workers", type=int, default=REPLAY_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=REPLAY_CHUNK_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N records")
+    parser.add_argument("--out", help="write the full summary as JSON")
+    parser.add_argument("--baseline", help="summary JSON of a previous replay to compare latencies against")
+    parser.add_argument("--weights-version", type=int, help="score with this stored feedback weight version")
+    args = parser.parse_args(argv)
+
+    weights = None
+    if args.weights_version is not None:
+        from app.feedback import get_weight_store
+
+        weights = get_weight_store().load_version(args.weights_version)
+    summary = replay_log(
+        args.path, workers=args.workers, chunk_size=args.chunk_size, limit=args.limit, weights=weights
+    )
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            summary["delta_vs_baseline"] = compare_to_baseline(summary, json.load(f))
+
+    print(
+        f"records={summary['records']} unchanged={summary['unchanged']} "
+        f"changed={summary['changed']} errors={summary['errors']}"
+    )
+    for field, n in summary["changed_fields"].items():
+        print(f"  changed {field}: {n}")
+    print(f"{'stage':<8} {'p50 ms':>8} {'p95 ms':>8} {'Δmean vs stored':>16} {'Δp50 vs baseline':>17}")
+    for s in STAGES:
+        lat = summary["latency"][s]
+        base = (summary.get("delta_vs_baseline") or {}).get(s, {})
+        print(
+            f"{s:<8} {_fmt(lat['new']['p50_ms']):>8} {_fmt(lat['new']['p95_ms']):>8} "
+            f"{_fmt(lat['delta_vs_stored']['mean_ms'], True):>16} {_fmt(base.get('p50_ms'), True):>17}"
+        )
+    for ex in summary["examples"][:5]:
+        print(f"  line {ex['line']}: {ex['path']}: {ex['stored']} -> {ex['new']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# app/retrieval.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    SITES,
+    TOOL_GROUPS,
+    PROCESS_STEPS,
+    RETRIEVAL_WINDOW_DAYS,
+    RECENCY_HALF_LIFE_DAYS,
+    SIMILAR_TOP_K,
+)
+from app.corpus import CONTEXT_FIELDS, CaseCorpus, load_corpus, to_epoch
+from app.records import encode_context
+from app.schema import METRIC_ORDER
+
+DAY_SECONDS = 86400.0
+
+# Weight of metric closeness vs. context agreement in the raw similarity (sums to 1).
+METRIC_WEIGHT = 0.7
+CONTEXT_WEIGHT = 0.3
+
+_CONTEXT_OPTIONS = {"site": SITES, "tool_group": TOOL_GROUPS, "process_step": PROCESS_STEPS}
+
+
+def query_vector(payload: Dict[str, Any]) -> np.ndarray:
+    """Payload metrics in METRIC_ORDER; NaN for missing values."""
+    metrics = payload.get("metrics") or {}
+    return np.array(
+        [np.nan if metrics.get(k) is None else float(metrics[k]) for k in METRIC_ORDER],
+        dtype=np.float64,
+    )
+
+
+def selected_context(payload: Dict[str, Any]) -> Dict[str, str]:
+    """Context fields the engineer actually picked (placeholder options are skipped)."""
+    out: Dict[str, str] = {}
+    for f in CONTEXT_FIELDS:
+        v = payload.get(f)
+        if v and v != _CONTEXT_OPTIONS[f][0]:
+            out[f] = v
+    return out
+
+
+def score_slice(
+    corpus: CaseCorpus, sl: slice, payload: Dict[str, Any], weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Raw similarity in [0, 1] for corpus rows in `sl` (vectorized over the slice only).
+      - metric part: exp(-0.5 * weighted mean squared z-distance) over metrics present on both sides
+      - context part: weighted fraction of selected context fields and query signal buckets that match
+    weights: per-feature weights in feedback.FEATURE_NAMES order (default: feedback.DEFAULT_WEIGHTS,
+    so results don't depend on the feedback store unless the caller passes its live weights).
+    """
+    from app.buckets import classify_metrics
+    from app.feedback import CONTEXT_INDEX, DEFAULT_WEIGHTS, METRIC_SLICE, SIGNAL_INDEX
+
+    w = DEFAULT_WEIGHTS if weights is None else weights
+    q = query_vector(payload)
+    block = corpus.metrics[sl]
+    n = block.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    z = (block - q) / corpus.metric_scale
+    present = np.isfinite(z)
+    wm = w[METRIC_SLICE]
+    wsum = present @ wm
+    sq = np.where(present, z * z, 0.0) @ wm
+    with np.errstate(invalid="ignore", divide="ignore"):
+        metric_sim = np.where(wsum > 0, np.exp(-0.5 * sq / np.where(wsum > 0, wsum, 1.0)), 0.0)
+
+    agree = np.zeros(n)
+    total = 0.0
+    for f, v in selected_context(payload).items():
+        wf = w[CONTEXT_INDEX[f]]
+        if wf > 0:
+            agree += wf * (corpus.context[f][sl] == encode_context(f, v))
+            total += wf
+    query_codes = classify_metrics(q)
+    for b, i in SIGNAL_INDEX.items():
+        code = int(query_codes[b][0])
+        if code and w[i] > 0:
+            agree += w[i] * (corpus.signals[b][sl] == code)
+            total += w[i]
+    if total == 0:
+        return metric_sim
+    return METRIC_WEIGHT * metric_sim + CONTEXT_WEIGHT * agree / total
+
+
+def recency_weights(times: np.ndarray, ref_time: float, half_life_days: Optional[float]) -> np.ndarray:
+    """Exponential decay 0.5 ** (age / half_life); cases newer than the intake get weight 1."""
+    if not half_life_days:
+        return np.ones_like(times)
+    age_days = np.maximum(ref_time - times, 0.0) / DAY_SECONDS
+    return np.exp2(-age_days / half_life_days)
+
+
+def rank_similar(
+    payload: Dict[str, Any],
+    *,
+    corpus: Optional[CaseCorpus] = None,
+    top_k: int = SIMILAR_TOP_K,
+    window_days: Optional[float] = RETRIEVAL_WINDOW_DAYS,
+    half_life_days: Optional[float] = RECENCY_HALF_LIFE_DAYS,
+    weights: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rank corpus cases for a payload.
+
+    The intake timestamp is the reference time: with window_days set, only cases created in
+    [timestamp - window_days, timestamp] are scored (bisect on the time index). Ranking uses
+    similarity * recency weight; the returned "similarity" stays unweighted so labels remain
+    comparable across old and new precedents.
+
+    Returns: [{"case_id", "similarity", "score"}], best first. No case record is materialized.
+    """
+    corpus = corpus if corpus is not None else load_corpus()
+    if len(corpus) == 0 or top_k <= 0:
+        return []
+
+    ts = payload.get("timestamp")
+    ref_time = to_epoch(ts) if ts else float(corpus.times[-1])
+    start = ref_time - window_days * DAY_SECONDS if window_days is not None else None
+    end = ref_time if window_days is not None else None
+    sl = corpus.time_slice(start, end)
+
+    sim = score_slice(corpus, sl, payload, weights)
+    if sim.size == 0:
+        return []
+    score = sim * recency_weights(corpus.time_array[sl], ref_time, half_life_days)
+
+    k = min(top_k, score.size)
+    top = np.argpartition(-score, k - 1)[:k]
+    top = top[np.argsort(-score[top], kind="stable")]
+
+    case_ids = corpus.case_ids
+    return [
+        {"case_id": str(case_ids[sl.start + int(i)]), "similarity": float(sim[i]), "score": float(score[i])}
+        for i in top
+    ]
+
+
+def search_similar(payload: Dict[str, Any], **kwargs: Any) -> List[Dict[str, Any]]:
+    """rank_similar() plus each hit's case record: [{"case_id", "similarity", "score", "case"}]."""
+    corpus = kwargs.get("corpus")
+    corpus = corpus if corpus is not None else load_corpus()
+    hits = rank_similar(payload, **{**kwargs, "corpus": corpus})
+    for hit in hits:
+        hit["case"] = corpus.get(hit["case_id"])
+    return hits
@@ -0,0 +1,225 @@
+# app/rules.py
+"""
+Decision-table rules engine for next checks.
+
+The table (NEXT_CHECK_RULES_PATH) lists rules in output order:
+
+  {"id": "...", "when": {...}, "category": "...", "check": "...", "why": "..."}
+
+"when" keys (all must hold; an empty "when" always fires):
+  - severity / site / tool_group / process_step / <signal key>:
+        ["v1", "v2"]  (value in list)  or  {"not": ["v1"]}  (value not in list)
+  - metrics_present / metrics_missing: [metric keys]
+  - hints_any: [next_checks_hint values]; fires if any similar case carries one of them
+
+The table is compiled once into per-feature lookup tables of bit-packed rule sets, so a
+batch of payloads is evaluated against every rule with one gather + AND per constrained
+feature (8 rules per byte). The file is re-read when its mtime changes.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import SEVERITY_LEVELS, NEXT_CHECK_RULES_PATH
+from app.records import CONTEXT_VOCABULARIES, SIGNAL_VOCABULARIES
+from app.schema import METRIC_ORDER
+
+# Categorical features: name -> vocabulary (code = index; unknown values -> 0).
+FEATURE_VOCABULARIES: Dict[str, Sequence[Optional[str]]] = {
+    "severity": SEVERITY_LEVELS,
+    **CONTEXT_VOCABULARIES,
+    **SIGNAL_VOCABULARIES,
+}
+
+_OUTPUT_KEYS = ("category", "check", "why")
+
+
+def _code(vocab: Sequence[Optional[str]], value: Any) -> int:
+    try:
+        return vocab.index(value)
+    except ValueError:
+        return 0
+
+
+@dataclass
+class CompiledRules:
+    """
+    Rules packed as bitsets (bit i = rule i). Every condition is a categorical feature with a
+    (codes, n_bytes) lookup table of the rules it allows, so evaluation is one gather + AND
+    per constrained feature regardless of how many rules share it.
+    """
+
+    rules: List[Dict[str, str]]  # outputs in table order
+    tables: Dict[str, np.ndarray]  # feature -> (len(vocab), n_bytes) uint8 packed rule bits
+    hint_names: List[str]
+    hint_bits: np.ndarray  # (H, n_bytes): rules satisfied by each hint
+    no_hint_bits: np.ndarray  # (n_bytes,): rules without a hints_any condition
+
+    def evaluate(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """features (see encode_batch) -> (n, R) bool matrix of fired rules."""
+        n = features["hints"].shape[0]
+        fired = np.full((n, self.no_hint_bits.size), 0xFF, dtype=np.uint8)
+        for name, table in self.tables.items():
+            fired &= table[features[name]]
+        hint_ok = np.broadcast_to(self.no_hint_bits, fired.shape).copy()
+        for j in range(len(self.hint_names)):
+            rows = features["hints"][:, j]
+            hint_ok[rows] |= self.hint_bits[j]
+        fired &= hint_ok
+        return np.unpackbits(fired, axis=1, count=len(self.rules)).astype(bool)
+
+
+def _pack(allowed: np.ndarray) -> np.ndarray:
+    """(R, V) bool -> (V, ceil(R/8)) uint8 packed per code."""
+    return np.packbits(allowed.T, axis=1)
+
+
+def compile_rules(table: Dict[str, Any]) -> CompiledRules:
+    """Validate and compile a rules table. Raises ValueError on unknown keys/values."""
+    rules = table.get("rules")
+    if not isinstance(rules, list):
+        raise ValueError("Rules table must have a 'rules' list.")
+    r = len(rules)
+    hint_names = sorted({h for rule in rules for h in (rule.get("when") or {}).get("hints_any", [])})
+
+    allowed = {name: np.ones((r, len(vocab)), dtype=bool) for name, vocab in FEATURE_VOCABULARIES.items()}
+    # Metric presence as binary features: code 0 = missing, 1 = present.
+    allowed.update({f"present:{m}": np.ones((r, 2), dtype=bool) for m in METRIC_ORDER})
+    hint_req = np.zeros((r, len(hint_names)), dtype=bool)
+    outputs: List[Dict[str, str]] = []
+
+    for i, rule in enumerate(rules):
+        rid = rule.get("id", f"#{i}")
+        missing_out = [k for k in _OUTPUT_KEYS if not rule.get(k)]
+        if missing_out:
+            raise ValueError(f"Rule {rid}: missing {missing_out}.")
+        outputs.append({k: rule[k] for k in _OUTPUT_KEYS})
+
+        for key, cond in (rule.get("when") or {}).items():
+            if key == "hints_any":
+                hint_req[i, [hint_names.index(h) for h in cond]] = True
+                continue
+            if key in ("metrics_present", "metrics_missing"):
+                unknown = set(cond) - set(METRIC_ORDER)
+                if unknown:
+                    raise ValueError(f"Rule {rid}: unknown metrics {sorted(unknown)}.")
+                for m in cond:
+                    # present required -> code 0 (missing) not allowed, and vice versa
+                    allowed[f"present:{m}"][i, 0 if key == "metrics_present" else 1] = False
+                continue
+
+            vocab = FEATURE_VOCABULARIES.get(key)
+            if vocab is None:
+                raise ValueError(f"Rule {rid}: unknown condition {key!r}.")
+            negate = isinstance(cond, dict)
+            values = cond.get("not", []) if negate else cond
+            unknown = [v for v in values if v not in vocab]
+            if unknown:
+                raise ValueError(f"Rule {rid}: unknown {key} values {unknown}.")
+            mask = np.zeros(len(vocab), dtype=bool)
+            mask[[vocab.index(v) for v in values]] = True
+            allowed[key][i] = ~mask if negate else mask
+
+    # Features no rule constrains are dropped from evaluation entirely.
+    tables = {name: _pack(t) for name, t in allowed.items() if not t.all()}
+    n_bytes = (r + 7) // 8
+    return CompiledRules(
+        rules=outputs,
+        tables=tables,
+        hint_names=hint_names,
+        # No hints_any anywhere: an empty (0, n_bytes) table, which packbits can't shape.
+        hint_bits=np.packbits(hint_req.T, axis=1) if hint_names else np.zeros((0, n_bytes), np.uint8),
+        no_hint_bits=np.packbits(~hint_req.any(axis=1)),
+    )
+
+
+def encode_batch(
+    payloads: List[Dict[str, Any]],
+    signals: List[Dict[str, Optional[str]]],
+    hints: List[Sequence[str]],
+    hint_names: List[str],
+) -> Dict[str, np.ndarray]:
+    """Payloads (+ their bucketed signals and similar-case hints) -> feature code arrays."""
+    features: Dict[str, np.ndarray] = {}
+    for name, vocab in FEATURE_VOCABULARIES.items():
+        source = signals if name in SIGNAL_VOCABULARIES else payloads
+        features[name] = np.array([_code(vocab, row.get(name)) for row in source], dtype=np.intp)
+    for m in METRIC_ORDER:
+        features[f"present:{m}"] = np.array(
+            [(p.get("metrics") or {}).get(m) is not None for p in payloads], dtype=np.intp
+        )
+    hint_index = {h: j for j, h in enumerate(hint_names)}
+    multi_hot = np.zeros((len(payloads), len(hint_names)), dtype=bool)
+    for i, hs in enumerate(hints):
+        for h in hs:
+            j = hint_index.get(h)
+            if j is not None:
+                multi_hot[i, j] = True
+    features["hints"] = multi_hot
+    return features
+
+
+class RuleBook:
+    """Compiled rules table, recompiled when the file's mtime changes."""
+
+    def __init__(self, path: str = NEXT_CHECK_RULES_PATH) -> None:
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._compiled: Optional[CompiledRules] = None
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+
+    def compiled(self) -> CompiledRules:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            # Deleted or renamed mid-run: keep serving the last good table.
+            if self._compiled is None:
+                raise
+            self.last_error = f"{self.path}: {e}"
+            return self._compiled
+        if self._compiled is None or mtime != self._mtime:
+            with self._lock:
+                if self._compiled is None or mtime != self._mtime:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            self._compiled = compile_rules(json.load(f))
+                        self.last_error = None
+                    except (OSError, ValueError) as e:
+                        # Keep serving the previous table if an edit is broken.
+                        self.last_error = f"{self.path}: {e}"
+                        if self._compiled is None:
+                            raise
+                    self._mtime = mtime
+        return self._compiled
+
+    def next_checks_batch(
+        self,
+        payloads: List[Dict[str, Any]],
+        signals: List[Dict[str, Optional[str]]],
+        hints: List[Sequence[str]],
+    ) -> List[List[Dict[str, str]]]:
+        compiled = self.compiled()
+        fired = compiled.evaluate(encode_batch(payloads, signals, hints, compiled.hint_names))
+        return [[dict(compiled.rules[i]) for i in np.flatnonzero(row)] for row in fired]
+
+    def next_checks(
+        self, payload: Dict[str, Any], signals: Dict[str, Optional[str]], hints: Sequence[str] = ()
+    ) -> List[Dict[str, str]]:
+        return self.next_checks_batch([payload], [signals], [hints])[0]
+
+
+_RULEBOOKS: Dict[str, RuleBook] = {}
+
+
+def get_rulebook(path: str = NEXT_CHECK_RULES_PATH) -> RuleBook:
+    book = _RULEBOOKS.get(path)
+    if book is None:
+        book = _RULEBOOKS.setdefault(path, RuleBook(path))
+    return book
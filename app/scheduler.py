@@ -0,0 +1,274 @@
+# app/scheduler.py
+"""
+Severity-aware admission and scheduling in front of the response pipeline.
+
+Submissions queue by severity (SEVERITY_LEVELS order: later = more urgent; FIFO within a
+level) and a fixed pool of worker threads drains the queue highest severity first. Before
+a submission is queued:
+  - the client's token bucket must have a token (SCHEDULER_CLIENT_RATE_PER_S refill up to
+    SCHEDULER_CLIENT_BURST), otherwise it gets a "rate_limited" try-again response;
+  - if SCHEDULER_MAX_QUEUE_DEPTH submissions are already waiting, it evicts the newest
+    waiting submission of lower severity, or is shed itself when there is none ("shed").
+
+Used in-process by Streamlit (run) and from async API handlers (submit_async).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import (
+    SEVERITY_LEVELS,
+    SCHEDULER_WORKERS,
+    SCHEDULER_MAX_QUEUE_DEPTH,
+    SCHEDULER_CLIENT_RATE_PER_S,
+    SCHEDULER_CLIENT_BURST,
+    SCHEDULER_RETRY_AFTER_S,
+)
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+TRY_AGAIN_STATUSES = {"rate_limited", "shed"}
+MAX_TRACKED_CLIENTS = 10_000
+
+
+def severity_rank(severity: Optional[str]) -> int:
+    """Heap key: more urgent severities sort first. Unknown/placeholder values go last."""
+    try:
+        return -SEVERITY_LEVELS.index(severity)
+    except ValueError:
+        return 0
+
+
+def try_again_response(status: str, retry_after_s: float) -> Dict[str, Any]:
+    """Response returned instead of a triage result when a submission is not admitted."""
+    reason = (
+        "Too many submissions from this client"
+        if status == "rate_limited"
+        else "The triage queue is full"
+    )
+    return {
+        "similar_cases": [],
+        "no_strong_match_note": None,
+        "next_checks": [],
+        "escalation_summary": "",
+        "narrative": "",
+        "meta": {
+            "status": status,
+            "retry_after_s": round(retry_after_s, 1),
+            "message": f"{reason}. Please try again in about {max(1, round(retry_after_s))} s.",
+        },
+    }
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume a token. Returns 0.0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class WaitStats:
+    """Queue-wait metrics: totals plus a window of recent waits for percentiles."""
+
+    def __init__(self, window: int = 1024) -> None:
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, wait_s: float) -> None:
+        self.count += 1
+        self.total_s += wait_s
+        self.max_s = max(self.max_s, wait_s)
+        self.recent.append(wait_s)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def pct(q: float) -> Optional[float]:
+            return round(1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2) if ordered else None
+
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.total_s / self.count, 2) if self.count else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(1000 * self.max_s, 2),
+        }
+
+
+class _Job:
+    __slots__ = ("payload", "severity", "enqueued", "future")
+
+    def __init__(self, payload: Dict[str, Any], severity: str) -> None:
+        self.payload = payload
+        self.severity = severity
+        self.enqueued = time.monotonic()
+        self.future: Future = Future()
+
+
+class TriageScheduler:
+    """Priority queue + bounded worker threads + per-client rate limits + load shedding."""
+
+    def __init__(
+        self,
+        handler: Optional[Handler] = None,
+        *,
+        workers: int = SCHEDULER_WORKERS,
+        max_queue_depth: int = SCHEDULER_MAX_QUEUE_DEPTH,
+        client_rate_per_s: float = SCHEDULER_CLIENT_RATE_PER_S,
+        client_burst: float = SCHEDULER_CLIENT_BURST,
+        retry_after_s: float = SCHEDULER_RETRY_AFTER_S,
+    ) -> None:
+        self.handler = handler
+        self.max_queue_depth = max_queue_depth
+        self.client_rate_per_s = client_rate_per_s
+        self.client_burst = client_burst
+        self.retry_after_s = retry_after_s
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._seq = itertools.count()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.in_flight = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rate_limited": 0, "shed": 0, "evicted": 0}
+        self.waits: Dict[str, WaitStats] = {}
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"triage-worker-{i}") for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ---------- admission ----------
+    def submit(self, payload: Dict[str, Any], client_id: str = "anonymous") -> Future:
+        """Queue a payload. The future resolves to the response (or a try-again response)."""
+        severity = payload.get("severity") or ""
+        with self._cond:
+            self.counters["submitted"] += 1
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                    self._prune_idle_buckets()
+                bucket = self._buckets[client_id] = TokenBucket(self.client_rate_per_s, self.client_burst)
+            wait = bucket.take()
+            if wait > 0:
+                self.counters["rate_limited"] += 1
+                return self._resolved(try_again_response("rate_limited", wait))
+
+            rank = severity_rank(severity)
+            if len(self._heap) >= self.max_queue_depth and not self._evict_below(rank):
+                self.counters["shed"] += 1
+                return self._resolved(try_again_response("shed", self.retry_after_s))
+
+            job = _Job(payload, severity)
+            heapq.heappush(self._heap, (rank, next(self._seq), job))
+            self._cond.notify()
+            return job.future
+
+    def _prune_idle_buckets(self) -> None:
+        """Forget clients whose bucket has refilled completely (same state as a new bucket)."""
+        now = time.monotonic()
+        refill_s = self.client_burst / self.client_rate_per_s if self.client_rate_per_s > 0 else float("inf")
+        for cid in [c for c, b in self._buckets.items() if now - b.updated >= refill_s]:
+            del self._buckets[cid]
+
+    def _evict_below(self, rank: int) -> bool:
+        """Drop the newest queued job less urgent than `rank` to make room. Caller holds the lock."""
+        candidates = [i for i, (r, _, _) in enumerate(self._heap) if r > rank]
+        if not candidates:
+            return False
+        i = max(candidates, key=lambda i: (self._heap[i][0], self._heap[i][1]))
+        _, _, victim = self._heap[i]
+        self._heap[i] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+        self.counters["evicted"] += 1
+        victim.future.set_result(try_again_response("shed", self.retry_after_s))
+        return True
+
+    @staticmethod
+    def _resolved(response: Dict[str, Any]) -> Future:
+        f: Future = Future()
+        f.set_result(response)
+        return f
+
+    def run(self, payload: Dict[str, Any], client_id: str = "anonymous", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocking submit (Streamlit script thread)."""
+        return self.submit(payload, client_id).result(timeout=timeout)
+
+    async def submit_async(self, payload: Dict[str, Any], client_id: str = "anonymous") -> Dict[str, Any]:
+        """Awaitable submit for async API handlers; the event loop is never blocked."""
+        return await asyncio.wrap_future(self.submit(payload, client_id))
+
+    # ---------- workers ----------
+    def _worker(self) -> None:
+        handler = self.handler
+        if handler is None:
+            from app.placeholder import build_live_response as handler
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._heap:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self.in_flight += 1
+                self.waits.setdefault(job.severity, WaitStats()).add(time.monotonic() - job.enqueued)
+            try:
+                job.future.set_result(handler(job.payload))
+                outcome = "completed"
+            except Exception as e:
+                job.future.set_exception(e)
+                outcome = "failed"
+            with self._cond:
+                self.in_flight -= 1
+                self.counters[outcome] += 1
+
+    def close(self) -> None:
+        """Finish queued work, then stop the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    # ---------- metrics ----------
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            depth: Dict[str, int] = {}
+            for _, _, job in self._heap:
+                depth[job.severity] = depth.get(job.severity, 0) + 1
+            return {
+                **self.counters,
+                "queue_depth": len(self._heap),
+                "queue_depth_by_severity": depth,
+                "in_flight": self.in_flight,
+                "clients": len(self._buckets),
+                "queue_wait_by_severity": {s: w.to_dict() for s, w in self.waits.items()},
+            }
+
+
+@lru_cache(maxsize=None)
+def get_scheduler() -> TriageScheduler:
+    return TriageScheduler()
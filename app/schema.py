@@ -8,5 +8,19 @@ METRIC_KEYS = {
     "time_window_hours",
 }
 
+# Metrics that are counts/hours rather than measurements.
+INT_METRICS = {"affected_lot_count", "time_window_hours"}
+
 # Example defaults (you asked for hard-coded defaults earlier).
 # NOTE: In this app, we do NOT auto-fill these into inputs, to keep readiness honest.
+
+# Stable column order for metric vectors (METRIC_KEYS is a set).
+METRIC_ORDER = (
+    "yield_pct",
+    "affected_lot_count",
+    "time_window_hours",
+    "metric_variance",
+    "change_magnitude",
+    "measurement_confidence",
+    "rework_rate",
+)
@@ -0,0 +1,188 @@
+# app/shards.py
+from __future__ import annotations
+
+import heapq
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    SITES,
+    TOOL_GROUPS,
+    CASES_PATH,
+    SHARD_BY,
+    SHARD_WORKERS,
+    SHARDED_SEARCH_MIN_CASES,
+    SIMILAR_TOP_K,
+    RETRIEVAL_WINDOW_DAYS,
+    RECENCY_HALF_LIFE_DAYS,
+    NEARDUP_OVERSAMPLE,
+)
+from app.corpus import CaseCorpus, load_corpus
+from app.retrieval import rank_similar
+
+SHARD_DIMENSIONS = {"site": SITES, "tool_group": TOOL_GROUPS}
+
+# (score, similarity, case_id) — what a shard sends back to the parent.
+ShardHit = Tuple[float, float, str]
+
+# Shards resident in this process. The parent fills it before the pool forks, so
+# workers inherit it copy-on-write; spawn-based platforms rebuild it in _init_worker.
+_SHARDS: Dict[str, CaseCorpus] = {}
+
+
+def build_shards(corpus: CaseCorpus, by: str = SHARD_BY) -> Dict[str, CaseCorpus]:
+    """Partition a corpus on a context dimension. Every shard shares the full corpus' metric scale."""
+    if by not in SHARD_DIMENSIONS:
+        raise ValueError(f"Cannot shard by {by!r}; expected one of {sorted(SHARD_DIMENSIONS)}.")
+    codes = corpus.context[by]
+    shards = {}
+    for code in np.unique(codes).tolist():
+        rows = np.flatnonzero(codes == code).tolist()
+        key = SHARD_DIMENSIONS[by][code]
+        shards[key] = CaseCorpus((corpus.case(i) for i in rows), metric_scale=corpus.metric_scale)
+    return shards
+
+
+def _init_worker(cases_path: str, by: str) -> None:
+    global _SHARDS
+    if not _SHARDS:
+        _SHARDS = build_shards(load_corpus(cases_path), by)
+
+
+def _search_shard(
+    key: str,
+    payload: Dict[str, Any],
+    top_k: int,
+    window_days: Optional[float],
+    half_life_days: Optional[float],
+    weights: np.ndarray,
+) -> List[ShardHit]:
+    """Worker task: top-k of one resident shard, best first. Only ids/scores cross the process boundary."""
+    shard = _SHARDS.get(key)
+    if shard is None:
+        return []
+    hits = rank_similar(
+        payload,
+        corpus=shard,
+        top_k=top_k,
+        window_days=window_days,
+        half_life_days=half_life_days,
+        weights=weights,
+    )
+    return [(h["score"], h["similarity"], h["case_id"]) for h in hits]
+
+
+def merge_top_k(shard_results: List[List[ShardHit]], top_k: int) -> List[ShardHit]:
+    """Heap-based k-way merge of per-shard lists (each already sorted best first)."""
+    merged = heapq.merge(*shard_results, key=lambda h: -h[0])
+    return list(itertools.islice(merged, top_k))
+
+
+class ShardedSearcher:
+    """Corpus sharded by site or tool_group, kept resident in a persistent process pool."""
+
+    def __init__(
+        self, cases_path: str = CASES_PATH, by: str = SHARD_BY, workers: int = SHARD_WORKERS
+    ) -> None:
+        global _SHARDS
+        self.by = by
+        self.corpus = load_corpus(cases_path)
+        _SHARDS = build_shards(self.corpus, by)
+        self.shard_keys = sorted(_SHARDS)
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(cases_path, by),
+        )
+
+    def shards_for(self, payload: Dict[str, Any]) -> List[str]:
+        """
+        Shard pruning: a selected context value targets its own shard. A missing or placeholder
+        value, or one with no shard (no cases there yet), falls back to every shard.
+        """
+        value = payload.get(self.by)
+        if value and value != SHARD_DIMENSIONS[self.by][0] and value in self.shard_keys:
+            return [value]
+        return self.shard_keys
+
+    def _fan_out(self, keys: List[str], payload: Dict[str, Any], *args: Any) -> List[List[ShardHit]]:
+        futures = [self.pool.submit(_search_shard, key, payload, *args) for key in keys]
+        return [f.result() for f in futures]
+
+    def rank(
+        self,
+        payload: Dict[str, Any],
+        *,
+        top_k: int = SIMILAR_TOP_K,
+        window_days: Optional[float] = RETRIEVAL_WINDOW_DAYS,
+        half_life_days: Optional[float] = RECENCY_HALF_LIFE_DAYS,
+        weights: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Same contract as retrieval.rank_similar, over the shards_for() the payload. A pruned
+        query ranks within its own shard; if that shard has fewer than top_k candidates (e.g.
+        a new site, or a tight time window), the other shards are searched to fill the list.
+        """
+        # Workers score with the parent's weights (sent per task), so feedback applies without a reload.
+        if weights is None:
+            from app.feedback import DEFAULT_WEIGHTS
+
+            weights = DEFAULT_WEIGHTS
+        args = (top_k, window_days, half_life_days, weights)
+        keys = self.shards_for(payload)
+        results = self._fan_out(keys, payload, *args)
+        if len(keys) < len(self.shard_keys) and sum(map(len, results)) < top_k:
+            results += self._fan_out([k for k in self.shard_keys if k not in keys], payload, *args)
+        merged = merge_top_k(results, top_k)
+        return [{"case_id": case_id, "similarity": sim, "score": score} for score, sim, case_id in merged]
+
+    def search(self, payload: Dict[str, Any], **kwargs: Any) -> List[Dict[str, Any]]:
+        """Same contract as retrieval.search_similar."""
+        hits = self.rank(payload, **kwargs)
+        for hit in hits:
+            hit["case"] = self.corpus.get(hit["case_id"])
+        return hits
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+@lru_cache(maxsize=None)
+def get_searcher(cases_path: str = CASES_PATH) -> ShardedSearcher:
+    return ShardedSearcher(cases_path)
+
+
+def rank_cases(
+    payload: Dict[str, Any], limit: int = SIMILAR_TOP_K, weights: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ranked similar-case ids for the response builder: in-process for small corpora, sharded
+    fan-out for large. Fetches NEARDUP_OVERSAMPLE x limit candidates and keeps the best of each
+    near-duplicate group. Returns [{"case_id", "similarity", "score"}] without case records.
+    weights: as in retrieval.score_slice (default: the fixed defaults).
+    """
+    from app.neardup import corpus_index, diversify
+
+    corpus = load_corpus()
+    pool_k = limit * NEARDUP_OVERSAMPLE
+    if len(corpus) >= SHARDED_SEARCH_MIN_CASES:
+        hits = get_searcher().rank(payload, top_k=pool_k, weights=weights)
+    else:
+        hits = rank_similar(payload, top_k=pool_k, weights=weights)
+    return diversify(hits, corpus_index(corpus), limit)
+
+
+def search_cases(payload: Dict[str, Any], top_k: int = SIMILAR_TOP_K) -> List[Dict[str, Any]]:
+    """rank_cases() with each hit's case record attached."""
+    corpus = load_corpus()
+    hits = rank_cases(payload, top_k)
+    for hit in hits:
+        hit["case"] = corpus.get(hit["case_id"])
+    return hits
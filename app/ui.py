@@ -20,13 +20,17 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
       inputs: dict with context/core/advanced + mode + form_metrics
       metrics_json_raw: str (empty if mode != "JSON")
 
+    In "Measurements" mode the metrics are derived on submit from an uploaded CSV/Parquet
+    file (inputs["measurement_file"], see app/measurements.py); only the time window is typed.
+
     IMPORTANT (locked):
       - JSON validation is NOT performed here (validate only on submit in main.py)
-      - Readiness in JSON mode uses "textarea non-empty" as the proxy for metrics completeness.
+      - Readiness in JSON mode uses "textarea non-empty" as the proxy for metrics completeness
+        (an uploaded file in Measurements mode).
     """
     st.radio(
         "Metrics input mode",
-        ["Form", "JSON"],
+        ["Form", "JSON", "Measurements"],
         horizontal=True,
         key="mode"
     )
@@ -37,6 +41,7 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
         # ---------- Expanders ----------
         yield_pct = affected_lot_count = time_window_hours = None
         metric_variance = change_magnitude = measurement_confidence = rework_rate = None
+        measurement_file = None
         with st.expander("Context", expanded=True):
             st.caption("Where and how the issue is occurring.")
             site = st.selectbox("Site", SITES, index=0)
@@ -82,6 +87,16 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
                     placeholder=int(DEFAULTS["time_window_hours"]),
                     step=1,
                 )
+            elif mode == "Measurements":
+                time_window_hours = st.number_input(
+                    "Time window (hours)",
+                    min_value=1,
+                    value=None,
+                    placeholder=int(DEFAULTS["time_window_hours"]),
+                    step=1,
+                    help="Analysis window ending at the latest measurement; the baseline is the window before it.",
+                )
+                st.caption("Other core metrics will be derived from the measurement file below.")
             else:
                 st.caption("Core metrics will be provided via JSON input below.")
                 # open_metrics = st.form_submit_button(label="Open Metrics (JSON)",key="core_metrics")
@@ -106,6 +121,7 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
                     value=None,
                     placeholder=float(DEFAULTS["change_magnitude"]),
                     step=0.1,
+                    help="Leave empty to fill in yield minus the segment's median yield (pct points) on submit.",
                 )
                 measurement_confidence = st.number_input(
                     "Measurement confidence (0-1)",
@@ -123,6 +139,8 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
                     placeholder=float(DEFAULTS["rework_rate"]),
                     step=0.1,
                 )
+            elif mode == "Measurements":
+                st.caption("Advanced metrics will be derived from the measurement file below.")
             else:
                 st.caption("Advanced metrics will be provided via JSON input below.")
                 # open_advanced_metrics = st.form_submit_button(label="Open Metrics (JSON)",key="advanced_metrics")
@@ -149,7 +167,23 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
                     placeholder=st.session_state.get("json_example", ""),
                 )
             else:
-                st.caption("Submitting metrics from: **Form** (JSON will be ignored).")
+                st.caption(f"Submitting metrics from: **{mode}** (JSON will be ignored).")
+
+        # --- Measurements mode upload (metrics are derived on Submit) ---
+        if mode == "Measurements":
+            with st.expander("Measurement file", expanded=True):
+                st.caption(
+                    "CSV or Parquet, one row per lot/wafer measurement. Columns: timestamp, lot_id, "
+                    "and pass (0/1) and/or value; optional rework (0/1), confidence (0-1)."
+                )
+                measurement_file = st.file_uploader("Measurement file", type=["csv", "parquet", "pq"])
+                summary = st.session_state.measurement_summary
+                if summary:
+                    st.caption(
+                        f"Last derived from **{summary['file']}**: {summary['rows']:,} rows, "
+                        f"{summary['rows_in_window']:,} in window {summary['window'][0]} – {summary['window'][1]}, "
+                        f"{summary['rows_in_baseline']:,} in baseline."
+                    )
 
         # Build form_metrics dict (even if mode == JSON; main.py will ignore them)
         form_metrics = {
@@ -163,7 +197,9 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
         }
 
         # --- Readiness (no JSON validation pre-submit) ---
-        json_metrics_present = (mode == "JSON") and (metrics_json_raw.strip() != "")
+        json_metrics_present = ((mode == "JSON") and (metrics_json_raw.strip() != "")) or (
+            mode == "Measurements" and measurement_file is not None
+        )
         readiness_pct = compute_readiness(
             site=site,
             tool_group=tool_group,
@@ -198,5 +234,6 @@ def build_intake_form() -> Tuple[bool, Dict[str, Any], str]:
         "anomaly_summary": anomaly_summary,
         "mode": mode,
         "form_metrics": form_metrics,
+        "measurement_file": measurement_file,
     }
     return submit_clicked, inputs, metrics_json_raw
\ No newline at end of file
@@ -44,16 +44,120 @@
 import streamlit as st
 import datetime as dt
 import json
+import threading
+from typing import Any, Dict
 
 from app.state import init_session_state
 from app.ui import build_intake_form
 from app.validation import validate_metrics_json
 from app.payload import build_payload
-from app.placeholder import build_placeholder_response
-from app.persistence import append_jsonl
-from app.output_render import render_outputs
+from app.scheduler import TRY_AGAIN_STATUSES, get_scheduler
+from app.persistence import LOG_LOCK, append_log_record
+from app.output_render import render_outputs, render_history_picker, render_cluster_flags
+from app.history import get_registry
+from app.drift import get_monitor
 
-from app.config import PERSIST_PATH, DEFAULTS
+from app.config import PERSIST_PATH, PERSIST_MODE, DEFAULTS, DRIFT_CHECKPOINT_PATH, CLUSTER_CHECKPOINT_PATH
+
+
+@st.cache_resource(show_spinner=False)
+def start_corpus_prewarm() -> threading.Thread:
+    """
+    Load the corpus snapshot, its near-duplicate index and the segment baselines off the render
+    path, once per server process.
+    """
+
+    def prewarm() -> None:
+        from app.baselines import get_baseline_table
+        from app.corpus import load_corpus
+        from app.neardup import corpus_index
+
+        corpus_index(load_corpus())
+        get_baseline_table(PERSIST_PATH)
+
+    t = threading.Thread(target=prewarm, daemon=True, name="corpus-prewarm")
+    t.start()
+    return t
+
+
+@st.cache_resource(show_spinner=False)
+def start_log_compaction() -> threading.Thread:
+    """Rewrite a log still holding plain responses into dedup form, once per server process."""
+    from app.blobstore import CompactionJob
+
+    job = CompactionJob(PERSIST_PATH, get_monitor(DRIFT_CHECKPOINT_PATH, PERSIST_PATH), DRIFT_CHECKPOINT_PATH)
+    job.start()
+    return job
+
+
+@st.cache_resource(show_spinner=False)
+def start_cluster_job() -> threading.Thread:
+    """Tail the request log into the cross-site cluster model, once per server process."""
+
+    def run() -> None:
+        from app.clusters import ClusterJob  # NumPy loads in this thread, not the script's
+
+        ClusterJob(PERSIST_PATH, CLUSTER_CHECKPOINT_PATH).run()
+
+    t = threading.Thread(target=run, daemon=True, name="cluster-job")
+    t.start()
+    return t
+
+
+def respond_and_persist(payload: Dict[str, Any]) -> None:
+    """
+    Fill change_magnitude from the segment baseline when empty, build the response, attach the
+    baseline report, drift scope and cluster flags, persist, checkpoint drift state. The log
+    keeps the submitted payload; filled-in values go under the record's "derived" key.
+    """
+    from app.baselines import get_baseline_table
+
+    scored, baseline = get_baseline_table(PERSIST_PATH).assess(payload)
+    response = get_scheduler().run(scored, client_id=st.session_state.session_id)
+    if response["meta"].get("status") in TRY_AGAIN_STATUSES:
+        # Not admitted: show the try-again notice; nothing to observe or persist.
+        st.session_state.last_request = payload
+        st.session_state.last_response = response
+        return
+
+    response["baseline"] = baseline
+    monitor = get_monitor(DRIFT_CHECKPOINT_PATH, PERSIST_PATH)
+    response["scope_assessment"] = monitor.observe(payload)
+    from app.clusters import get_cluster_model
+
+    # The submission itself reaches the cluster model through the log (ClusterJob).
+    response["cross_site_cluster"] = get_cluster_model(CLUSTER_CHECKPOINT_PATH).assess(scored)
+
+    st.session_state.last_request = payload
+    st.session_state.last_response = response
+
+    record = {
+        "ts": dt.datetime.now().isoformat(),
+        "request": st.session_state.last_request,
+        "response": st.session_state.last_response,
+        "response_id": st.session_state.last_response.get("meta", {}).get("response_id"),
+    }
+    if baseline and baseline["autofilled"]:
+        record["derived"] = {"metrics": baseline["autofilled"]}
+    # Append + advance under the log lock so a concurrent compaction sees a consistent offset.
+    with LOG_LOCK:
+        nbytes = append_log_record(PERSIST_PATH, record)
+        monitor.advance(nbytes)
+    monitor.save(DRIFT_CHECKPOINT_PATH)
+
+    # Newest investigation is what the history picker shows after a submit.
+    st.session_state.history_seq = st.session_state.history.add(payload, response)
+
+
+def record_feedback(entry: Dict[str, Any], kind: str, index: int) -> None:
+    """"This helped" on a similar case (updates the live similarity weights) or a next check."""
+    from app.feedback import get_weight_store
+
+    store = get_weight_store()
+    if kind == "case":
+        store.record_case_feedback(entry["request"], entry["response"], index)
+    else:
+        store.record_check_feedback(entry["response"], index)
 
 
 def main() -> None:
@@ -103,19 +207,41 @@ def main() -> None:
                         form_metrics=form_metrics,
                         json_metrics=parsed,
                     )
-                    st.session_state.last_request = payload
                     st.session_state.last_json_valid_on_submit = True
-                    st.session_state.last_response = build_placeholder_response(payload)
-
-                    append_jsonl(
-                        PERSIST_PATH,
-                        {
-                            "ts": dt.datetime.now().isoformat(),
-                            "request": st.session_state.last_request,
-                            "response": st.session_state.last_response,
-                            "response_id": st.session_state.last_response.get("meta", {}).get("response_id"),
-                        },
-                    )
+                    respond_and_persist(payload)
+
+            elif mode == "Measurements":
+                upload = inputs["measurement_file"]
+                if upload is None:
+                    st.session_state.json_validation_error = "Upload a measurement file (CSV or Parquet) to submit."
+                else:
+                    from app.measurements import derive_metrics
+
+                    try:
+                        with st.spinner(f"Deriving metrics from {upload.name}..."):
+                            derived, summary = derive_metrics(
+                                upload,
+                                name=upload.name,
+                                time_window_hours=form_metrics["time_window_hours"] or DEFAULTS["time_window_hours"],
+                                until=inputs["timestamp"],
+                            )
+                    except ValueError as e:
+                        st.session_state.json_validation_error = f"Measurement file: {e}"
+                    else:
+                        st.session_state.measurement_summary = summary
+                        # Derived metrics take the place of the form fields.
+                        payload = build_payload(
+                            site=inputs["site"],
+                            tool_group=inputs["tool_group"],
+                            process_step=inputs["process_step"],
+                            severity=inputs["severity"],
+                            timestamp=inputs["timestamp"],
+                            anomaly_summary=inputs["anomaly_summary"],
+                            mode=mode,
+                            form_metrics=derived,
+                            json_metrics=None,
+                        )
+                        respond_and_persist(payload)
 
             else:  # Form mode
                 payload = build_payload(
@@ -129,27 +255,39 @@ def main() -> None:
                     form_metrics=form_metrics,
                     json_metrics=None,
                 )
-                st.session_state.last_request = payload
-                st.session_state.last_response = build_placeholder_response(payload)
-
-                append_jsonl(
-                    PERSIST_PATH,
-                    {
-                        "ts": dt.datetime.now().isoformat(),
-                        "request": st.session_state.last_request,
-                        "response": st.session_state.last_response,
-                        "response_id": st.session_state.last_response.get("meta", {}).get("response_id"),
-                    },
-                )
+                respond_and_persist(payload)
 
     with right:
-        render_outputs(st.session_state.last_response)
+        last_response = st.session_state.last_response
+        try_again = (last_response or {}).get("meta", {}).get("status") in TRY_AGAIN_STATUSES
+        if try_again:
+            # The latest submit was not admitted: its notice goes above any earlier investigation.
+            render_outputs(last_response)
+        shown = render_history_picker(st.session_state.history)
+        if shown or not try_again:
+            entry = shown or {"request": st.session_state.last_request, "response": last_response}
+            render_outputs(entry["response"], on_feedback=lambda kind, i: record_feedback(entry, kind, i))
+
+    with st.expander("Cross-site clusters", expanded=False):
+        # On demand: the cluster model (NumPy) stays off the first render.
+        if st.toggle("Show flagged clusters", key="show_cluster_flags"):
+            from app.clusters import get_cluster_model, now_epoch
+
+            render_cluster_flags(get_cluster_model(CLUSTER_CHECKPOINT_PATH).flagged(now_epoch()))
 
     with st.expander("Debug (optional)", expanded=False):
         st.write("mode:", st.session_state.mode)
         st.write("readiness_pct:", st.session_state.readiness_pct)
         st.write("last_request:", st.session_state.last_request)
         st.write("last_response:", st.session_state.last_response)
+        st.write("history memory (server-wide):", get_registry().report())
+        st.write("triage scheduler:", get_scheduler().metrics())
+
+    # After the first render: the first submit shouldn't pay for loading the corpus.
+    start_corpus_prewarm()
+    start_cluster_job()
+    if PERSIST_MODE == "dedup":
+        start_log_compaction()
 
 
 if __name__ == "__main__":
@@ -11,7 +11,7 @@ OUTPUT_PATH = os.path.join(ROOT, "app", "data", "realistic_cases.json")
 sys.path.append(ROOT)
 
 try:
-    from app.config import SITES, TOOL_GROUPS, PROCESS_STEPS
+    from app.config import SITES, TOOL_GROUPS, PROCESS_STEPS, BUCKET_RANGES
 except ImportError:
     print("❌ Error: Could not import config from app.config")
     sys.exit(1)
@@ -36,37 +36,7 @@ METRIC_KEYS = {
 }
 
 # --- 2. BUCKET DEFINITIONS ---
-
-BUCKET_RANGES = {
-    "yield_bucket": {
-        "none": (91.5, 96.0),    # Normal Baseline
-        "small": (89.0, 92.4),   # Mild dip
-        "medium": (80.0, 88.9),  # Distinct drop
-        "large": (50.0, 79.9)    # Catastrophic
-    },
-    "variance_bucket": {
-        "low": (0.01, 0.15),
-        "medium": (0.16, 0.35),
-        "high": (0.36, 0.90)
-    },
-    "change_bucket": {
-        "small": (0.1, 4.0),
-        "medium": (4.1, 10.0),
-        "large": (10.1, 25.0)
-    },
-    "measurement_bucket": {
-        "low": (0.0, 0.50), "medium": (0.51, 0.80), "high": (0.81, 1.0)
-    },
-    "lots_bucket": {
-        "small": (1, 3), "medium": (4, 10), "large": (11, 50)
-    },
-    "rework_bucket": {
-        "low": (0.0, 2.0), "medium": (2.1, 8.0), "high": (8.1, 25.0)
-    },
-    "window_bucket": {
-        "short": (1, 12), "medium": (13, 48), "long": (49, 168)
-    }
-}
+# BUCKET_RANGES lives in app.config so the app can classify live metrics with the same ranges.
 
 # --- 3. PATTERN FAMILIES WITH CONSTRAINTS ---
 
@@ -354,4 +324,8 @@ if __name__ == "__main__":
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
     with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
+
+    # Prebuilt corpus/index snapshot so the app never parses the JSON on startup.
+    from app.corpus import build_snapshot
+    build_snapshot(OUTPUT_PATH)
     print(f"✅ Successfully wrote {len(data)} high-fidelity cases to:\n   {OUTPUT_PATH}")
\ No newline at end of file
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+@pytest.fixture
+def app_cwd(tmp_path, monkeypatch):
+    """Run from a scratch directory: the app's relative state files (log, checkpoints, SQLite) land
+    in tmp_path, while app/ (and the case data under it) resolves through a symlink."""
+    (tmp_path / "app").symlink_to(os.path.join(REPO, "app"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
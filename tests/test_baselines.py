@@ -0,0 +1,87 @@
+import json
+import os
+
+from app.baselines import BaselineTable, rollup_keys, segment_key
+from app.config import SITES, TOOL_GROUPS
+from app.corpus import CaseCorpus
+from app.persistence import scored_request
+
+SEGMENT = {"site": "Plant-A", "tool_group": "ETCH-CLUSTER-1", "process_step": "etch"}
+
+
+def log_line(ts, yield_pct, **context):
+    request = {**SEGMENT, **context, "metrics": {"yield_pct": yield_pct}}
+    return json.dumps({"ts": ts, "request": request}) + "\n"
+
+
+def empty_table(path):
+    table = BaselineTable(str(path))
+    table.refresh(CaseCorpus([]))
+    return table
+
+
+def window(table, key):
+    return list(table._windows.get((key, "yield_pct"), []))
+
+
+def test_unselected_fields_only_feed_the_levels_they_selected():
+    full = segment_key(SEGMENT)
+    assert len(rollup_keys(full)) == 4
+    no_tool = segment_key({**SEGMENT, "tool_group": TOOL_GROUPS[0]})
+    assert rollup_keys(no_tool) == [(full[0], 0, 0), (0, 0, 0)]
+    assert rollup_keys(segment_key({**SEGMENT, "site": SITES[0]})) == [(0, 0, 0)]
+
+
+def test_placeholder_submission_is_not_counted_in_the_site_rollup(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(log_line("2026-10-01T00:00:00", 90.0) + log_line("2026-10-01T00:00:01", 50.0, site=SITES[0]))
+    table = empty_table(path)
+    site = segment_key(SEGMENT)[0]
+    assert window(table, (site, 0, 0)) == [90.0]
+    assert window(table, (0, 0, 0)) == [90.0, 50.0]
+
+
+def test_records_sharing_a_ts_or_out_of_order_are_all_folded(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(
+        log_line("2026-10-01T00:00:05", 91.0)
+        + log_line("2026-10-01T00:00:05", 92.0)
+        + log_line("2026-10-01T00:00:04", 93.0)
+    )
+    table = empty_table(path)
+    assert window(table, segment_key(SEGMENT)) == [91.0, 92.0, 93.0]
+
+
+def test_rewritten_log_skips_records_already_folded(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(log_line("2026-10-01T00:00:00", 91.0) + log_line("2026-10-01T00:00:00", 92.0))
+    table = empty_table(path)
+
+    # A compaction: same records, new file (new inode), then one more append.
+    tmp = tmp_path / "log.tmp"
+    tmp.write_text(path.read_text() + "\n" + log_line("2026-09-30T00:00:00", 93.0))
+    os.replace(tmp, path)
+    assert table.refresh(CaseCorpus([])) == 1
+    assert window(table, segment_key(SEGMENT)) == [91.0, 92.0, 93.0]
+
+
+def test_scored_request_merges_derived_metrics():
+    record = {"request": {"metrics": {"yield_pct": 90.0}}, "derived": {"metrics": {"change_magnitude": -2.5}}}
+    assert scored_request(record)["metrics"] == {"yield_pct": 90.0, "change_magnitude": -2.5}
+    assert record["request"]["metrics"] == {"yield_pct": 90.0}
+    assert scored_request({"request": {"site": "Plant-A"}}) == {"site": "Plant-A"}
+
+
+def test_submit_logs_the_filled_in_change_magnitude_as_derived(app_cwd):
+    from streamlit.testing.v1 import AppTest
+
+    main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    at = AppTest.from_file(main, default_timeout=120).run()
+    at.selectbox[0].set_value("Plant-A")
+    at.number_input[0].set_value(88.0)  # yield; change magnitude left empty
+    at.button[0].click().run()
+    with open(app_cwd / "requests_responses.jsonl", encoding="utf-8") as f:
+        record = json.loads(f.readline())
+    assert record["request"]["metrics"].get("change_magnitude") is None
+    filled = record["response"]["baseline"]["autofilled"]
+    assert filled and record["derived"] == {"metrics": filled}
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app.blobstore import BlobStore, compact_log, intern_response, is_interned, iter_log, rehydrate
+
+RESPONSE = {
+    "similar_cases": [{"case_id": "C-001", "resolution": "Re-qualified the chamber after PM."}],
+    "next_checks": [{"category": "Data", "check": "Confirm the measurement system.", "why": "Low confidence."}],
+    "narrative": "Placeholder narrative that is long enough to be interned in the blob store.",
+    "meta": {"response_id": "resp_1"},
+}
+
+
+def test_intern_and_rehydrate_round_trip(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.jsonl"))
+    interned = intern_response(RESPONSE, store)
+    assert is_interned(interned)
+    assert interned["meta"] == RESPONSE["meta"]
+    assert rehydrate(interned, store) == RESPONSE
+    size = len(store)
+    intern_response(RESPONSE, store)
+    assert len(store) == size  # a repeated response adds no blobs
+
+
+def test_reader_sees_blobs_appended_after_it_opened(tmp_path):
+    path = str(tmp_path / "blobs.jsonl")
+    reader = BlobStore(path)
+    writer = BlobStore(path)  # e.g. another server process
+    h = writer.put({"value": "written after the reader opened"})
+    assert reader.get(h) == {"value": "written after the reader opened"}
+    with pytest.raises(KeyError):
+        reader.get("0" * 20)
+
+
+def test_compaction_keeps_records(tmp_path):
+    log = tmp_path / "log.jsonl"
+    records = [{"ts": f"2026-10-01T00:00:0{i}", "request": {"site": "Plant-A"}, "response": RESPONSE} for i in range(3)]
+    log.write_text("".join(json.dumps(r) + "\n" for r in records))
+    stats, _ = compact_log(str(log))
+    assert stats["records"] == 3
+    assert list(iter_log(str(log))) == records
@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.buckets import classify_metrics, classify_value, decode_signals, derive_signals, describe_match, metrics_matrix
+from app.corpus import load_corpus
+
+
+def test_batch_and_single_row_paths_agree():
+    rows = [c["metrics"] for c in load_corpus().iter_cases()]
+    batch = decode_signals(classify_metrics(metrics_matrix(rows)))
+    assert batch == [derive_signals(m) for m in rows]
+
+
+def test_boundaries_split_gaps_and_overlaps_at_the_midpoint():
+    # yield "small" (89.0, 92.4) overlaps "none" (91.5, 96.0): boundary 91.95, upper range wins.
+    assert classify_value("yield_bucket", 91.9) == "small"
+    assert classify_value("yield_bucket", 91.95) == "none"
+    # variance "low" ends at 0.15 and "medium" starts at 0.16: boundary 0.155.
+    assert classify_value("variance_bucket", 0.154) == "low"
+    assert classify_value("variance_bucket", 0.155) == "medium"
+    # Out-of-range values clamp to the first/last label.
+    assert classify_value("yield_bucket", 10.0) == "large"
+    assert classify_value("window_bucket", 1000) == "long"
+
+
+def test_missing_metrics_and_change_direction():
+    signals = derive_signals({"yield_pct": None, "change_magnitude": -12.0})
+    assert signals["yield_bucket"] is None
+    assert signals["change_bucket"] == "large" and signals["change_dir"] == "neg"
+    assert derive_signals({})["change_dir"] is None
+    codes = classify_metrics(np.full((2, metrics_matrix([{}]).shape[1]), np.nan))
+    assert all(not col.any() for col in codes.values())
+
+
+def test_describe_match_lists_shared_buckets_only():
+    query = derive_signals({"yield_pct": 85.0, "change_magnitude": -6.0, "time_window_hours": 72})
+    same_dir = derive_signals({"yield_pct": 84.0, "change_magnitude": -7.0, "time_window_hours": 24})
+    other_dir = derive_signals({"yield_pct": 84.0, "change_magnitude": 7.0})
+    assert describe_match(query, same_dir) == "Matched: yield=medium, change=neg medium"
+    assert describe_match(query, other_dir) == "Matched: yield=medium"
+    assert describe_match(query, derive_signals({})) == ""
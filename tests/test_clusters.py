@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+
+from app.clusters import ClusterModel
+from app.persistence import append_jsonl
+
+
+def request(site, yield_pct, variance, tool_group="ETCH-CLUSTER-2", **metrics):
+    return {
+        "site": site,
+        "tool_group": tool_group,
+        "process_step": "inspection",
+        "severity": "medium",
+        "timestamp": "2026-10-19T08:00:00",
+        "metrics": {"yield_pct": yield_pct, "metric_variance": variance, **metrics},
+    }
+
+
+def background(n=30, seed=0):
+    """Scattered single-site submissions, a minute apart from 2026-10-19T00:00."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "ts": f"2026-10-19T00:{i:02d}:00",
+            "request": request("Plant-A", float(rng.uniform(50, 99)), float(rng.uniform(0.01, 0.9)),
+                               change_magnitude=float(rng.uniform(-25, 25)), rework_rate=float(rng.uniform(0, 25))),
+            "response_id": f"bg-{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def outbreak(sites=("Plant-A", "Plant-B", "Plant-C"), hour=1):
+    """The same signature reported by several sites."""
+    return [
+        {
+            "ts": f"2026-10-19T{hour:02d}:{i:02d}:00",
+            "request": request(site, 62.0, 0.85, change_magnitude=-20.0, rework_rate=20.0, measurement_confidence=0.2),
+            "response_id": f"ob-{i}",
+        }
+        for i, site in enumerate(sites)
+    ]
+
+
+def write(path, records):
+    for r in records:
+        append_jsonl(path, r)
+
+
+def test_cross_site_signature_is_flagged():
+    model = ClusterModel(k=4)
+    model.partial_fit(background())
+    model.partial_fit(outbreak())
+    flags = model.flagged()
+    assert flags and set(flags[0]["response_ids"]) >= {"ob-0", "ob-1", "ob-2"}
+    assert flags[0]["sites"] == ["Plant-A", "Plant-B", "Plant-C"]
+
+    flag = model.assess(outbreak(sites=("Plant-D",))[0]["request"], now=model.members[-1][0])
+    assert flag is not None and "Plant-D" in flag["sites"] and "3 other submissions" in flag["detail"]
+
+
+def test_single_site_repeats_are_not_flagged():
+    model = ClusterModel(k=4)
+    model.partial_fit(background())
+    model.partial_fit(outbreak(sites=("Plant-A",) * 4))
+    assert all(len(f["sites"]) >= 2 or len(f["tool_groups"]) >= 2 for f in model.flagged())
+    assert not any("ob-0" in f["response_ids"] for f in model.flagged())
+
+
+def test_window_drops_old_members():
+    model = ClusterModel(k=4)
+    model.partial_fit(background())
+    model.partial_fit(outbreak(hour=1))
+    model.partial_fit([{"ts": "2026-10-21T00:00:00", "request": request("Plant-A", 95.0, 0.05)}])
+    assert not any("ob-0" in f["response_ids"] for f in model.flagged())
+
+
+def test_catch_up_counts_records_not_timestamps(tmp_path):
+    log = str(tmp_path / "log.jsonl")
+    records = background(10)
+    for r in records:
+        r["ts"] = "2026-10-19T00:00:00"  # submitted in the same second
+    write(log, records)
+    model = ClusterModel(k=4)
+    assert model.catch_up(log) == 10
+    assert model.catch_up(log) == 0
+
+    # Compaction rewrites the file (new inode) with the same records, one per line.
+    lines = open(log, encoding="utf-8").readlines()
+    os.remove(log)
+    with open(log, "w", encoding="utf-8") as f:
+        f.writelines(lines + [json.dumps(outbreak()[0]) + "\n"])
+    assert model.catch_up(log) == 1
+    assert model.log_records == 11
+
+
+def test_checkpoint_round_trip(tmp_path):
+    log, checkpoint = str(tmp_path / "log.jsonl"), str(tmp_path / "state.json")
+    write(log, background() + outbreak())
+    model = ClusterModel(k=4)
+    model.catch_up(log)
+    model.save(checkpoint)
+    restored = ClusterModel.load(checkpoint)
+    assert np.allclose(restored.centers, model.centers)
+    assert restored.flagged() == model.flagged()
+    append_jsonl(log, outbreak(sites=("Plant-D",), hour=2)[0])
+    assert restored.catch_up(log) == 1
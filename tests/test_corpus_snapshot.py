@@ -0,0 +1,61 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+from app.config import CASES_PATH
+from app.corpus import (
+    SNAPSHOT_VERSION,
+    build_snapshot,
+    ingested_path_for,
+    load_snapshot,
+    read_cases,
+    snapshot_path_for,
+)
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_cases(tmp_path, n=5):
+    path = str(tmp_path / "cases.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(read_cases(CASES_PATH)[:n], f)
+    return path
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = write_cases(tmp_path)
+    built = build_snapshot(path)
+    loaded = load_snapshot(snapshot_path_for(path), path)
+    assert loaded is not None
+    assert list(loaded.case_ids) == list(built.case_ids)
+    assert list(loaded.iter_cases()) == list(built.iter_cases())
+
+
+def test_stale_or_foreign_snapshots_are_ignored(tmp_path):
+    path = write_cases(tmp_path)
+    snap = snapshot_path_for(path)
+    build_snapshot(path)
+
+    # An ingest appended after the snapshot was written.
+    with open(ingested_path_for(path), "w", encoding="utf-8") as f:
+        f.write(json.dumps(read_cases(CASES_PATH)[6]) + "\n")
+    os.utime(snap, (0, 0))
+    assert load_snapshot(snap, path) is None
+
+    build_snapshot(path)
+    assert len(load_snapshot(snap, path)) == 6
+
+    with open(snap, "wb") as f:
+        pickle.dump({"version": SNAPSHOT_VERSION - 1, "corpus": None}, f)
+    assert load_snapshot(snap, path) is None
+    with open(snap, "wb") as f:
+        f.write(b"not a pickle")
+    assert load_snapshot(snap, path) is None
+
+
+def test_importing_main_does_not_load_numpy_or_the_corpus():
+    code = "import sys, main; print('numpy' in sys.modules, 'app.corpus' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "False"]
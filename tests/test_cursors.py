@@ -0,0 +1,74 @@
+import pytest
+
+from app import cursors
+from app.config import SIMILAR_TOP_K
+from app.cursors import CursorCache
+from app.placeholder import build_placeholder_response, similar_cases_page
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cursors.time, "monotonic", clock)
+    return clock
+
+
+def test_pages_slice_the_cached_list():
+    cache = CursorCache()
+    cursor = cache.put(list(range(25)), {"q": 1})
+    assert cache.page(cursor, 0, 10) == (list(range(10)), 25, {"q": 1})
+    assert cache.page(cursor, 20, 10) == ([20, 21, 22, 23, 24], 25, {"q": 1})
+    assert cache.page("unknown", 0, 10) is None
+
+
+def test_reads_extend_the_ttl_and_expired_cursors_are_dropped(clock):
+    cache = CursorCache(ttl_s=10.0)
+    a = cache.put([1])
+    b = cache.put([2])
+    clock.now += 8
+    assert cache.page(a, 0, 1) is not None  # a now lives until +18
+    clock.now += 5
+    assert cache.page(b, 0, 1) is None
+    assert cache.page(a, 0, 1) is not None
+    clock.now += 11
+    cache.put([3])
+    assert len(cache) == 1
+
+
+def test_least_recently_read_entry_is_evicted_first():
+    cache = CursorCache(max_entries=2)
+    a = cache.put(["a"])
+    b = cache.put(["b"])
+    cache.page(a, 0, 1)
+    c = cache.put(["c"])
+    assert cache.page(b, 0, 1) is None
+    assert cache.page(a, 0, 1) is not None and cache.page(c, 0, 1) is not None
+
+
+def test_response_cursor_pages_continue_the_shown_top_k():
+    payload = {
+        "site": "Plant-A",
+        "tool_group": "ETCH-CLUSTER-2",
+        "process_step": "inspection",
+        "severity": "medium",
+        "timestamp": "2026-01-27T18:40:00",
+        "anomaly_summary": "",
+        "metrics": {"yield_pct": 85.0, "metric_variance": 0.3, "change_magnitude": -6.0},
+        "metrics_input_mode": "Form",
+    }
+    response = build_placeholder_response(payload)
+    paging = response["similar_cases_page"]
+    assert paging["cursor"] and paging["total"] > SIMILAR_TOP_K
+    first, total = similar_cases_page(paging["cursor"], 0, SIMILAR_TOP_K)
+    assert total == paging["total"]
+    assert first == response["similar_cases"]
+    rest, _ = similar_cases_page(paging["cursor"], SIMILAR_TOP_K, total)
+    assert len(rest) == total - SIMILAR_TOP_K
@@ -0,0 +1,46 @@
+import itertools
+
+from app.drift import DriftMonitor
+
+A = {"site": "Plant-A", "tool_group": "ETCH-CLUSTER-1", "process_step": "etch"}
+B = {"site": "Plant-B", "tool_group": "LITHO-LINE-1", "process_step": "lithography"}
+NOISE = itertools.cycle([-0.3, 0.1, 0.4, -0.2, 0.0])
+
+
+def submission(segment, yield_pct):
+    return {**segment, "metrics": {"yield_pct": yield_pct + next(NOISE), "rework_rate": 1.0}}
+
+
+def monitor_with_history(n=30):
+    monitor = DriftMonitor()
+    for _ in range(n):
+        monitor.update(submission(A, 95.0))
+        monitor.update(submission(B, 95.0))
+    return monitor
+
+
+def test_no_shift_when_nothing_deviates():
+    assert monitor_with_history().assess(submission(A, 95.0))["scope"] == "no_shift_detected"
+
+
+def test_localized_when_only_own_segment_shifted():
+    monitor = monitor_with_history()
+    for _ in range(10):
+        monitor.update(submission(A, 80.0))
+    result = monitor.assess(submission(A, 80.0))
+    assert result["scope"] == "localized"
+    assert "site=Plant-A" in result["detail"]
+
+
+def test_shift_in_other_segments_is_reported():
+    monitor = monitor_with_history()
+    for _ in range(10):
+        monitor.update(submission(B, 80.0))
+    result = monitor.assess(submission(A, 95.0))
+    assert result["scope"] == "other_segments_shifted"
+    assert "site=Plant-B" in result["shifted_segments"]
+    assert "site=Plant-B" in result["detail"]
+
+
+def test_insufficient_data_without_history():
+    assert DriftMonitor().assess(submission(A, 95.0))["scope"] == "insufficient_data"
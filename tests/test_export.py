@@ -0,0 +1,47 @@
+import json
+
+import pyarrow.dataset as ds
+
+from app.config import SITES
+from app.export import export_log, flatten_record
+
+
+def record(ts, site, **metrics):
+    return {
+        "ts": ts,
+        "response_id": f"resp_{ts}",
+        "request": {"site": site, "tool_group": "ETCH-CLUSTER-1", "severity": "high", "metrics": metrics},
+        "response": {"similar_cases": [], "next_checks": [{"category": "Data"}]},
+    }
+
+
+def test_placeholder_site_goes_to_unknown_partition():
+    partition, _ = flatten_record(record("2026-10-01T08:00:00", SITES[0]))
+    assert partition == ("2026-10-01", "unknown")
+
+
+def test_integer_metrics_are_rounded_not_truncated():
+    _, row = flatten_record(record("2026-10-01T08:00:00", "Plant-A", affected_lot_count=5.7, yield_pct=90))
+    assert row["affected_lot_count"] == 6
+    assert row["yield_pct"] == 90.0
+
+
+def test_export_partitions_read_back(tmp_path):
+    log = tmp_path / "log.jsonl"
+    records = [
+        record("2026-10-01T08:00:00", "Plant-A", yield_pct=91.0),
+        record("2026-10-01T09:00:00", SITES[0], yield_pct=92.0),
+        record("2026-10-02T08:00:00", "Plant/B", yield_pct=93.0),
+    ]
+    log.write_text("".join(json.dumps(r) + "\n" for r in records))
+    out = tmp_path / "parquet"
+
+    report = export_log(str(log), str(out), buffer_rows=1)
+    assert report["rows"] == 3
+    assert sorted(p.name for p in out.glob("date=*/site=*")) == ["site=Plant%2FB", "site=Plant-A", "site=unknown"]
+
+    table = ds.dataset(str(out), partitioning="hive").to_table()
+    assert sorted(table.column("site").to_pylist()) == ["Plant-A", "Plant/B", "unknown"]
+
+    # Incremental: nothing new past the watermark.
+    assert export_log(str(log), str(out))["rows"] == 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from app.corpus import load_corpus
+from app.feedback import CONTEXT_INDEX, DEFAULT_WEIGHTS, WeightStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WeightStore(str(tmp_path / "feedback.sqlite3"))
+
+
+def same_site_helped():
+    """A helpful case from the query's site, shown next to two cases from other sites."""
+    cases = list(load_corpus().iter_cases())
+    helpful = cases[0]
+    site = helpful["context"]["site"]
+    others = [c for c in cases if c["context"]["site"] != site][:2]
+    request = {"site": site, "metrics": dict(helpful["metrics"])}
+    response = {
+        "meta": {"response_id": "resp_test"},
+        "similar_cases": [{"case_id": c["case_id"]} for c in (helpful, *others)],
+    }
+    return request, response
+
+
+def test_same_site_helpful_case_raises_site_weight(store):
+    request, response = same_site_helped()
+    before = store.weights[CONTEXT_INDEX["site"]]
+    version = store.record_case_feedback(request, response, 0)
+    assert version is not None
+    assert store.weights[CONTEXT_INDEX["site"]] > before
+    assert store.current() == (version, store.weights)
+
+
+def test_repeat_click_is_ignored(store):
+    request, response = same_site_helped()
+    first = store.record_case_feedback(request, response, 0)
+    assert store.record_case_feedback(request, response, 0) is None
+    assert store.version == first
+
+
+def test_rollback_and_reopen(store, tmp_path):
+    defaults = store.version
+    request, response = same_site_helped()
+    store.record_case_feedback(request, response, 0)
+    store.rollback(defaults)
+    assert np.array_equal(store.weights, DEFAULT_WEIGHTS)
+
+    reopened = WeightStore(str(tmp_path / "feedback.sqlite3"))
+    assert reopened.version == defaults
+    assert len(reopened.versions()) == 2
+
+
+def test_check_feedback_is_counted_per_category(store):
+    response = {"meta": {"response_id": "resp_test"}, "next_checks": [{"category": "Data", "check": "Recheck."}]}
+    store.record_check_feedback(response, 0)
+    assert store.check_feedback_counts() == {"Data": 1}
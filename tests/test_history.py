@@ -0,0 +1,48 @@
+import time
+
+from app.config import HISTORY_PURGE_INTERVAL_S, HISTORY_RETENTION_DAYS
+from app.history import HistoryRegistry, SessionHistory
+
+PAYLOAD = {"site": "Plant-A", "tool_group": "ETCH-CLUSTER-1", "process_step": "etch", "severity": "high"}
+
+
+def make_history(tmp_path, budget_bytes=1 << 20, ring_size=2):
+    registry = HistoryRegistry(str(tmp_path / "history.sqlite3"), budget_bytes=budget_bytes)
+    return registry, SessionHistory("s1", registry, ring_size=ring_size)
+
+
+def test_ring_overflow_spills_and_entries_stay_readable(tmp_path):
+    registry, history = make_history(tmp_path)
+    seqs = [history.add(PAYLOAD, {"n": i}) for i in range(5)]
+    assert len(history.ring) == 2
+    assert [e.seq for e in history.entries()] == seqs[::-1]
+    assert history.get(seqs[0]) == {"request": PAYLOAD, "response": {"n": 0}}
+    assert registry.report()["entries_on_disk"] == 3
+
+
+def test_memory_budget_spills_server_wide(tmp_path):
+    registry, history = make_history(tmp_path, budget_bytes=1, ring_size=10)
+    history.add(PAYLOAD, {"n": 1})
+    assert registry.bytes_in_memory() == 0
+    assert history.get(0)["response"] == {"n": 1}
+
+
+def age_spilled_entries(registry, days):
+    with registry.lock:
+        registry.db.execute("UPDATE history SET ts = ?", (time.time() - days * 86400,))
+        registry.db.commit()
+
+
+def test_retention_is_enforced_while_running(tmp_path):
+    registry, history = make_history(tmp_path, ring_size=1)
+    history.add(PAYLOAD, {"n": 0})
+    history.add(PAYLOAD, {"n": 1})  # spills entry 0
+    age_spilled_entries(registry, HISTORY_RETENTION_DAYS + 1)
+
+    history.add(PAYLOAD, {"n": 2})  # within the purge interval: kept for now
+    assert history.get(0) is not None
+
+    registry.purged_at -= HISTORY_PURGE_INTERVAL_S  # the interval has passed
+    history.add(PAYLOAD, {"n": 3})
+    assert history.get(0) is None
+    assert history.get(1) is not None
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.corpus import load_corpus
+from app.feedback import DEFAULT_WEIGHTS
+from app.incident_store import (
+    DiskStore,
+    FederatedSearcher,
+    HttpStore,
+    IncidentStore,
+    MemoryStore,
+    build_disk_index,
+    normalize_scores,
+)
+
+
+def query_from(case):
+    return {"timestamp": case["created_at"], **case["context"], "metrics": dict(case["metrics"])}
+
+
+@pytest.fixture
+def query():
+    corpus = load_corpus()
+    return query_from(corpus.case(len(corpus) - 1))
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        IncidentStore()
+
+
+def test_memory_and_disk_scores_agree_for_the_same_weights(tmp_path, query):
+    build_disk_index(load_corpus(), str(tmp_path / "index"))
+    memory, disk = MemoryStore(), DiskStore(str(tmp_path / "index"))
+    weights = DEFAULT_WEIGHTS.copy()
+    weights[0] *= 3.0
+    for w in (None, weights):
+        mem_hits = memory.search(query, 5, w)
+        disk_hits = disk.search(query, 5, w)
+        assert [h["case_id"] for h in mem_hits] == [h["case_id"] for h in disk_hits]
+        assert [h["score"] for h in mem_hits] == pytest.approx([h["score"] for h in disk_hits])
+        assert all(h["case"]["case_id"] == h["case_id"] for h in disk_hits)
+
+
+def test_weights_change_the_ranking_scores(tmp_path, query):
+    build_disk_index(load_corpus(), str(tmp_path / "index"))
+    disk = DiskStore(str(tmp_path / "index"))
+    weights = np.zeros_like(DEFAULT_WEIGHTS)
+    weights[0] = 1.0
+    assert [h["score"] for h in disk.search(query, 5)] != [h["score"] for h in disk.search(query, 5, weights)]
+
+
+def test_normalize_scores():
+    hits = [{"score": 4.0}, {"score": 2.0}, {"score": 0.0}]
+    assert normalize_scores(hits, (0.0, 4.0)) == [1.0, 0.5, 0.0]
+    assert normalize_scores(hits, None) == [1.0, 0.5, 0.0]
+    assert normalize_scores([{"score": 3.0}], None) == [1.0]
+    assert normalize_scores([], (0.0, 1.0)) == []
+
+
+def test_http_store_assumes_unit_scores_until_told_otherwise():
+    assert HttpStore("http://127.0.0.1:1").score_range == (0.0, 1.0)
+
+
+class FixedStore(IncidentStore):
+    def __init__(self, name, hits, fail=False):
+        self.name, self.hits, self.fail = name, hits, fail
+        self.seen_weights = []
+
+    def search(self, query, top_k=5, weights=None):
+        self.seen_weights.append(weights)
+        if self.fail:
+            raise RuntimeError("down")
+        return self.hits[:top_k]
+
+
+def test_federated_merge_passes_weights_and_survives_a_failed_store():
+    a = FixedStore("a", [{"case_id": "c1", "score": 0.9}, {"case_id": "c2", "score": 0.4}])
+    b = FixedStore("b", [{"case_id": "c3", "score": 0.7}])
+    down = FixedStore("down", [], fail=True)
+    weights = DEFAULT_WEIGHTS.copy()
+    hits, report = FederatedSearcher([a, b, down], timeout_s=2.0).search_with_report({}, 3, weights)
+    assert [h["case_id"] for h in hits] == ["c1", "c3", "c2"]
+    assert report["a"]["status"] == "ok" and report["down"]["status"] != "ok"
+    assert all(w is weights for w in a.seen_weights + b.seen_weights)
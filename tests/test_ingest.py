@@ -0,0 +1,55 @@
+import json
+import shutil
+
+import pytest
+
+from app.config import CASES_PATH
+from app.ingest import ingest_files, normalize_row, validate_chunk
+
+ROW = {
+    "case_id": "X-1",
+    "created_at": "2026-01-05T08:00:00+00:00",
+    "title": "Yield dip after PM",
+    "site": "Plant-A",
+    "tool_group": "ETCH-CLUSTER-1",
+    "process_step": "etch",
+    "yield_pct": "91.5",
+    "metric_variance": "0.2",
+    "change_magnitude": "-1.5",
+    "measurement_confidence": "0.8",
+    "affected_lot_count": "4",
+    "rework_rate": "2.0",
+    "time_window_hours": "12",
+    "resolution_summary": "Re-qualified the chamber.",
+}
+
+
+def test_flat_row_normalizes():
+    case = normalize_row(ROW)
+    assert case["context"] == {"site": "Plant-A", "tool_group": "ETCH-CLUSTER-1", "process_step": "etch"}
+    assert case["metrics"]["affected_lot_count"] == 4
+
+
+@pytest.mark.parametrize("bad", [7, ["Plant-A"], {"name": "Plant-A"}])
+def test_non_string_context_is_a_row_error(bad):
+    with pytest.raises(ValueError, match="Unknown site"):
+        normalize_row({**ROW, "site": bad})
+
+
+def test_bad_rows_are_reported_not_raised():
+    cases, errors, _ = validate_chunk(10, [ROW, {**ROW, "site": 3}, {**ROW, "yield_pct": "n/a"}])
+    assert [c["case_id"] for c in cases] == ["X-1"]
+    assert [line for line, _ in errors] == [11, 12]
+
+
+def test_ingest_keeps_going_past_a_malformed_row(tmp_path):
+    cases_path = tmp_path / "cases.json"
+    shutil.copy(CASES_PATH, cases_path)
+    export = tmp_path / "export.jsonl"
+    rows = [{**ROW, "site": ["Plant-A"]}, {**ROW, "case_id": "X-2", "context": {"site": 5}}, ROW]
+    export.write_text("".join(json.dumps(r) + "\n" for r in rows))
+
+    report = ingest_files([str(export)], cases_path=str(cases_path), workers=1, collapse_near_duplicates=False)
+    assert report["rows"] == 3
+    assert report["accepted"] == 1
+    assert [line for _, line, _ in report["errors"]] == [1, 2]
@@ -0,0 +1,96 @@
+import datetime as dt
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.measurements import RunningMoments, derive_metrics
+
+
+def measurements(hours=96, per_hour=5, seed=0):
+    rng = np.random.default_rng(seed)
+    n = hours * per_hour
+    ts = pd.Timestamp("2026-10-01T00:00:00") + pd.to_timedelta(np.arange(n) * 60 // per_hour, unit="min")
+    return pd.DataFrame(
+        {
+            "timestamp": ts,
+            "lot_id": [f"L{i // 10}" for i in range(n)],
+            "pass": (rng.random(n) > np.where(np.arange(n) >= n // 2, 0.2, 0.05)).astype(int),
+            "value": rng.normal(10.0, 2.0, n),
+            "rework": (rng.random(n) < 0.1).astype(int),
+            "confidence": rng.uniform(0.5, 1.0, n),
+        }
+    )
+
+
+def expected(df, window_hours):
+    end = df["timestamp"].max()
+    cur = df[(df["timestamp"] > end - pd.Timedelta(hours=window_hours)) & (df["timestamp"] <= end)]
+    base = df[
+        (df["timestamp"] > end - pd.Timedelta(hours=2 * window_hours))
+        & (df["timestamp"] <= end - pd.Timedelta(hours=window_hours))
+    ]
+    return {
+        "yield_pct": round(100 * cur["pass"].mean(), 2),
+        "affected_lot_count": cur.loc[cur["pass"] == 0, "lot_id"].nunique(),
+        "time_window_hours": window_hours,
+        "metric_variance": round(cur["value"].var(ddof=1), 4),
+        "change_magnitude": round(100 * (cur["pass"].mean() - base["pass"].mean()), 2),
+        "measurement_confidence": round(cur["confidence"].mean(), 3),
+        "rework_rate": round(100 * cur["rework"].mean(), 2),
+    }
+
+
+def test_running_moments_match_numpy_across_chunks():
+    values = np.random.default_rng(1).normal(5.0, 3.0, 1000)
+    values[::7] = np.nan
+    moments = RunningMoments()
+    for chunk in np.array_split(values, 13):
+        moments.add(chunk)
+    clean = values[~np.isnan(values)]
+    assert moments.n == clean.size
+    assert moments.mean == pytest.approx(clean.mean())
+    assert moments.variance == pytest.approx(clean.var(ddof=1))
+
+
+def test_chunked_csv_matches_a_whole_frame_computation():
+    df = measurements()
+    buf = io.StringIO(df.to_csv(index=False))
+    metrics, summary = derive_metrics(buf, name="m.csv", time_window_hours=24, chunk_rows=37)
+    assert metrics == pytest.approx(expected(df, 24))
+    assert summary["rows"] == len(df) and summary["rows_in_window"] == 24 * 5
+
+
+def test_until_moves_the_window_back():
+    df = measurements()
+    buf = io.StringIO(df.to_csv(index=False))
+    until = dt.datetime(2026, 10, 2, 23, 59)
+    metrics, summary = derive_metrics(buf, name="m.csv", time_window_hours=12, until=until, chunk_rows=50)
+    assert metrics == pytest.approx(expected(df[df["timestamp"] <= until], 12))
+    assert summary["window"][1].startswith("2026-10-02T23:48")
+
+
+def test_parquet_matches_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = measurements(hours=48)
+    path = str(tmp_path / "m.parquet")
+    df.to_parquet(path, index=False)
+    from_parquet, _ = derive_metrics(path, name=path, time_window_hours=6, chunk_rows=40)
+    from_csv, _ = derive_metrics(io.StringIO(df.to_csv(index=False)), name="m.csv", time_window_hours=6, chunk_rows=40)
+    assert from_parquet == pytest.approx(from_csv)
+
+
+def test_value_only_file_and_bad_inputs():
+    df = measurements(hours=48)[["timestamp", "lot_id", "value"]]
+    metrics, _ = derive_metrics(io.StringIO(df.to_csv(index=False)), name="m.csv", time_window_hours=24)
+    assert metrics["yield_pct"] is None and metrics["rework_rate"] is None
+    assert metrics["affected_lot_count"] == df.iloc[len(df) // 2:]["lot_id"].nunique()
+    assert metrics["change_magnitude"] is not None
+
+    with pytest.raises(ValueError, match="required columns"):
+        derive_metrics(io.StringIO("lot_id,pass\nL1,1\n"), name="m.csv", time_window_hours=24)
+    with pytest.raises(ValueError, match="'pass' or a 'value'"):
+        derive_metrics(io.StringIO("timestamp,lot_id\n2026-10-01,L1\n"), name="m.csv", time_window_hours=24)
+    with pytest.raises(ValueError, match="positive"):
+        derive_metrics(io.StringIO(df.to_csv(index=False)), name="m.csv", time_window_hours=0)
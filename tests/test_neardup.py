@@ -0,0 +1,65 @@
+import copy
+
+import numpy as np
+
+from app.corpus import load_corpus
+from app.neardup import (
+    NearDupIndex,
+    build_index,
+    case_tokens,
+    diversify,
+    estimated_jaccard,
+    minhash,
+    signatures,
+)
+
+
+def tokens(n, start=0):
+    return [f"tok{i}" for i in range(start, start + n)]
+
+
+def test_batch_signatures_match_single_minhash():
+    cases = list(load_corpus().iter_cases())[:10]
+    batch = signatures(cases)
+    for case, sig in zip(cases, batch):
+        assert np.array_equal(sig, minhash(case_tokens(case)))
+    assert np.array_equal(minhash(tokens(5)), minhash(list(reversed(tokens(5))) + ["tok0"]))
+
+
+def test_estimated_jaccard_tracks_the_true_overlap():
+    a, b = minhash(tokens(100)), minhash(tokens(100, start=50))  # true Jaccard 50/150
+    assert abs(estimated_jaccard(a, b) - 1 / 3) < 0.15
+    assert estimated_jaccard(a, a) == 1.0
+    assert estimated_jaccard(minhash(tokens(50)), minhash(tokens(50, start=1000))) < 0.1
+
+
+def test_index_groups_near_duplicates_under_the_first_member():
+    index = NearDupIndex()
+    assert index.add("A", minhash(tokens(40))) == "A"
+    assert index.add("B", minhash(tokens(40) + ["extra"])) == "A"
+    assert index.add("C", minhash(tokens(40, start=500))) == "C"
+    assert index.find(minhash(tokens(40))) == "A"
+    assert index.find(minhash(tokens(40, start=900))) is None
+    assert index.groups() == {"A": ["A", "B"]}
+
+
+def test_flat_and_nested_context_tokenize_the_same():
+    case = load_corpus().case(0)
+    flat = {**{k: v for k, v in case.items() if k != "context"}, **case["context"]}
+    assert sorted(case_tokens(case)) == sorted(case_tokens(flat))
+
+
+def test_build_index_chunks_and_diversify_keeps_one_hit_per_group():
+    cases = list(load_corpus().iter_cases())[:8]
+    twin = copy.deepcopy(cases[0])
+    twin["case_id"] = "TWIN"
+    cases.append(twin)
+    index = build_index(cases, chunk=3)
+    assert index.group_of["TWIN"] == cases[0]["case_id"]
+    assert build_index(cases).group_of == index.group_of
+
+    hits = [{"case_id": "TWIN"}, {"case_id": cases[0]["case_id"]}] + [{"case_id": c["case_id"]} for c in cases[1:4]]
+    shown = diversify(hits, index, top_k=3)
+    assert len(shown) == 3
+    assert shown[0]["case_id"] == "TWIN"
+    assert cases[0]["case_id"] not in [h["case_id"] for h in shown]
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from app.packets import iter_matching_records, render_packets
+from app.persistence import append_jsonl
+from app.placeholder import build_placeholder_response
+
+pytest.importorskip("jinja2")
+
+
+def write_log(path):
+    """Eight records, one per day from 2026-10-10, alternating sites."""
+    ids = []
+    for day in range(8):
+        request = {
+            "site": "Plant-A" if day % 2 == 0 else "Plant-B",
+            "tool_group": "ETCH-CLUSTER-2",
+            "process_step": "inspection",
+            "severity": "high" if day == 3 else "medium",
+            "timestamp": f"2026-10-{10 + day}T08:00:00",
+            "anomaly_summary": f"dip <b>{day}</b>",
+            "metrics": {"yield_pct": 80.0 + day, "metric_variance": 0.3},
+            "metrics_input_mode": "Form",
+        }
+        response = build_placeholder_response(request)
+        response["meta"]["response_id"] = f"resp-{day}"
+        ids.append(f"resp-{day}")
+        append_jsonl(path, {"ts": f"2026-10-{10 + day}T09:00:00", "request": request, "response": response})
+    return ids
+
+
+def test_filters_and_time_range(tmp_path):
+    log = str(tmp_path / "log.jsonl")
+    write_log(log)
+    found = list(iter_matching_records(log, since="2026-10-12", until="2026-10-16", filters={"site": ["Plant-A"]}))
+    assert [r["response"]["meta"]["response_id"] for r in found] == ["resp-2", "resp-4"]
+    assert len(list(iter_matching_records(log, filters={"severity": ["high"]}))) == 1
+    assert len(list(iter_matching_records(log, limit=3))) == 3
+
+
+def test_render_keeps_log_order_across_chunks(tmp_path):
+    log = str(tmp_path / "log.jsonl")
+    ids = write_log(log)
+    out = str(tmp_path / "review.md")
+    report = render_packets(out, log, since="2026-10-11", workers=2, chunk_size=2)
+    assert report["packets"] == 7 and report["format"] == "md"
+    with open(out, encoding="utf-8") as f:
+        text = f.read()
+    positions = [text.index(i) for i in ids[1:]]
+    assert positions == sorted(positions)
+    assert ids[0] not in text
+    assert not os.path.exists(out + ".tmp")
+
+
+def test_html_escapes_request_text_and_honours_limit(tmp_path):
+    log = str(tmp_path / "log.jsonl")
+    write_log(log)
+    out = str(tmp_path / "review.html")
+    report = render_packets(out, log, limit=3, workers=2, chunk_size=2)
+    assert report["packets"] == 3 and report["format"] == "html"
+    with open(out, encoding="utf-8") as f:
+        text = f.read()
+    assert "dip &lt;b&gt;0&lt;/b&gt;" in text and "<b>0</b>" not in text
+    assert "resp-3" not in text
@@ -0,0 +1,35 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.pool import bounded_map
+
+
+def test_results_come_back_in_input_order():
+    def slow_square(x, delay):
+        time.sleep(delay)
+        return x * x
+
+    items = [(i, 0.02 if i % 2 == 0 else 0.0) for i in range(8)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(bounded_map(pool, slow_square, items, max_in_flight=3)) == [i * i for i in range(8)]
+
+
+def test_input_is_consumed_lazily():
+    submitted = []
+    lock = threading.Lock()
+
+    def items():
+        for i in range(20):
+            with lock:
+                submitted.append(i)
+            yield (i,)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = bounded_map(pool, lambda i: i, items(), max_in_flight=4)
+        assert next(results) == 0
+        assert len(submitted) == 4  # the first result is yielded once 4 chunks are in flight
+        for expected, got in enumerate(results, start=1):
+            assert got == expected
+            assert len(submitted) <= expected + 4
+    assert len(submitted) == 20
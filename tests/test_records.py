@@ -0,0 +1,44 @@
+import json
+import pickle
+
+import numpy as np
+
+from app.config import CASES_PATH
+from app.records import CaseTable
+from app.schema import METRIC_ORDER
+
+
+def load_cases():
+    with open(CASES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_rows_round_trip_the_corpus_json():
+    cases = load_cases()
+    table = CaseTable.from_cases(cases)
+    assert len(table) == len(cases)
+    for i, case in enumerate(cases):
+        row = table.row(i)
+        for key in ("case_id", "created_at", "title", "context", "next_checks_hint"):
+            assert row[key] == case[key]
+        assert {k: v for k, v in row["metrics"].items() if v is not None} == {
+            k: v for k, v in case["metrics"].items() if v is not None
+        }
+
+
+def test_views_are_zero_copy():
+    table = CaseTable.from_cases(load_cases()[:5])
+    metrics = table.metrics_view()
+    assert metrics.shape == (5, len(METRIC_ORDER))
+    assert np.shares_memory(metrics, table.metrics_view())
+    table.metrics[0] = -1.0
+    assert metrics[0, 0] == -1.0
+
+
+def test_reorder_and_pickle_keep_rows_aligned():
+    cases = load_cases()[:6]
+    table = CaseTable.from_cases(cases)
+    table.reorder([5, 4, 3, 2, 1, 0])
+    restored = pickle.loads(pickle.dumps(table))
+    assert [restored.row(i)["case_id"] for i in range(6)] == [c["case_id"] for c in reversed(cases)]
+    assert restored.row(0)["resolution_summary"] == cases[5]["resolution_summary"]
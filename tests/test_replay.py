@@ -0,0 +1,43 @@
+import json
+
+from app.persistence import append_jsonl
+from app.placeholder import build_placeholder_response
+from app.replay import diff_responses, replay_log
+
+
+def request(site="Plant-A", yield_pct=91.0):
+    return {
+        "site": site,
+        "tool_group": "ETCH-CLUSTER-2",
+        "process_step": "inspection",
+        "severity": "medium",
+        "timestamp": "2026-01-27T18:40:00",
+        "anomaly_summary": "yield dip after PM",
+        "metrics": {"yield_pct": yield_pct, "metric_variance": 0.4, "change_magnitude": -3.0},
+        "metrics_input_mode": "Form",
+    }
+
+
+def test_diff_responses_reports_paths_and_skips_volatile_fields():
+    old = {"meta": {"id": 1}, "similar_cases": [{"case_id": "a"}, {"case_id": "b"}], "rules": []}
+    new = {"meta": {"id": 2}, "similar_cases": [{"case_id": "a"}, {"case_id": "c"}], "rules": []}
+    assert diff_responses(old, new) == [("similar_cases[1].case_id", "b", "c")]
+    assert diff_responses(old, dict(old, meta={"id": 3})) == []
+
+
+def test_replay_flags_only_changed_and_broken_records(tmp_path):
+    log = str(tmp_path / "log.jsonl")
+    for y in (91.0, 72.5, 99.0):
+        req = request(yield_pct=y)
+        append_jsonl(log, {"ts": req["timestamp"], "request": req, "response": build_placeholder_response(req)})
+    stale = build_placeholder_response(request())
+    stale["similar_cases"] = []
+    append_jsonl(log, {"ts": "2026-01-27T18:41:00", "request": request(), "response": stale})
+    append_jsonl(log, {"ts": "2026-01-27T18:42:00", "request": {"metrics": "not a dict"}, "response": {}})
+
+    summary = replay_log(log, workers=2, chunk_size=2)
+    assert summary["records"] == 5
+    assert (summary["unchanged"], summary["changed"], summary["errors"]) == (3, 1, 1)
+    assert summary["changed_fields"] == {"similar_cases": 1}
+    assert summary["latency"]["total"]["new"]["count"] == 4
+    json.dumps(summary)  # the CLI prints it as JSON
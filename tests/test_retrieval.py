@@ -0,0 +1,67 @@
+import copy
+
+import numpy as np
+import pytest
+
+from app.corpus import CaseCorpus, load_corpus
+from app.records import to_epoch
+from app.retrieval import rank_similar, recency_weights
+
+DAY = 86400.0
+
+
+def twins(*dates):
+    """Copies of one corpus case that differ only in id and created_at."""
+    base = load_corpus().case(0)
+    out = []
+    for i, date in enumerate(dates):
+        case = copy.deepcopy(base)
+        case["case_id"], case["created_at"] = f"T-{i}", date
+        out.append(case)
+    return out
+
+
+def query_for(case, timestamp):
+    return {"timestamp": timestamp, **case["context"], "metrics": dict(case["metrics"])}
+
+
+def test_corpus_is_time_sorted_and_sliced_by_bisect():
+    corpus = CaseCorpus(twins("2026-03-01T00:00:00+00:00", "2026-01-01T00:00:00+00:00", "2026-02-01T00:00:00+00:00"))
+    assert list(corpus.case_ids) == ["T-1", "T-2", "T-0"]
+    assert corpus.get("T-0")["created_at"].startswith("2026-03-01")
+    sl = corpus.time_slice(to_epoch("2026-01-15T00:00:00+00:00"), to_epoch("2026-03-01T00:00:00+00:00"))
+    assert [corpus.case_ids[i] for i in range(sl.start, sl.stop)] == ["T-2", "T-0"]
+    assert corpus.time_slice(to_epoch("2027-01-01T00:00:00+00:00"), None) == slice(3, 3)
+
+
+def test_extend_with_backfill_keeps_time_order():
+    corpus = CaseCorpus(twins("2026-02-01T00:00:00+00:00", "2026-03-01T00:00:00+00:00"))
+    old = twins("2025-12-01T00:00:00+00:00")[0]
+    old["case_id"] = "OLD"
+    corpus.extend([old])
+    assert corpus.case_ids[0] == "OLD"
+    assert np.all(np.diff(corpus.time_array) >= 0)
+    assert corpus.get("T-1")["case_id"] == "T-1"
+
+
+def test_recency_weights_halve_per_half_life():
+    ref = 100 * DAY
+    w = recency_weights(np.array([ref, ref - 30 * DAY, ref - 60 * DAY, ref + DAY]), ref, 30.0)
+    assert w == pytest.approx([1.0, 0.5, 0.25, 1.0])
+    assert np.all(recency_weights(np.array([0.0, ref]), ref, None) == 1.0)
+
+
+def test_newer_twin_ranks_first_with_the_same_similarity():
+    cases = twins("2025-06-01T00:00:00+00:00", "2026-01-01T00:00:00+00:00")
+    corpus = CaseCorpus(cases)
+    hits = rank_similar(query_for(cases[0], "2026-01-02T00:00:00"), corpus=corpus, top_k=2, half_life_days=90.0)
+    assert [h["case_id"] for h in hits] == ["T-1", "T-0"]
+    assert hits[0]["similarity"] == pytest.approx(hits[1]["similarity"])
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_window_excludes_cases_outside_the_intake_range():
+    cases = twins("2025-06-01T00:00:00+00:00", "2026-01-01T00:00:00+00:00", "2026-02-01T00:00:00+00:00")
+    corpus = CaseCorpus(cases)
+    hits = rank_similar(query_for(cases[0], "2026-01-10T00:00:00"), corpus=corpus, top_k=5, window_days=30.0)
+    assert [h["case_id"] for h in hits] == ["T-1"]
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from app.rules import RuleBook, compile_rules
+
+CHECK = {"category": "Data", "check": "Confirm the measurement.", "why": "Always."}
+
+
+def write_rules(path, rules):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": rules}, f)
+
+
+@pytest.mark.parametrize("rules", [[], [{"when": {}, **CHECK}], [{"when": {"severity": ["high"]}, **CHECK}]])
+def test_rules_without_hints_any_compile(rules):
+    compiled = compile_rules({"rules": rules})
+    assert compiled.hint_bits.shape == (0, (len(rules) + 7) // 8)
+
+
+def test_empty_when_fires_with_and_without_hints(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [{"when": {}, **CHECK}])
+    book = RuleBook(str(path))
+    assert book.next_checks({"severity": "low", "metrics": {}}, {}) == [CHECK]
+    assert book.next_checks({"severity": "low", "metrics": {}}, {}, ["recipe_diff"]) == [CHECK]
+
+
+def test_hot_reload_accepts_table_without_hints(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [{"when": {"hints_any": ["recipe_diff"]}, **CHECK}])
+    book = RuleBook(str(path))
+    assert book.next_checks({"metrics": {}}, {}) == []
+
+    write_rules(path, [{"when": {}, **CHECK}])
+    os.utime(path, (1, 1))  # a distinct mtime even on coarse-grained filesystems
+    assert book.next_checks({"metrics": {}}, {}) == [CHECK]
+    assert book.last_error is None
+
+
+def test_missing_file_keeps_last_good_table(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [{"when": {}, **CHECK}])
+    book = RuleBook(str(path))
+    assert book.next_checks({"metrics": {}}, {}) == [CHECK]
+
+    os.rename(path, tmp_path / "rules.json.bak")
+    assert book.next_checks({"metrics": {}}, {}) == [CHECK]
+    assert book.last_error
+
+    with pytest.raises(OSError):
+        RuleBook(str(path)).compiled()
@@ -0,0 +1,20 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from app.config import SCHEDULER_CLIENT_BURST
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def test_rate_limited_submit_shows_try_again_notice(app_cwd):
+    at = AppTest.from_file(MAIN, default_timeout=120).run()
+    for _ in range(SCHEDULER_CLIENT_BURST):
+        at.button[0].click().run()
+        assert not at.warning or "Too many submissions" not in at.warning[0].value
+
+    at.button[0].click().run()
+    assert at.session_state.last_response["meta"]["status"] == "rate_limited"
+    assert any("Too many submissions" in w.value for w in at.warning)
+    # Earlier investigations stay reachable below the notice.
+    assert len(at.session_state.history.entries()) == SCHEDULER_CLIENT_BURST
@@ -0,0 +1,49 @@
+import pytest
+
+from app.config import SITES
+from app.corpus import load_corpus
+from app.retrieval import rank_similar
+from app.shards import ShardedSearcher, merge_top_k
+
+QUERY = {
+    "tool_group": "LITHO-LINE-1",
+    "process_step": "Exposure",
+    "severity": "high",
+    "timestamp": "2026-10-01T00:00:00",
+    "metrics": {"yield_pct": 88.0, "metric_variance": 0.4},
+}
+
+
+@pytest.fixture(scope="module")
+def searcher():
+    s = ShardedSearcher(workers=2)
+    yield s
+    s.close()
+
+
+def test_selected_site_prunes_to_its_shard(searcher):
+    payload = {**QUERY, "site": "Plant-A"}
+    assert searcher.shards_for(payload) == ["Plant-A"]
+    corpus = load_corpus()
+    hits = searcher.rank(payload, top_k=5)
+    assert len(hits) == 5
+    assert {corpus.get(h["case_id"])["context"]["site"] for h in hits} == {"Plant-A"}
+
+
+@pytest.mark.parametrize("site", [None, "", SITES[0], "Plant-Z"])
+def test_missing_placeholder_or_unknown_site_searches_every_shard(searcher, site):
+    payload = {**QUERY, "site": site}
+    assert searcher.shards_for(payload) == searcher.shard_keys
+    expected = rank_similar(payload, top_k=5)
+    assert [h["case_id"] for h in searcher.rank(payload, top_k=5)] == [h["case_id"] for h in expected]
+
+
+def test_small_shard_is_filled_from_the_others(searcher):
+    payload = {**QUERY, "site": "Plant-A"}
+    hits = searcher.rank(payload, top_k=len(load_corpus()))
+    assert len(hits) == len(load_corpus())
+
+
+def test_merge_top_k_keeps_global_order():
+    merged = merge_top_k([[(0.9, 0.9, "a"), (0.2, 0.2, "d")], [(0.5, 0.5, "b"), (0.4, 0.4, "c")]], 3)
+    assert [h[2] for h in merged] == ["a", "b", "c"]